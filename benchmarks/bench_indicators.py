@@ -0,0 +1,230 @@
+"""
+bench_indicators.py
+
+Benchmark every public Asset indicator, calc_stats, Portfolio.calc_stats and Strategy.run on synthetic OCHLV at several
+scales, save the timings as JSON and flag the timings that slowed down against an earlier run.
+
+    PYTHONPATH=. python benchmarks/bench_indicators.py [--bars 1000,100000,1000000] [--symbols 1,100,5000] [--max-cells N]
+                                                       [--only NAME,...] [--output results.json]
+                                                       [--compare baseline.json] [--threshold 1.25] [--min-time 0.001]
+    PYTHONPATH=. python benchmarks/bench_indicators.py --input results.json --compare baseline.json
+
+Run from the repository root, PYTHONPATH=. makes the compfipy package (and the shared tests.helpers data) importable without installing it.
+
+One symbol runs on an Asset, more run on a Universe. Scales with more bars x symbols than --max-cells (or the target's own
+limit) are skipped. Bars are business days, or minutes when there are too many business days for pandas timestamps.
+With --compare the exit status is 1 when any timing grew by more than --threshold.
+
+"""
+
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import collections
+import numpy as np
+import pandas as pd
+
+from compfipy import util
+from compfipy.asset import Asset, INDICATOR_GRAPH
+from compfipy.universe import Universe
+from compfipy.portfolio import Portfolio
+from compfipy.strategy import BuyAndHold, SimpleMovingAverageCrossover
+from tests.helpers import random_history
+
+BARS = [1000, 100000, 1000000]
+SYMBOLS = [1, 100, 5000]
+MAX_CELLS = 10**7
+MAX_DAILY_BARS = 50000
+START_DATE = '1990-01-01'
+THRESHOLD = 1.25
+MIN_TIME = 0.001
+REPEAT = 3
+TIME_BUDGET = 10.0
+
+# Synthetic Data
+# ------------------------------------------------------------------------------------------------------------------------------
+class Case(object):
+    """
+    Synthetic OCHLV for one scale, held as Assets and as the Asset or Universe the indicators run on.
+    """
+    def __init__(self, bars, symbols, seed=0):
+        np.random.seed(seed)
+        if bars <= MAX_DAILY_BARS:
+            dates = pd.bdate_range(START_DATE, periods=bars)
+        else:
+            dates = pd.date_range(START_DATE, periods=bars, freq='T')
+        self.bars = bars
+        self.symbols = symbols
+        self.assets = collections.OrderedDict()
+        for i in xrange(symbols):
+            symbol = 'S{:04d}'.format(i)
+            self.assets[symbol] = Asset(random_history(symbol, dates))
+        self.asset = self.assets.values()[0] if symbols == 1 else Universe.from_assets(self.assets.values())
+
+    @property
+    def cells(self):
+        """
+        Return bars x symbols.
+        """
+        return self.bars * self.symbols
+
+# Targets
+# ------------------------------------------------------------------------------------------------------------------------------
+def indicator(method, params):
+    """
+    Prepare an indicator call on the case Asset or Universe.
+    """
+    return lambda case: lambda: getattr(case.asset, method)(**params)
+
+def calc_stats(case):
+    """
+    Prepare calc_stats on a fresh copy of the case Asset or Universe, so incremental state is not reused.
+    """
+    return lambda: type(case.asset)(case.asset.data).calc_stats()
+
+def portfolio_calc_stats(case):
+    """
+    Prepare Portfolio.calc_stats holding one share of every symbol.
+    """
+    portfolio = Portfolio(case.assets, initial_positions={symbol: 1.0 for symbol in case.assets})
+    return portfolio.calc_stats
+
+def strategy_run(strategy, *args):
+    """
+    Prepare Strategy.run on a fresh portfolio of every symbol, with the first symbol as the market.
+    """
+    def run(case):
+        # pylint: disable=missing-docstring
+        market = case.assets.values()[0]
+        return lambda: strategy(Portfolio(case.assets), market, *args).run()
+    return run
+
+def targets():
+    """
+    Return the benchmark targets as (name, cell limit or None, prepare), where prepare(case) returns the call to time.
+    """
+    found = [
+        ('indicator.{}'.format(name), None, indicator(node.method, node.params))
+        for name, node in INDICATOR_GRAPH.items() if not node.method.startswith('_')
+    ]
+    found.extend([
+        ('indicator.all', None, lambda case: case.asset.all_indicators),
+        ('asset.calc_stats', None, calc_stats),
+        ('portfolio.calc_stats', None, portfolio_calc_stats),
+        # Strategies step through every date and symbol in Python
+        ('strategy.buy_and_hold.run', 10**5, strategy_run(BuyAndHold)),
+        ('strategy.sma_crossover.run', 10**3, strategy_run(SimpleMovingAverageCrossover, 10, 30)),
+    ])
+    return found
+
+# Benchmark
+# ------------------------------------------------------------------------------------------------------------------------------
+def best_time(func, repeat=REPEAT, budget=TIME_BUDGET):
+    """
+    Best wall time of func over up to repeat runs, stopping early once the runs take longer than budget seconds.
+    """
+    times = []
+    while len(times) < repeat and sum(times) < budget:
+        start = timeit.default_timer()
+        func()
+        times.append(timeit.default_timer() - start)
+    return min(times)
+
+def scale_key(name, bars, symbols):
+    """
+    Return the result key of a target at a scale.
+    """
+    return '{}@{}x{}'.format(name, bars, symbols)
+
+def run(bars=None, symbols=None, max_cells=MAX_CELLS, only=None, repeat=REPEAT):
+    """
+    Time the targets at every scale, returning the JSON ready results: meta data, timings and errors keyed by scale_key.
+    """
+    # pylint: disable=too-many-locals
+    found = [target for target in targets() if not only or any(name in target[0] for name in only)]
+    results = collections.OrderedDict()
+    errors = collections.OrderedDict()
+    for n_bars in bars or BARS:
+        for n_symbols in symbols or SYMBOLS:
+            runnable = [target for target in found if n_bars * n_symbols <= min(max_cells, target[1] or max_cells)]
+            if not runnable:
+                print 'skip {} bars x {} symbols'.format(n_bars, n_symbols)
+                continue
+            case = Case(n_bars, n_symbols)
+            print '{} bars x {} symbols'.format(n_bars, n_symbols)
+            for name, _, prepare in runnable:
+                key = scale_key(name, n_bars, n_symbols)
+                try:
+                    results[key] = best_time(prepare(case), repeat)
+                    print '    {:50s} {:10.4f} s'.format(name, results[key])
+                except Exception as e: # pylint: disable=broad-except
+                    errors[key] = '{}: {}'.format(type(e).__name__, e)
+                    print '    {:50s}     failed {}'.format(name, errors[key])
+            del case
+
+    meta = collections.OrderedDict([
+        ('date', time.strftime('%Y-%m-%d %H:%M:%S %z')),
+        ('platform', platform.platform()),
+        ('python', platform.python_version()),
+        ('numpy', np.__version__),
+        ('pandas', pd.__version__),
+        ('kernel_backend', util.KERNEL_BACKEND),
+    ])
+    return collections.OrderedDict([('meta', meta), ('results', results), ('errors', errors)])
+
+def compare(baseline, current, threshold=THRESHOLD, min_time=MIN_TIME):
+    """
+    Return (key, baseline time, current time) for every timing in both runs that grew by more than threshold times, ignoring
+    timings under min_time seconds in both runs.
+    """
+    slower = []
+    for key, after in current['results'].items():
+        before = baseline['results'].get(key)
+        if before is None or max(before, after) < min_time:
+            continue
+        if after > threshold * before:
+            slower.append((key, before, after))
+    return slower
+
+def main(argv=None):
+    """
+    Run or load the timings, save them and check them for regressions.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark compfipy indicators on synthetic OCHLV.')
+    ints = lambda text: [int(float(value)) for value in text.split(',')]
+    parser.add_argument('--bars', type=ints, default=BARS, help='comma separated bar counts')
+    parser.add_argument('--symbols', type=ints, default=SYMBOLS, help='comma separated symbol counts')
+    parser.add_argument('--max-cells', type=float, default=MAX_CELLS, help='skip scales with more bars x symbols')
+    parser.add_argument('--only', type=lambda text: text.split(','), help='only targets whose name contains one of these')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='best of this many runs')
+    parser.add_argument('--input', help='load timings from this JSON file instead of running')
+    parser.add_argument('--output', help='save timings to this JSON file')
+    parser.add_argument('--compare', help='flag timings slower than in this JSON file')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='slowdown ratio that counts as a regression')
+    parser.add_argument('--min-time', type=float, default=MIN_TIME, help='ignore timings under this many seconds')
+    args = parser.parse_args(argv)
+
+    if args.input:
+        with open(args.input) as f:
+            current = json.load(f)
+    else:
+        current = run(args.bars, args.symbols, args.max_cells, args.only, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        slower = compare(baseline, current, args.threshold, args.min_time)
+        for key, before, after in slower:
+            print 'SLOWER {:60s} {:10.4f} s -> {:10.4f} s ({:.2f}x)'.format(key, before, after, after / before)
+        print '{} of {} timings slower than {:.2f}x'.format(len(slower), len(current['results']), args.threshold)
+        return 1 if slower else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
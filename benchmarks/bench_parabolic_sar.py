@@ -0,0 +1,100 @@
+"""
+bench_parabolic_sar.py
+
+Benchmark the array kernel behind Asset.parabolic_sar against the original per-bar pandas loop.
+
+    PYTHONPATH=. python benchmarks/bench_parabolic_sar.py [bars] [symbols]
+
+Run from the repository root, PYTHONPATH=. makes the compfipy package importable without installing it.
+
+"""
+
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+from compfipy.util import psar
+
+# Reference Implementation
+# ------------------------------------------------------------------------------------------------------------------------------
+def legacy_parabolic_sar(high, low, step_r=0.02, step_f=0.02, max_af_r=0.2, max_af_f=0.2):
+    """
+    The original Asset.parabolic_sar loop, one pandas element access per bar.
+    """
+    # pylint: disable=too-many-arguments
+    r_sar = pd.Series(np.zeros(len(high)), index=high.index)
+    f_sar = pd.Series(np.zeros(len(high)), index=high.index)
+    ep = high[0]
+    af = step_r
+    sar = low[0]
+    up = True
+
+    for i in range(1, len(high)):
+        if up:
+            ep = np.max([ep, high[i]])
+            af = np.min([af + step_r if (ep == high[i]) else af, max_af_r])
+            sar = sar + af * (ep - sar)
+            r_sar[i] = sar
+        else:
+            ep = np.min([ep, low[i]])
+            af = np.min([af + step_f if (ep == low[i]) else af, max_af_f])
+            sar = sar + af * (ep - sar)
+            f_sar[i] = sar
+        if up and (sar > low[i] or sar > high[i]):
+            up = False
+            sar = ep
+            af = step_f
+        elif not up and (sar < low[i] or sar < high[i]):
+            up = True
+            sar = ep
+            af = step_r
+
+    return pd.DataFrame({'rising' : r_sar, 'falling': f_sar})
+
+# Benchmark
+# ------------------------------------------------------------------------------------------------------------------------------
+def random_high_low(bars=10000, symbols=100, seed=0):
+    """
+    Random walk high and low prices as dates x symbols DataFrames.
+    """
+    np.random.seed(seed)
+    dates = pd.bdate_range('1977-01-03', periods=bars)
+    close = 100.0 * np.exp(np.cumsum(np.random.normal(0.0, 0.01, (bars, symbols)), axis=0))
+    spread = np.abs(np.random.normal(0.0, 0.005, (bars, symbols))) * close
+    high = pd.DataFrame(close + spread, index=dates)
+    low = pd.DataFrame(close - spread, index=dates)
+    return high, low
+
+def best_time(func, repeat=3):
+    """
+    Best wall time of func over repeat runs.
+    """
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def main(bars=10000, symbols=100):
+    """
+    Time the legacy loop on one symbol, then the kernel on one symbol and on the whole block.
+    """
+    high, low = random_high_low(bars, symbols)
+    h0, l0 = high[0], low[0]
+
+    # Check the kernel reproduces the legacy loop before timing it
+    legacy = legacy_parabolic_sar(h0, l0)
+    rising, falling = psar(h0, l0)
+    assert np.array_equal(legacy['rising'].values, rising.values)
+    assert np.array_equal(legacy['falling'].values, falling.values)
+
+    legacy_time = best_time(lambda: legacy_parabolic_sar(h0, l0), repeat=1)
+    single_time = best_time(lambda: psar(h0, l0))
+    batch_time = best_time(lambda: psar(high, low))
+
+    print 'Parabolic SAR, {} bars'.format(bars)
+    print 'legacy loop, 1 symbol        : {:10.4f} s'.format(legacy_time)
+    print 'kernel, 1 symbol             : {:10.4f} s ({:.0f}x)'.format(single_time, legacy_time / single_time)
+    print 'kernel, {:5d} symbols batch  : {:10.4f} s ({:.0f}x legacy per symbol)'.format(
+        symbols, batch_time, symbols * legacy_time / batch_time
+    )
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,123 @@
+"""
+bench_store.py
+
+Benchmark the columnar history store against the protocol-0 pickles written by market.update_history: disk footprint,
+migration time and load times for whole histories, one year and a single column, over a synthetic universe. Then time
+building the universe cube and loading a Universe and one symbol from it.
+
+    PYTHONPATH=. python benchmarks/bench_store.py [symbols] [bars] [directory]
+
+Run from the repository root, PYTHONPATH=. makes the compfipy package (and the shared tests.helpers data) importable without installing it.
+
+The defaults (1000 symbols, 10000 bars) take about 1 GB of pickles, pass 8000 symbols for a full NASDAQ + NYSE universe.
+Files are written under directory (defaults to a temporary directory, removed afterwards).
+
+"""
+
+import os
+import sys
+import shutil
+import timeit
+import tempfile
+import cPickle as pickle
+import numpy as np
+import pandas as pd
+
+from compfipy import store
+from compfipy.asset import Asset
+from compfipy.universe import Universe
+from tests.helpers import random_history
+
+# Synthetic Universe
+# ------------------------------------------------------------------------------------------------------------------------------
+def write_pickles(history_dir, symbols, bars, seed=0):
+    """
+    Write a protocol-0 pickle per symbol, like market.update_history.
+    """
+    np.random.seed(seed)
+    dates = pd.bdate_range('1977-01-03', periods=bars)
+    for symbol in symbols:
+        with open(os.path.join(history_dir, symbol + '.pkl'), 'wb') as f:
+            # Stored like update_history, with the index named Date
+            history = random_history(symbol, dates)
+            history.index = history.index.rename('Date')
+            pickle.dump(history, f, protocol=0)
+
+def disk_size(path):
+    """
+    Total bytes of the files under path.
+    """
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for directory, _, names in os.walk(path) for name in names
+    )
+
+# Benchmark
+# ------------------------------------------------------------------------------------------------------------------------------
+def load_pickle(history_dir, symbol):
+    """
+    Load one symbol like market.load_pickle.
+    """
+    with open(os.path.join(history_dir, symbol + '.pkl'), 'rb') as f:
+        return pickle.load(f).sort_index()
+
+def timed(func):
+    """
+    Wall time of one call of func.
+    """
+    start = timeit.default_timer()
+    func()
+    return timeit.default_timer() - start
+
+def main(n_symbols=1000, bars=10000, directory=None):
+    """
+    Build the pickles, migrate them and time loading the universe from each.
+    """
+    root = tempfile.mkdtemp(dir=directory)
+    try:
+        history_dir = os.path.join(root, 'history')
+        store_dir = os.path.join(root, 'store')
+        os.makedirs(history_dir)
+        symbols = ['S{:05d}'.format(i) for i in xrange(n_symbols)]
+        write_pickles(history_dir, symbols, bars)
+
+        migrate_time = timed(lambda: store.migrate_pickles(history_dir, store_dir, display=False))
+        year = pd.bdate_range('1977-01-03', periods=bars)[-1].year
+        start, end = '{}-01-01'.format(year), '{}-12-31'.format(year)
+
+        # Check the store returns what was pickled before timing it
+        check = store.read_history(store_dir, symbols[0])
+        assert check.equals(load_pickle(history_dir, symbols[0]))
+
+        timings = [
+            ('all history, pickle', timed(lambda: [load_pickle(history_dir, s) for s in symbols])),
+            ('all history, store', timed(lambda: [store.read_history(store_dir, s) for s in symbols])),
+            ('last year, pickle', timed(lambda: [load_pickle(history_dir, s).loc[start:end] for s in symbols])),
+            ('last year, store', timed(lambda: [store.read_history(store_dir, s, start, end) for s in symbols])),
+            ('close only, pickle', timed(lambda: [load_pickle(history_dir, s)['Close'] for s in symbols])),
+            ('close only, store', timed(lambda: [store.read_history(store_dir, s, columns=['Close']) for s in symbols])),
+        ]
+
+        cube_dir = os.path.join(root, 'cube')
+        cube_time = timed(lambda: store.write_cube(store_dir, cube_dir))
+        load = store.read_history
+        timings.extend([
+            ('universe, store', timed(lambda: Universe.from_assets([Asset(load(store_dir, s)) for s in symbols]))),
+            ('universe, cube', timed(lambda: Universe.from_cube(cube_dir))),
+            ('universe close sum, cube', timed(lambda: Universe.from_cube(cube_dir).close.sum())),
+            ('one symbol, store', timed(lambda: store.read_history(store_dir, symbols[-1]))),
+            ('one symbol, cube', timed(lambda: store.read_cube_history(cube_dir, symbols[-1]))),
+        ])
+
+        print 'History store, {} symbols x {} bars'.format(n_symbols, bars)
+        print 'pickles on disk              : {:10.1f} MB'.format(disk_size(history_dir) / 1e6)
+        print 'store on disk                : {:10.1f} MB'.format(disk_size(store_dir) / 1e6)
+        print 'cube on disk                 : {:10.1f} MB'.format(disk_size(cube_dir) / 1e6)
+        print 'migration                    : {:10.4f} s'.format(migrate_time)
+        print 'cube build                   : {:10.4f} s'.format(cube_time)
+        for name, seconds in timings:
+            print '{:29s}: {:10.4f} s'.format(name, seconds)
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]] + sys.argv[3:4])
@@ -4,7 +4,7 @@ compfipy
 Computational Finance in Python.
 """
 
-__all__ = ['asset', 'portfolio', 'market', 'models', 'calculator']
+__all__ = ['asset', 'portfolio', 'market', 'models', 'calculator', 'stream', 'universe', 'store']
 __version__ = '0.1.0'
 __date__ = '2015-06-14 05:15:58 -0700'
 __author__ = 'tmthydvnprt'
@@ -6,7 +6,11 @@ Define the an asset class to contain price data and various calculations, measur
 
 """
 
+import copy
 import datetime
+import weakref
+import inspect
+import functools
 import collections
 import tabulate
 import scipy.stats
@@ -16,7 +20,10 @@ import matplotlib.pyplot as plt
 
 from compfipy.util import RISK_FREE_RATE, MONTHS_IN_YEAR, DAYS_IN_YEAR, DAYS_IN_TRADING_YEAR
 from compfipy.util import FIBONACCI_SEQUENCE, FIBONACCI_DECIMAL, RANK_PERCENTS, RANK_DAYS_IN_TRADING_YEAR
-from compfipy.util import calc_returns, calc_cagr, fmtp, fmtn, fmttn, sma, ema
+from compfipy.util import calc_returns, calc_cagr, calc_drawdown_info, fmtp, fmtn, fmttn, sma, ema, wma, wilder_smooth, psar
+from compfipy.util import volume_profile, rolling_extrema, bars_since, zigzag_pivots, zigzag_line, zigzag_pivot_list
+from compfipy.util import like, combine, first_valid, rolling_sums, market_comparison, rolling_comparison
+from compfipy.stream import RunningStats
 
 # Helper Functions for Fibonacci Code
 # ------------------------------------------------------------------------------------------------------------------------------
@@ -62,6 +69,324 @@ def hist(x, figsize=(16, 4), title=None, logy=False, **kwargs):
     title = title if title else 'Return Histogram'
     x.hist(figsize=figsize, title=title, logy=logy, **kwargs)
 
+# Compact Price Data
+# ------------------------------------------------------------------------------------------------------------------------------
+# Date indexes held by compact price data, equal indexes are stored once however many assets use them
+SHARED_DATES = weakref.WeakValueDictionary()
+
+def shared_dates(index):
+    """
+    Return an unnamed DatetimeIndex equal to index, reusing one already held by other compact price data.
+    """
+    index = pd.DatetimeIndex(index, name=None)
+    dates = index.asi8
+    key = (len(dates), dates[0], dates[-1]) if len(dates) else (0, None, None)
+    shared = SHARED_DATES.get(key)
+    if shared is not None and np.array_equal(shared.asi8, dates):
+        return shared
+    SHARED_DATES[key] = index
+    return index
+
+class CompactOCHLV(object):
+    """
+    Compact OCHLV price data, one contiguous float32 or float64 array per field on a shared int64 date index. Fields are
+    returned as pandas views of those arrays, without copying. Data with (field, symbol) columns keeps a dates x symbols
+    array per field.
+    """
+    __slots__ = ['name', 'index', 'symbols', 'fields']
+
+    def __init__(self, data, dtype=np.float64):
+        """
+        Create compact price data from a pandas.DataFrame of OCHLV price data.
+        """
+        self.name = data.index.name
+        self.index = shared_dates(data.index)
+        self.fields = collections.OrderedDict()
+        if isinstance(data.columns, pd.MultiIndex):
+            for field in data.columns.get_level_values(0).unique():
+                self.fields[field] = np.ascontiguousarray(data[field].values, dtype=dtype)
+            self.symbols = data[field].columns
+        else:
+            for field in data.columns:
+                self.fields[field] = np.ascontiguousarray(data[field].values, dtype=dtype)
+            self.symbols = None
+
+    @classmethod
+    def from_arrays(cls, name, index, fields, symbols=None):
+        """
+        Create compact price data holding arrays as they are, an array per field keyed by field (dates x symbols arrays when
+        symbols is given). The arrays are not copied, so memory mapped arrays stay on disk until used.
+        """
+        compact = object.__new__(cls)
+        compact.name = name
+        compact.index = shared_dates(index)
+        compact.fields = collections.OrderedDict(fields)
+        compact.symbols = None if symbols is None else pd.Index(symbols)
+        return compact
+
+    @property
+    def dtype(self):
+        """
+        Return the dtype of the field arrays.
+        """
+        return self.fields.values()[0].dtype if self.fields else np.dtype(np.float64)
+
+    def __getitem__(self, field):
+        """
+        Return a field as a pandas.Series (pandas.DataFrame for many symbols) view of its array.
+        """
+        values = self.fields[field]
+        if self.symbols is None:
+            return pd.Series(values, index=self.index, name=field, copy=False)
+        return pd.DataFrame(values, index=self.index, columns=self.symbols, copy=False)
+
+    def __len__(self):
+        """
+        Return number of dates.
+        """
+        return len(self.index)
+
+    @property
+    def dates(self):
+        """
+        Return dates as int64 nanoseconds, a view of the shared index.
+        """
+        return self.index.asi8
+
+    @property
+    def nbytes(self):
+        """
+        Return bytes held by the field arrays and the date index.
+        """
+        return sum(values.nbytes for values in self.fields.values()) + self.dates.nbytes
+
+    def view(self, start, stop):
+        """
+        Return compact price data of rows start to stop, sharing these arrays.
+        """
+        compact = object.__new__(CompactOCHLV)
+        compact.name = self.name
+        compact.symbols = self.symbols
+        compact.index = self.index[start:stop]
+        compact.fields = collections.OrderedDict((field, values[start:stop]) for field, values in self.fields.items())
+        return compact
+
+    def to_frame(self):
+        """
+        Return a copy of the price data as a pandas.DataFrame.
+        """
+        if self.symbols is None:
+            frame = pd.DataFrame(collections.OrderedDict((field, self[field]) for field in self.fields))
+        else:
+            frame = pd.concat([self[field] for field in self.fields], axis=1, keys=self.fields.keys())
+        frame.index = frame.index.rename(self.name)
+        return frame
+
+# Indicator Graph
+# ------------------------------------------------------------------------------------------------------------------------------
+def cached(method):
+    """
+    Decorate an Asset method whose result depends only on its arguments and the asset data. While an indicator plan is being
+    evaluated (see Asset.compute_indicators) the result is computed once per set of arguments and shared by every indicator
+    that uses it. Otherwise, when the asset cache is enabled, results are kept in a least recently used cache keyed by method,
+    arguments and data version, and every call returns a copy of the cached result so callers may modify it.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        # pylint: disable=protected-access,missing-docstring
+        if self._intermediates is None and not self._cache_size:
+            return method(self, *args, **kwargs)
+        call = inspect.getcallargs(method, self, *args, **kwargs)
+        del call['self']
+        key = (method.__name__, tuple(sorted(call.items())), self._data_version)
+        try:
+            hash(key)
+        except TypeError:
+            # Unhashable arguments (lists etc.) are never cached
+            return method(self, *args, **kwargs)
+
+        if self._intermediates is not None and key in self._intermediates:
+            return self._intermediates[key]
+        if not self._cache_size:
+            result = method(self, *args, **kwargs)
+        elif key in self._cache:
+            self._cache_hits += 1
+            result = self._cache.pop(key)
+            self._cache[key] = result
+        else:
+            self._cache_misses += 1
+            result = method(self, *args, **kwargs)
+            self._cache[key] = result
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        if self._intermediates is not None:
+            self._intermediates[key] = result
+            return result
+        return copy_result(result) if self._cache_size else result
+    wrapper.cached = True
+    return wrapper
+
+def copy_result(result):
+    """
+    Return a copy of a cached result, a pandas or numpy object or a tuple of them.
+    """
+    if isinstance(result, tuple):
+        return tuple(copy_result(part) for part in result)
+    return result.copy() if hasattr(result, 'copy') else copy.copy(result)
+
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# A node calls an Asset method with keyword params, after the nodes it takes as inputs. Outputs map each column it produces to
+# the key of that column in the method result, None when the result is the column itself. Nodes without outputs are shared
+# intermediates.
+Node = collections.namedtuple('Node', ['method', 'params', 'inputs', 'outputs'])
+
+INDICATOR_GRAPH = collections.OrderedDict([
+    # Shared intermediates
+    ('ema_close_12', Node('_ema', {'field': 'close', 'n': 12}, [], {})),
+    ('ema_close_26', Node('_ema', {'field': 'close', 'n': 26}, [], {})),
+    ('ema_volume_12', Node('_ema', {'field': 'volume', 'n': 12}, [], {})),
+    ('ema_volume_26', Node('_ema', {'field': 'volume', 'n': 26}, [], {})),
+    ('sma_close_20', Node('_sma', {'field': 'close', 'n': 20}, [], {})),
+    ('std_close_20', Node('_rolling_std', {'field': 'close', 'n': 20}, [], {})),
+    ('channel_9', Node('_channel', {'n': 9}, [], {})),
+    ('channel_14', Node('_channel', {'n': 14}, [], {})),
+    ('channel_20', Node('_channel', {'n': 20}, [], {})),
+    ('channel_22', Node('_channel', {'n': 22}, [], {})),
+    ('channel_26', Node('_channel', {'n': 26}, [], {})),
+    ('channel_52', Node('_channel', {'n': 52}, [], {})),
+    ('channel_positions_26_partial', Node('_channel_positions', {'n': 26, 'min_periods': 0}, [], {})),
+    ('roc_10', Node('rate_of_change', {'n': 10}, [], {})),
+    ('roc_11', Node('rate_of_change', {'n': 11}, [], {})),
+    ('roc_14', Node('rate_of_change', {'n': 14}, [], {})),
+    ('roc_15', Node('rate_of_change', {'n': 15}, [], {})),
+    ('roc_30', Node('rate_of_change', {'n': 30}, [], {})),
+    ('roc_125', Node('rate_of_change', {'n': 125}, [], {})),
+    ('atr_10', Node('average_true_range', {'n': 10}, ['true_range'], {})),
+    ('atr_22', Node('average_true_range', {'n': 22}, ['true_range'], {})),
+    ('rsi_20', Node('relative_strength_index', {'n': 20}, [], {})),
+    # Price transforms
+    ('returns', Node('returns', {}, [], {'return': None})),
+    ('money_flow', Node('money_flow', {}, [], {'money_flow': None})),
+    ('money_flow_volume', Node('money_flow_volume', {}, [], {'money_flow_volume': None})),
+    ('typical_price', Node('typical_price', {}, [], {'typical_price': None})),
+    ('close_to_open_range', Node('close_to_open_range', {}, [], {'close_to_open_range': None})),
+    ('quadrant_range', Node('quadrant_range', {}, ['high_low_spread'], {
+        'l1_quadrant_range': '1', 'l2_quadrant_range': '2', 'l3_quadrant_range': '3', 'l4_quadrant_range': '4',
+        'l5_quadrant_range': '5'
+    })),
+    ('true_range', Node('true_range', {}, [], {'true_range': None})),
+    ('high_low_spread', Node('high_low_spread', {}, [], {'high_low_spread': None})),
+    ('roc', Node('rate_of_change', {'n': 20}, [], {'roc': None})),
+    # Overlays
+    ('bollinger_bands', Node('bollinger_bands', {}, ['sma_close_20', 'std_close_20'], {
+        'upper_bollinger_band': 'ub', 'center_bollinger_band': 'mb', 'lower_bollinger_band': 'lb'
+    })),
+    ('chandelier_exit', Node('chandelier_exit', {}, ['atr_22', 'channel_22'], {
+        'long_chandelier_exit': 'long', 'short_chandelier_exit': 'short'
+    })),
+    ('ichimoku_clouds', Node('ichimoku_clouds', {}, ['channel_9', 'channel_26', 'channel_52'], {
+        'conversion_ichimoku_cloud': 'conversion', 'base_line_ichimoku_cloud': 'base', 'leadingA_ichimoku_cloud': 'leadA',
+        'leadingB_ichimoku_cloud': 'leadB', 'lagging_ichimoku_cloud': 'lag'
+    })),
+    ('keltner_channels', Node('keltner_channels', {}, ['atr_10'], {
+        'upper_keltner_channel': 'ul', 'center_keltner_channel': 'ml', 'lower_keltner_channel': 'll'
+    })),
+    ('moving_average_envelopes', Node('moving_average_envelopes', {}, ['sma_close_20'], {
+        'upper_ma_envelope': 'uma', 'center_ma_envelope': 'ma', 'lower_ma_envelope': 'lma'
+    })),
+    ('parabolic_sar', Node('parabolic_sar', {}, [], {'rising_parabolic_sar': 'rising', 'falling_parabolic_sar': 'falling'})),
+    ('pivot_point', Node('pivot_point', {}, ['typical_price', 'high_low_spread'], {
+        'p_pivot_point': 'p', 's1_pivot_point': 's1', 's2_pivot_point': 's2', 'r1_pivot_point': 'r1', 'r2_pivot_point': 'r2'
+    })),
+    ('fibonacci_pivot_point', Node('fibonacci_pivot_point', {}, ['typical_price', 'high_low_spread'], {
+        'p_fibonacci_pivot_point': 'p', 's1_fibonacci_pivot_point': 's1', 's2_fibonacci_pivot_point': 's2',
+        's3_fibonacci_pivot_point': 's3', 'r1_fibonacci_pivot_point': 'r1', 'r2_fibonacci_pivot_point': 'r2',
+        'r3_fibonacci_pivot_point': 'r3'
+    })),
+    ('demark_pivot_point', Node('demark_pivot_point', {}, [], {
+        'p_demark_pivot_point': 'p', 's1_demark_pivot_point': 's1', 'r1_demark_pivot_point': 'r1'
+    })),
+    ('price_channel', Node('price_channel', {}, ['channel_20'], {
+        'high_price_channel': 'high', 'low_price_channel': 'low', 'center_price_channel': 'center'
+    })),
+    ('volume_by_price', Node('volume_by_price', {}, [], {
+        'volume_by_price_{}'.format(block): block for block in xrange(12)
+    })),
+    ('vwap', Node('volume_weighted_average_price', {}, ['typical_price'], {'vwap': None})),
+    ('zigzag', Node('zigzag', {}, [], {'zigzag': None})),
+    # Indicators
+    ('adl', Node('accumulation_distribution_line', {}, ['money_flow_volume'], {'adl': None})),
+    ('aroon', Node('aroon', {}, ['channel_positions_26_partial'], {
+        'aroon_up': 'up', 'aroon_down': 'down', 'aroon_oscillator': 'oscillator'
+    })),
+    ('adx', Node('average_directional_index', {}, ['true_range'], {'adx': None})),
+    ('atr', Node('average_true_range', {}, ['true_range'], {'atr': None})),
+    ('bandwidth', Node('bandwidth', {}, ['bollinger_bands'], {'bandwidth': None})),
+    ('percent_b', Node('percent_b', {}, ['bollinger_bands'], {'%b': None})),
+    ('cci', Node('commodity_channel_index', {}, ['typical_price'], {'cci': None})),
+    ('coppock_curve', Node('coppock_curve', {}, ['roc_14', 'roc_11'], {'coppock_curve': None})),
+    ('chaikin_money_flow', Node('chaikin_money_flow', {}, ['money_flow_volume'], {'chaikin_money_flow': None})),
+    ('chaikin_oscillator', Node('chaikin_oscillator', {}, ['adl'], {'chaikin_oscillator': None})),
+    ('pmo', Node('price_momentum_oscillator', {}, [], {'pmo': 'pmo', 'pmo_signal': 'signal'})),
+    ('dpo', Node('detrended_price_oscillator', {}, ['sma_close_20'], {'dpo': None})),
+    ('ease_of_movement', Node('ease_of_movement', {}, [], {'ease_of_movement': None})),
+    ('force_index', Node('force_index', {}, [], {'force_index': None})),
+    ('kst', Node('know_sure_thing', {}, ['roc_10', 'roc_15', 'roc', 'roc_30'], {'kst': 'kst', 'kst_signal': 'signal'})),
+    ('mass_index', Node('mass_index', {}, ['high_low_spread'], {'mass_index': None})),
+    ('macd', Node('moving_avg_converge_diverge', {}, ['ema_close_12', 'ema_close_26'], {
+        'macd': 'macd', 'macd_signal': 'signal', 'macd_hist': 'hist'
+    })),
+    ('money_flow_index', Node('money_flow_index', {}, ['typical_price'], {'money_flow_index': None})),
+    ('nvi', Node('negative_volume_index', {}, ['returns'], {'nvi': 'nvi', 'nvi_signal': 'signal'})),
+    ('obv', Node('on_balance_volume', {}, [], {'obv': None})),
+    ('ppo', Node('percentage_price_oscillator', {}, ['ema_close_12', 'ema_close_26'], {
+        'ppo': 'ppo', 'ppo_signal': 'signal', 'ppo_hist': 'hist'
+    })),
+    ('pvo', Node('percentage_volume_oscillator', {}, ['ema_volume_12', 'ema_volume_26'], {
+        'pvo': 'pvo', 'pvo_signal': 'signal', 'pvo_hist': 'hist'
+    })),
+    ('rsi', Node('relative_strength_index', {}, [], {'rsi': None})),
+    ('sctr', Node('stock_charts_tech_ranks', {}, ['roc_125', 'roc', 'ppo', 'rsi'], {'sctr': None})),
+    ('slope', Node('slope', {}, [], {'s': None})),
+    ('volatility', Node('volatility', {}, ['std_close_20'], {'volatility': None})),
+    ('stochastic_oscillator', Node('stochastic_oscillator', {}, ['channel_20'], {
+        '%k_stochastic_oscillator': 'k', '%d_stochastic_oscillator': 'd'
+    })),
+    ('stochastic_rsi', Node('stochastic_rsi', {}, ['rsi_20'], {'stochastic_rsi': None})),
+    ('trix', Node('trix', {}, [], {'trix': None})),
+    ('tsi', Node('true_strength_index', {}, [], {'tsi': None})),
+    ('ulcer_index', Node('ulcer_index', {}, [], {'ulcer_index': None})),
+    ('ultimate_oscillator', Node('ultimate_oscillator', {}, [], {'ultimate_oscillator': None})),
+    ('vortex', Node('vortex', {}, ['high_low_spread'], {'+vortex': '+', '-vortex': '-'})),
+    ('william_percent_r', Node('william_percent_r', {}, ['channel_14'], {'william_percent_r': None})),
+])
+
+INDICATOR_COLUMNS = {column: name for name, node in INDICATOR_GRAPH.items() for column in node.outputs}
+
+def plan_indicators(columns=None):
+    """
+    Return the names of the graph nodes needed for the indicator columns, defaults to all columns. Every node appears once,
+    after all of its inputs.
+    """
+    columns = INDICATOR_COLUMNS.keys() if columns is None else columns
+    plan = []
+
+    def visit(name):
+        """
+        Add a node to the plan after its inputs.
+        """
+        if name not in plan:
+            for dependency in INDICATOR_GRAPH[name].inputs:
+                visit(dependency)
+            plan.append(name)
+
+    for column in columns:
+        if column not in INDICATOR_COLUMNS:
+            raise KeyError('Unknown indicator column: {}'.format(column))
+        visit(INDICATOR_COLUMNS[column])
+    return plan
+
 # General Asse Class
 # ------------------------------------------------------------------------------------------------------------------------------
 class Asset(object):
@@ -177,11 +502,26 @@ class Asset(object):
     """
     # pylint: enable=line-too-long
 
-    def __init__(self, data=None, market_cap=1.0):
-        """
-        Create an asset, with string symbol and pandas.Series of price data.
-        """
-        self.symbol = data.index.name
+    def __init__(self, data=None, market_cap=1.0, cache_size=0, storage='frame', dtype=np.float64):
+        """
+        Create an asset, with string symbol and pandas.Series of price data. A cache_size > 0 keeps up to that many indicator
+        results in a least recently used cache, each call returns its own copy. storage='compact' holds the price data as CompactOCHLV arrays of dtype instead
+        of a pandas.DataFrame. data may also be CompactOCHLV, which is held as it is.
+        """
+        # pylint: disable=too-many-arguments
+        if isinstance(data, CompactOCHLV):
+            storage, dtype = 'compact', data.dtype
+        self._storage = storage
+        self._dtype = dtype
+        self._intermediates = None
+        self._cache = collections.OrderedDict()
+        self._cache_size = cache_size
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._data_version = 0
+        self._data = None
+        self._running_stats = None
+        self.symbol = data.name if isinstance(data, CompactOCHLV) else data.index.name
         self.data = data
         self.market_cap = market_cap
         self.stats = {}
@@ -194,11 +534,18 @@ class Asset(object):
 
     # Summary stats
     # --------------------------------------------------------------------------------------------------------------------------
-    def calc_stats(self, yearly_risk_free_return=RISK_FREE_RATE):
+    def calc_stats(self, yearly_risk_free_return=RISK_FREE_RATE, full=False):
         """
-        Calculate common statistics for this asset.
+        Calculate common statistics for this asset. Running accumulators are kept between calls, so after append only the
+        new days are added. full=True recomputes everything from the price history.
         """
         # pylint: disable=too-many-statements
+        if not full:
+            if self._running_stats is None:
+                self._running_stats = RunningStats()
+            self._running_stats.extend(self.close[self._running_stats.bars:])
+            self.stats = self._running_stats.stats(yearly_risk_free_return, self.symbol, self.market_cap)
+            return self
 
         monthly_risk_free_return = (np.power(1 + yearly_risk_free_return, 1.0 / MONTHS_IN_YEAR) - 1.0) * MONTHS_IN_YEAR
         daily_risk_free_return = (np.power(1 + yearly_risk_free_return, 1.0 / DAYS_IN_TRADING_YEAR) - 1.0) * DAYS_IN_TRADING_YEAR
@@ -501,21 +848,82 @@ class Asset(object):
 
     # Class Helper Functions
     # --------------------------------------------------------------------------------------------------------------------------
+    def append(self, data):
+        """
+        Append rows of price data, invalidating cached results. Running stats are kept when the rows follow the last date.
+        """
+        running_stats = self._running_stats
+        follows = len(data) and len(self.close) and data.index[0] > self.close.index[-1]
+        self.data = pd.concat([self.data, data])
+        self._running_stats = running_stats if follows else None
+
+    def memory_usage(self):
+        """
+        Return bytes held by the price data and its date index.
+        """
+        if self._storage == 'compact':
+            return self._data.nbytes
+        return self._data.memory_usage(index=True).sum()
+
+    def set_cache_size(self, cache_size):
+        """
+        Set the maximum number of cached results, evicting the least recently used. 0 disables the cache.
+        """
+        self._cache_size = cache_size
+        while len(self._cache) > cache_size:
+            self._cache.popitem(last=False)
+
+    def cache_info(self):
+        """
+        Return cache hits, misses, maximum size and current size.
+        """
+        return CacheInfo(self._cache_hits, self._cache_misses, self._cache_size, len(self._cache))
+
+    def cache_clear(self):
+        """
+        Clear cached results and statistics.
+        """
+        self._cache.clear()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
     def describe(self):
         """
         Wrapper for pandas describe().
         """
         self.data.describe()
 
-    def time_range(self, start=None, end=datetime.date.today(), freq='B'):
+    def time_range(self, start=None, end=None):
         """
-        Return a specific time range of the Asset.
+        Return the Asset from date start to date end, inclusive (None for the first or last date). start may instead be a
+        number of trading days ending at end. Bounds are found with searchsorted on the sorted dates and the result is a view
+        sharing this asset's price arrays, so slicing is O(log n) and copies no data. Do not modify the view's data in place.
         """
-        if isinstance(start, datetime.date) and isinstance(end, datetime.date):
-            date_range = pd.date_range(start, end, freq=freq)
+        dates = self._data.index.asi8
+        stop = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end).value, side='right')
+        if start is None:
+            first = 0
+        elif isinstance(start, (int, long, np.integer)):
+            first = max(stop - start, 0)
         else:
-            date_range = pd.date_range(end - datetime.timedelta(days=start), periods=start, freq=freq)
-            return Asset(self.symbol, self.data.loc[date_range])
+            first = dates.searchsorted(pd.Timestamp(start).value, side='left')
+        return self._view(first, stop)
+
+    def _view(self, start, stop):
+        """
+        Return an Asset of rows start to stop sharing this asset's price arrays, with its own cache and stats.
+        """
+        # pylint: disable=protected-access
+        view = copy.copy(self)
+        view._data = self._data.view(start, stop) if self._storage == 'compact' else self._data.iloc[start:stop]
+        view._intermediates = None
+        view._cache = collections.OrderedDict()
+        view._cache_hits = 0
+        view._cache_misses = 0
+        view._data_version = 0
+        view._running_stats = None
+        view.stats = {}
+        return view
 
     def plot(self):
         """
@@ -539,6 +947,28 @@ class Asset(object):
 
     # Bring underlying data to class properties
     # --------------------------------------------------------------------------------------------------------------------------
+    @property
+    def data(self):
+        """
+        Return OCHLV price data of asset, a copy when stored compact.
+        """
+        if self._storage == 'compact':
+            return self._data.to_frame()
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        """
+        Replace the price data of asset, invalidating cached results.
+        """
+        if isinstance(data, CompactOCHLV):
+            self._data = data if self._storage == 'compact' else data.to_frame()
+        else:
+            self._data = CompactOCHLV(data, self._dtype) if self._storage == 'compact' else data
+        self._data_version += 1
+        self._cache.clear()
+        self._running_stats = None
+
     @property
     def number_of_days(self):
         """
@@ -551,7 +981,7 @@ class Asset(object):
         """
         Return closing price of asset.
         """
-        return self.data['Close']
+        return self._data['Close']
 
     @property
     def c(self):
@@ -565,7 +995,7 @@ class Asset(object):
         """
         Return adjusted closing price of asset.
         """
-        return self.data['Adj_Close']
+        return self._data['Adj_Close']
 
     @property
     def ac(self):
@@ -579,7 +1009,7 @@ class Asset(object):
         """
         Return opening price of asset.
         """
-        return self.data['Open']
+        return self._data['Open']
 
     @property
     def o(self):
@@ -593,7 +1023,7 @@ class Asset(object):
         """
         Return high price of asset.
         """
-        return self.data['High']
+        return self._data['High']
 
     @property
     def h(self):
@@ -607,7 +1037,7 @@ class Asset(object):
         """
         Return low price of asset.
         """
-        return self.data['Low']
+        return self._data['Low']
 
     @property
     def l(self):
@@ -621,7 +1051,7 @@ class Asset(object):
         """
         Return volume of asset.
         """
-        return self.data['Volume']
+        return self._data['Volume']
 
     @property
     def v(self):
@@ -632,6 +1062,7 @@ class Asset(object):
 
     # Common Price Transformations
     # --------------------------------------------------------------------------------------------------------------------------
+    @cached
     def money_flow(self):
         """
         Calculate money flow.
@@ -641,6 +1072,7 @@ class Asset(object):
         """
         return ((self.close - self.low) - (self.high - self.close)) / (self.high - self.low)
 
+    @cached
     def money_flow_volume(self):
         """
         Calculate money flow volume.
@@ -648,6 +1080,7 @@ class Asset(object):
         """
         return self.money_flow() * self.volume
 
+    @cached
     def typical_price(self):
         """
         Calculate typical price.
@@ -657,6 +1090,7 @@ class Asset(object):
         """
         return (self.high + self.low + self.close) / 3.0
 
+    @cached
     def close_to_open_range(self):
         """
         Calculate close to open range.
@@ -664,6 +1098,7 @@ class Asset(object):
         """
         return self.open - self.close.shift(1)
 
+    @cached
     def quadrant_range(self):
         """
         Calculate quandrant range.
@@ -675,8 +1110,9 @@ class Asset(object):
         l3 = l2 + size
         l4 = l3 + size
         l5 = l4 + size
-        return pd.DataFrame({'1': l1, '2': l2, '3': l3, '4': l4, '5': l5})
+        return combine({'1': l1, '2': l2, '3': l3, '4': l4, '5': l5})
 
+    @cached
     def true_range(self):
         """
         Calculate true range.
@@ -684,6 +1120,7 @@ class Asset(object):
         """
         return self.high - self.low.shift(1)
 
+    @cached
     def high_low_spread(self):
         """
         Calculate high low spread.
@@ -691,6 +1128,7 @@ class Asset(object):
         """
         return self.high - self.low
 
+    @cached
     def rate_of_change(self, n=20):
         """
         Calculate rate of change.
@@ -709,6 +1147,7 @@ class Asset(object):
         """
         return self.rate_of_change(n)
 
+    @cached
     def drawdown(self):
         """
         Calucate the drawdown from the highest high.
@@ -727,133 +1166,122 @@ class Asset(object):
         draw_down = (draw_down / highest_high) - 1.0
         return draw_down
 
+    @cached
     def drawdown_info(self):
         """
         Return table of drawdown data.
         """
-        drawdown = self.drawdown()
-        is_zero = drawdown == 0
+        return calc_drawdown_info(self.drawdown())
 
-        # Find start and end time
-        start = ~is_zero & is_zero.shift(1)
-        start = list(start[start].index)
-        end = is_zero & (~is_zero).shift(1)
-        end = list(end[end].index)
-
-        # Handle no ending
-        if len(end) is 0:
-            end.append(drawdown.index[-1])
+    # Shared Intermediates
+    # --------------------------------------------------------------------------------------------------------------------------
+    @cached
+    def _ema(self, field='close', n=20):
+        """
+        Exponential moving average of a price field.
+        """
+        return ema(getattr(self, field), n)
 
-        # Handle startingin drawdown
-        if start[0] > end[0]:
-            start.insert(0, drawdown.index[0])
+    @cached
+    def _sma(self, field='close', n=20):
+        """
+        Simple moving average of a price field.
+        """
+        return sma(getattr(self, field), n)
 
-        # Handle finishing with drawdown
-        if start[-1] > end[-1]:
-            end.append(drawdown.index[-1])
+    @cached
+    def _rolling_std(self, field='close', n=20):
+        """
+        Rolling standard deviation of a price field.
+        """
+        return pd.rolling_std(getattr(self, field), n)
 
-        info = pd.DataFrame({
-            'start': start,
-            'end'  : end,
-            'days' : [(e - s).days for s, e in zip(start, end)],
-            'drawdown':[drawdown[s:e].min() for s, e in zip(start, end)]
-        })
+    @cached
+    def _channel(self, n=20, min_periods=None):
+        """
+        Highest high and lowest low over the last n days, as a tuple (n_day_high, n_day_low).
+        """
+        n_day_high, n_day_low, _, _ = rolling_extrema(self.high, n, self.low, min_periods)
+        return n_day_high, n_day_low
 
-        return info
+    @cached
+    def _channel_positions(self, n=20, min_periods=None):
+        """
+        Highest high and lowest low over the last n days with the bars since each, from one rolling extrema pass, as a tuple
+        (n_day_high, n_day_low, days_since_high, days_since_low).
+        """
+        n_day_high, n_day_low, argmax, argmin = rolling_extrema(self.high, n, self.low, min_periods)
+        return n_day_high, n_day_low, bars_since(argmax), bars_since(argmin)
 
     # Overlays
     # --------------------------------------------------------------------------------------------------------------------------
+    @cached
     def bollinger_bands(self, n=20, k=2):
         """
         Calculate Bollinger Bands.
         """
-        ma = pd.rolling_mean(self.close, n)
-        ub = ma + k * pd.rolling_std(self.close, n)
-        lb = ma - k * pd.rolling_std(self.close, n)
-        return pd.DataFrame({'ub': ub, 'mb': ma, 'lb': lb})
+        ma = self._sma('close', n)
+        sd = self._rolling_std('close', n)
+        ub = ma + k * sd
+        lb = ma - k * sd
+        return combine({'ub': ub, 'mb': ma, 'lb': lb})
 
+    @cached
     def chandelier_exit(self, n=22, k=3):
         """
         Calculate Chandelier Exit.
         """
         atr = self.atr(n)
-        n_day_high = pd.rolling_max(self.high, n)
-        n_day_low = pd.rolling_min(self.low, n)
+        n_day_high, n_day_low = self._channel(n)
         chdlr_exit_long = n_day_high - k * atr
         chdlr_exit_short = n_day_low  - k * atr
-        return pd.DataFrame({'long': chdlr_exit_long, 'short': chdlr_exit_short})
+        return combine({'long': chdlr_exit_long, 'short': chdlr_exit_short})
 
+    @cached
     def ichimoku_clouds(self, n1=9, n2=26, n3=52):
         """
         Calculate Ichimoku Clouds.
         """
-        high = self.high
-        low = self.low
-        conversion = (pd.rolling_max(high, n1) + pd.rolling_min(low, n1)) / 2.0
-        base = (pd.rolling_max(high, n2) + pd.rolling_min(low, n2)) / 2.0
+        n1_high, n1_low = self._channel(n1)
+        n2_high, n2_low = self._channel(n2)
+        n3_high, n3_low = self._channel(n3)
+        conversion = (n1_high + n1_low) / 2.0
+        base = (n2_high + n2_low) / 2.0
         leading_a = (conversion + base) / 2.0
-        leading_b = (pd.rolling_max(high, n3) + pd.rolling_min(low, n3)) / 2.0
+        leading_b = (n3_high + n3_low) / 2.0
         lagging = self.close.shift(-n2)
-        return pd.DataFrame({'conversion' : conversion, 'base': base, 'leadA': leading_a, 'leadB': leading_b, 'lag': lagging})
+        return combine({'conversion' : conversion, 'base': base, 'leadA': leading_a, 'leadB': leading_b, 'lag': lagging})
 
+    @cached
     def keltner_channels(self, n=20, natr=10):
         """
         Calculate Keltner Channels.
         """
         atr = self.atr(natr)
-        ml = ema(self.close, n)
+        ml = self._ema('close', n)
         ul = ml + 2.0 * atr
         ll = ml - 2.0 * atr
-        return pd.DataFrame({'ul': ul, 'ml': ml, 'll': ll})
+        return combine({'ul': ul, 'ml': ml, 'll': ll})
 
+    @cached
     def moving_average_envelopes(self, n=20, k=0.025):
         """
         Calculate Moving Average Envelopes.
         """
-        close = self.close
-        ma = sma(close, n)
+        ma = self._sma('close', n)
         uma = ma + (k * ma)
         lma = ma - (k * ma)
-        return pd.DataFrame({'uma': uma, 'ma': ma, 'lma': lma})
+        return combine({'uma': uma, 'ma': ma, 'lma': lma})
 
+    @cached
     def parabolic_sar(self, step_r=0.02, step_f=0.02, max_af_r=0.2, max_af_f=0.2):
         """
         Calculate Parabolic SAR.
         """
-        high = self.high
-        low = self.low
-        r_sar = pd.TimeSeries(np.zeros(len(high)), index=high.index)
-        f_sar = pd.TimeSeries(np.zeros(len(high)), index=high.index)
-        ep = high[0]
-        af = step_r
-        sar = low[0]
-        up = True
-
-        for i in range(1, len(high)):
-            if up:
-                # Rising SAR
-                ep = np.max([ep, high[i]])
-                af = np.min([af + step_r if (ep == high[i]) else af, max_af_r])
-                sar = sar + af * (ep - sar)
-                r_sar[i] = sar
-            else:
-                # Falling SAR
-                ep = np.min([ep, low[i]])
-                af = np.min([af + step_f if (ep == low[i]) else af, max_af_f])
-                sar = sar + af * (ep - sar)
-                f_sar[i] = sar
-            # Trend switch
-            if up and (sar > low[i] or sar > high[i]):
-                up = False
-                sar = ep
-                af = step_f
-            elif not up and (sar < low[i] or sar < high[i]):
-                up = True
-                sar = ep
-                af = step_r
-
-        return pd.DataFrame({'rising' : r_sar, 'falling': f_sar})
+        r_sar, f_sar = psar(self.high, self.low, step_r, step_f, max_af_r, max_af_f, first_valid(self.close))
+        return combine({'rising' : r_sar, 'falling': f_sar})
 
+    @cached
     def pivot_point(self):
         """
         Calculate pivot point
@@ -864,8 +1292,9 @@ class Asset(object):
         s2 = p - hl
         r1 = (2.0 * p) - self.low
         r2 = p + hl
-        return pd.DataFrame({'p': p, 's1': s1, 's2': s2, 'r1': r1, 'r2': r2})
+        return combine({'p': p, 's1': s1, 's2': s2, 'r1': r1, 'r2': r2})
 
+    @cached
     def fibonacci_pivot_point(self):
         """
         Calculate Fibonacci Pivot Point.
@@ -878,56 +1307,40 @@ class Asset(object):
         r1 = p + 0.382 * hl
         r2 = p + 0.618 * hl
         r3 = p + 1.0 * hl
-        return pd.DataFrame({'p': p, 's1': s1, 's2': s2, 's3': s3, 'r1': r1, 'r2': r2, 'r3': r3})
+        return combine({'p': p, 's1': s1, 's2': s2, 's3': s3, 'r1': r1, 'r2': r2, 'r3': r3})
 
+    @cached
     def demark_pivot_point(self):
         """
         Calculate Demark Pivot Point.
         """
-        h_l_c = self.close < self.open
-        h_lc = self.close > self.open
-        hl_c = self.close == self.open
-        p = np.zeros(len(self.close))
-        p[h_l_c] = self.high[h_l_c] + 2.0 * self.low[h_l_c] + self.close[h_l_c]
-        p[h_lc] = 2.0 * self.high[h_lc] + self.low[h_lc] + self.close[h_lc]
-        p[hl_c] = self.high[hl_c] + self.low[hl_c] + 2.0 * self.close[hl_c]
+        high, low, close, open_ = self.high, self.low, self.close, self.open
+        p = (high + 2.0 * low + close).where(close < open_, 0.0)
+        p = (2.0 * high + low + close).where(close > open_, p)
+        p = (high + low + 2.0 * close).where(close == open_, p)
         s1 = p / 2.0 - self.high
         r1 = p / 2.0 - self.low
         p = p / 4.0
-        return pd.DataFrame({'p': p, 's1': s1, 'r1': r1})
+        return combine({'p': p, 's1': s1, 'r1': r1})
 
+    @cached
     def price_channel(self, n=20):
         """
         Calculate Price Channel.
         """
-        n_day_high = pd.rolling_max(self.high, n)
-        n_day_low = pd.rolling_min(self.low, n)
+        n_day_high, n_day_low = self._channel(n)
         center = (n_day_high + n_day_low) / 2.0
-        return pd.DataFrame({'high': n_day_high, 'low': n_day_low, 'center': center})
+        return combine({'high': n_day_high, 'low': n_day_low, 'center': center})
 
+    @cached
     def volume_by_price(self, n=14, block_num=12):
         """
         Calculate Volume by Price.
         """
-        close = self.close
-        volume = self.volume
-        nday_closing_high = pd.rolling_max(close, n).bfill()
-        nday_closing_low = pd.rolling_min(close, n).bfill()
-        # Compute price blocks: rolling high low range in block number steps
-        price_blocks = pd.SpareSeries()
-        for low, high, in zip(nday_closing_low, nday_closing_high):
-            price_blocks = price_blocks.append(pd.DataFrame(np.linspace(low, high, block_num)).T)
-        price_blocks = price_blocks.set_index(close.index)
-        # Find correct block for each price, then tally that days volume
-        volume_by_price = pd.DataFrame(np.zeros((close.shape[0], block_num)))
-        for j in range(n-1, close.shape[0]):
-            for i, c in enumerate(close[j-(n-1):j+1]):
-                block = (price_blocks.iloc[i, :] <= c).sum() - 1.0
-                block = 0 if block < 0 else block
-                volume_by_price.iloc[j, block] = volume[i] + volume_by_price.iloc[j, block]
-        volume_by_price = volume_by_price.set_index(close.index)
-        return volume_by_price
+        profile = volume_profile(self.close, self.volume, n, block_num)
+        return combine({block: like(self.close, profile[..., block]) for block in xrange(block_num)})
 
+    @cached
     def volume_weighted_average_price(self):
         """
         Calculate Volume Weighted Average Price (VWAP)."""
@@ -937,24 +1350,19 @@ class Asset(object):
         """Alias for volume_weighted_average_price()."""
         return self.volume_weighted_average_price()
 
-    def zigzag(self, percent=7.0):
+    @cached
+    def zigzag(self, percent=7.0, pivots=False):
         """
-        Calculate Zigzag.
+        Calculate Zigzag. With pivots, also return the pivot list of date, price and direction, as a tuple (zigzag, pivots).
         """
         x = self.close
-        zigzag = pd.TimeSeries(np.zeros(self.number_of_days), index=x.index)
-        lastzig = x[0]
-        zigzag[0] = x[0]
-        for i in range(1, self.number_of_days):
-            if np.abs((lastzig - x[i]) / x[i]) > percent / 100.0:
-                zigzag[i] = x[i]
-                lastzig = x[i]
-            else:
-                zigzag[i] = None
-        return pd.Series.interpolate(zigzag)
+        is_pivot = zigzag_pivots(x, percent, first_valid(x))
+        zigzag = zigzag_line(x, is_pivot)
+        return (zigzag, zigzag_pivot_list(x, is_pivot)) if pivots else zigzag
 
     # Indicators
     # --------------------------------------------------------------------------------------------------------------------------
+    @cached
     def accumulation_distribution_line(self):
         """
         Calculate Aaccumulation Distribution Line (ADL).
@@ -966,49 +1374,37 @@ class Asset(object):
         """
         return self.accumulation_distribution_line()
 
+    @cached
     def aroon(self, n=25):
         """
         Calculate aroon.
         """
-        high = self.high
-        n_day_high = pd.rolling_max(high, n, 0)
-        highs = high[high == n_day_high]
-        time_since_last_max = (highs.index.values[1:] - highs.index.values[0:-1]).astype('timedelta64[D]').astype(int)
-        day_b4_high = (high == n_day_high).shift(-1).fillna(False)
-        days_since_high = pd.TimeSeries(np.nan + np.ones(len(high)), index=high.index)
-        days_since_high[day_b4_high] = time_since_last_max
-        days_since_high[high == n_day_high] = 0.0
-        days_since_high = days_since_high.interpolate('time').astype(int).clip_upper(n)
-        low = self.low
-        n_day_low = pd.rolling_min(low, n, 0)
-        lows = low[low == n_day_low]
-        time_since_last_min = (lows.index.values[1:] - lows.index.values[0:-1]).astype('timedelta64[D]').astype(int)
-        day_b4_low = (low == n_day_low).shift(-1).fillna(False)
-        days_since_low = pd.TimeSeries(np.nan + np.ones(len(low)), index=low.index)
-        days_since_low[day_b4_low] = time_since_last_min
-        days_since_low[low == n_day_low] = 0.0
-        days_since_low = days_since_low.interpolate('time').astype(int).clip_upper(n)
+        # Look back over n + 1 bars, so the bars since the high and low run from 0 to n and aroon from 100 to 0
+        _, _, days_since_high, days_since_low = self._channel_positions(n + 1, min_periods=0)
         aroon_up = 100.0 * ((n - days_since_high) / n)
         aroon_dn = 100.0 * ((n - days_since_low) / n)
         aroon_osc = aroon_up - aroon_dn
-        return pd.DataFrame({'up': aroon_up, 'down': aroon_dn, 'oscillator': aroon_osc})
+        return combine({'up': aroon_up, 'down': aroon_dn, 'oscillator': aroon_osc})
 
+    @cached
     def average_directional_index(self, n=14):
         """
         Calculate Average Directional Index (ADX).
         """
         tr = self.true_range()
-        pdm = pd.TimeSeries(np.zeros(len(tr)), index=tr.index)
-        ndm = pd.TimeSeries(np.zeros(len(tr)), index=tr.index)
-        pdm[(self.high - self.high.shift(1)) > (self.low.shift(1) - self.low)] = (self.high - self.high.shift(1))
-        ndm[(self.low.shift(1) - self.low) > (self.high - self.high.shift(1))] = (self.low.shift(1) - self.low)
-        trn = ema(tr, n)
-        pdmn = ema(pdm, n)
-        ndmn = ema(ndm, n)
+        up_move = self.high - self.high.shift(1)
+        down_move = self.low.shift(1) - self.low
+        pdm = up_move.where(up_move > down_move, 0.0)
+        ndm = down_move.where(down_move > up_move, 0.0)
+        start = first_valid(self.close)
+        trn = wilder_smooth(tr, n, start)
+        pdmn = wilder_smooth(pdm, n, start)
+        ndmn = wilder_smooth(ndm, n, start)
         pdin = pdmn / trn
         ndin = ndmn / trn
         dx = ((pdin - ndin) / (pdin + ndin)).abs()
-        adx = ((n-1) * dx.shift(1) + dx) / n
+        # dx is only defined once the directional movement is seeded, smooth from there
+        adx = wilder_smooth(dx, n, start + n)
         return adx
     def adx(self, n=14):
         """
@@ -1016,20 +1412,19 @@ class Asset(object):
         """
         return self.average_directional_index(n)
 
+    @cached
     def average_true_range(self, n=14):
         """
-        Calculate Average True Range.
-        !!!!!this is not a 100% correct - redo!!!!!
+        Calculate Average True Range, Wilder smoothed over n days.
         """
-        tr = self.true_range()
-        return ((n-1) * tr.shift(1) + tr) / n
+        return wilder_smooth(self.true_range(), n, first_valid(self.close))
     def atr(self, n=14):
         """
         Alias foraverage_true_range().
-        !!!!!this is not a 100% correct - redo!!!!!
         """
         return self.average_true_range(n)
 
+    @cached
     def bandwidth(self, n=20, k=2):
         """
         Calculate Bandwidth.
@@ -1037,6 +1432,7 @@ class Asset(object):
         bb = self.bollinger_bands(n, k)
         return (bb['ub'] - bb['lb']) / bb['mb']
 
+    @cached
     def percent_b(self, n=20, k=2):
         """
         Calculate Percent B.
@@ -1044,6 +1440,7 @@ class Asset(object):
         bb = self.bollinger_bands(n, k)
         return (self.close.shift(1) - bb['lb']) / (bb['ub'] - bb['lb'])
 
+    @cached
     def commodity_channel_index(self, n=20):
         """
         Calculate Commodity Channel Index (CCI).
@@ -1056,53 +1453,59 @@ class Asset(object):
         """
         return self.commodity_channel_index(n)
 
+    @cached
     def coppock_curve(self, n1=10, n2=14, n3=11):
         """
-        Calculate Coppock Curve.
-        !!!!!fix!!!!!
+        Calculate Coppock Curve, the n1 day weighted moving average of the sum of the n2 and n3 day rates of change.
         """
-        window = range(n1)
-        return pd.rolling_window(self.roc(n2), window) + self.roc(n3)
+        return wma(self.roc(n2) + self.roc(n3), n1)
 
+    @cached
     def chaikin_money_flow(self, n=20):
         """
         Calculate Chaikin Money Flow.
         """
-        return pd.rolling_sum((self.money_flow_volume()), n) / pd.rolling_sum(self.volume, n)
+        [mfv_sum], [volume_sum] = rolling_sums([self.money_flow_volume(), self.volume], [n])
+        return mfv_sum / volume_sum
     def cmf(self, n=20):
         """Alias for chaikin_money_flow()."""
         return self.chaikin_money_flow(n)
 
+    @cached
     def chaikin_oscillator(self, n1=3, n2=10):
         """
         Calculate Chaikin Oscillator.
         """
-        return ema(self.adl(), n1) - ema(self.adl(), n2)
+        adl = self.adl()
+        return ema(adl, n1) - ema(adl, n2)
 
+    @cached
     def price_momentum_oscillator(self, n1=20, n2=35, n3=10):
         """
         Calculate Price Momentum Oscillator (PMO).
         """
         pmo = ema(10 * ema((100 * (self.close / self.close.shift(1))) - 100.0, n2), n1)
         signal = ema(pmo, n3)
-        return pd.DataFrame({'pmo': pmo, 'signal': signal})
+        return combine({'pmo': pmo, 'signal': signal})
     def pmo(self, n1=20, n2=35, n3=10):
         """
         Alias for price_momentum_oscillator().
         """
         return self.price_momentum_oscillator(n1, n2, n3)
 
+    @cached
     def detrended_price_oscillator(self, n=20):
         """
         Calculate Detrended Price Oscillator (DPO).
         """
-        return self.close.shift(int(n / 2.0 + 1.0)) - sma(self.close, n)
+        return self.close.shift(int(n / 2.0 + 1.0)) - self._sma('close', n)
     def dpo(self, n=20):
         """
         Alias for detrended_price_oscillator().
         """
         return self.detrended_price_oscillator(n)
 
+    @cached
     def ease_of_movement(self, n=14):
         """
         Calculate Ease Of Movement.
@@ -1113,6 +1516,7 @@ class Asset(object):
         emv = distance_moved / box_ratio
         return sma(emv, n)
 
+    @cached
     def force_index(self, n=13):
         """
         Calculate Force Index.
@@ -1120,6 +1524,7 @@ class Asset(object):
         force_index = self.close - self.close.shift(1) * self.volume
         return ema(force_index, n)
 
+    @cached
     def know_sure_thing(self, n_sig=9):
         """
         Calculate Know Sure Thing.
@@ -1130,13 +1535,14 @@ class Asset(object):
         rcma4 = sma(self.roc(30), 15)
         kst = rcma1 + 2.0 * rcma2 + 3.0 * rcma3 + 4.0 * rcma4
         kst_signal = sma(kst, n_sig)
-        return pd.DataFrame({'kst': kst, 'signal': kst_signal})
+        return combine({'kst': kst, 'signal': kst_signal})
     def kst(self, n_sig=9):
         """
         Alias for know_sure_thing().
         """
         return self.know_sure_thing(n_sig)
 
+    @cached
     def mass_index(self, n1=9, n2=25):
         """
         Calculate Mass Index.
@@ -1144,52 +1550,54 @@ class Asset(object):
         ema1 = ema(self.high_low_spread(), n1)
         ema2 = ema(ema1, n1)
         ema_ratio = ema1 / ema2
-        return pd.rolling_sum(ema_ratio, n2)
+        [mass], = rolling_sums([ema_ratio], [n2])
+        return mass
 
+    @cached
     def moving_avg_converge_diverge(self, sn=26, fn=12, n_sig=9):
         """
         Calculate moving avgerage convergence divergence (MACD).
         """
-        macd = ema(self.close, fn) - ema(self.close, sn)
+        macd = self._ema('close', fn) - self._ema('close', sn)
         macd_signal = ema(macd, n_sig)
         macd_hist = macd - macd_signal
-        return pd.DataFrame({'macd': macd, 'signal': macd_signal, 'hist': macd_hist})
+        return combine({'macd': macd, 'signal': macd_signal, 'hist': macd_hist})
     def macd(self, sn=26, fn=12, n_sig=9):
         """
         Alias for moving_avg_converge_diverge().
         """
         return self.moving_avg_converge_diverge(sn, fn, n_sig)
 
+    @cached
     def money_flow_index(self, n=14):
         """
         Calculate Money Flow Index.
         """
         tp = self.typical_price()
-        rmf = tp * self.volume
-        pmf = rmf.copy()
-        nmf = rmf.copy()
-        pmf[pmf < 0] = 0.0
-        nmf[nmf > 0] = 0.0
-        mfr = pd.rolling_sum(pmf, n) / pd.rolling_sum(nmf, n)
+        rmf = (tp * self.volume).values
+        [pmf_sum], [nmf_sum] = rolling_sums([np.maximum(rmf, 0.0), np.minimum(rmf, 0.0)], [n])
+        mfr = like(tp, pmf_sum / nmf_sum)
         return 100.0 - (100.0 / (1.0 + mfr))
 
+    @cached
     def negative_volume_index(self, n=255):
         """
         Calculate Negative Volume Index.
         """
         pct_change = self.returns().cumsum()
         # forward fill when volumes increase with last percent change of a volume decrease day
-        pct_change[self.volume > self.volume.shift(1)] = None
+        pct_change[self.volume > self.volume.shift(1)] = np.nan
         pct_change = pct_change.ffill()
         nvi = 1000.0 + pct_change
         nvi_signal = ema(nvi, n)
-        return pd.DataFrame({'nvi': nvi, 'signal': nvi_signal})
+        return combine({'nvi': nvi, 'signal': nvi_signal})
     def nvi(self, n=255):
         """
         Alias for negative_volume_index().
         """
         return self.negative_volume_index(n)
 
+    @cached
     def on_balance_volume(self):
         """
         Calculate On Balance Volume.
@@ -1198,61 +1606,59 @@ class Asset(object):
         n_obv = (-1.0 * p_obv.copy())
         p_obv[self.close < self.close.shift(1)] = 0.0
         n_obv[self.close > self.close.shift(1)] = 0.0
-        p_obv[self.close == self.close.shift(1)] = None
-        n_obv[self.close == self.close.shift(1)] = None
+        p_obv[self.close == self.close.shift(1)] = np.nan
+        n_obv[self.close == self.close.shift(1)] = np.nan
         obv = p_obv + n_obv
         return obv.ffill().cumsum()
     def obv(self):
         """
         Alias for on_balance_volume().
         """
-        return self.on_balance_volume
+        return self.on_balance_volume()
 
+    @cached
     def percentage_price_oscillator(self, n1=12, n2=26, n3=9):
         """
         Calculate Percentage Price Oscillator.
         """
-        ppo = 100.0 * (ema(self.close, n1) - ema(self.close, n2)) / ema(self.close, n2)
+        slow = self._ema('close', n2)
+        ppo = 100.0 * (self._ema('close', n1) - slow) / slow
         ppo_signal = ema(ppo, n3)
         ppo_hist = ppo - ppo_signal
-        return pd.DataFrame({'ppo': ppo, 'signal': ppo_signal, 'hist': ppo_hist})
+        return combine({'ppo': ppo, 'signal': ppo_signal, 'hist': ppo_hist})
     def ppo(self, n1=12, n2=26, n3=9):
         """
         Alias for percentage_price_oscillator().
         """
         return self.percentage_price_oscillator(n1, n2, n3)
 
+    @cached
     def percentage_volume_oscillator(self, n1=12, n2=26, n3=9):
         """
         Calculate Percentage Volume Oscillator.
         """
-        pvo = 100.0 * (ema(self.volume, n1) - ema(self.volume, n2)) / ema(self.volume, n2)
+        slow = self._ema('volume', n2)
+        pvo = 100.0 * (self._ema('volume', n1) - slow) / slow
         pvo_signal = ema(pvo, n3)
         pvo_hist = pvo - pvo_signal
-        return pd.DataFrame({'pvo': pvo, 'signal': pvo_signal, 'hist': pvo_hist})
+        return combine({'pvo': pvo, 'signal': pvo_signal, 'hist': pvo_hist})
     def pvo(self, n1=12, n2=26, n3=9):
         """
         Alias percentage_volume_oscillator().
         """
         return self.percentage_volume_oscillator(n1, n2, n3)
 
+    @cached
     def relative_strength_index(self, n=14):
         """
         Calculate Relative Strength Index.
         """
         change = self.close - self.close.shift(1)
-        gain = change.copy()
-        loss = change.copy()
-        gain[gain < 0] = 0.0
-        loss[loss > 0] = 0.0
-        loss = -1.0 * loss
-        avg_gain = pd.TimeSeries(np.zeros(len(gain)), index=change.index)
-        avg_loss = pd.TimeSeries(np.zeros(len(loss)), index=change.index)
-        avg_gain[n] = gain[0:n].sum() / n
-        avg_loss[n] = loss[0:n].sum() / n
-        for i in range(n+1, len(gain)):
-            avg_gain[i] = (n-1) * (avg_gain[i-1] / n) + (gain[i] / n)
-            avg_loss[i] = (n-1) * (avg_loss[i-1] / n) + (loss[i] / n)
+        gain = change.clip_lower(0.0)
+        loss = -1.0 * change.clip_upper(0.0)
+        start = first_valid(self.close)
+        avg_gain = wilder_smooth(gain, n, start)
+        avg_loss = wilder_smooth(loss, n, start)
         rs = avg_gain / avg_loss
         return 100.0 - (100.0 / (1.0 + rs))
     def rsi(self, n=14):
@@ -1261,6 +1667,7 @@ class Asset(object):
         """
         return self.relative_strength_index(n)
 
+    @cached
     def stock_charts_tech_ranks(self, n=None, w=None):
         """
         Calculate Stock Charts Tech Ranks/
@@ -1268,9 +1675,9 @@ class Asset(object):
         n = n if n else RANK_DAYS_IN_TRADING_YEAR
         w = w if w else RANK_PERCENTS
         close = self.close
-        long_ma = 100.0 * (1 - close / ema(close, n[0]))
+        long_ma = 100.0 * (1 - close / self._ema('close', n[0]))
         long_roc = self.roc(n[1])
-        medium_ma = 100.0 * (1.0 - close / ema(close, n[2]))
+        medium_ma = 100.0 * (1.0 - close / self._ema('close', n[2]))
         medium_roc = self.roc(n[3])
         ppo = self.ppo()
         short_ppo_m = 100.0 * ((ppo['hist'] - ppo['hist'].shift(n[4])) / n[4]) / 2.0
@@ -1282,38 +1689,41 @@ class Asset(object):
         """
         return self.stock_charts_tech_ranks(n, w)
 
+    @cached
     def slope(self):
         """
         Calculate slope.
         """
         close = self.close
-        return pd.TimeSeries(np.zeros(len(close)), index=close.index)
+        return like(close, np.zeros(close.shape))
 
+    @cached
     def volatility(self, n=20):
         """
         Calculate volatility.
         """
-        return pd.rolling_std(self.close, n)
+        return self._rolling_std('close', n)
 
+    @cached
     def stochastic_oscillator(self, n=20, n1=3):
         """
         Calculate Stochastic Oscillator.
         """
-        n_day_high = pd.rolling_max(self.high, n)
-        n_day_low = pd.rolling_min(self.low, n)
+        n_day_high, n_day_low = self._channel(n)
         percent_k = 100.0 * (self.close - n_day_low) / (n_day_high - n_day_low)
         percent_d = sma(percent_k, n1)
-        return pd.DataFrame({'k': percent_k, 'd': percent_d})
+        return combine({'k': percent_k, 'd': percent_d})
 
+    @cached
     def stochastic_rsi(self, n=20):
         """
         Calculate Stochastic RSI.
         """
         rsi = self.rsi(n)
-        high_rsi = pd.rolling_max(rsi, n)
-        low_rsi = pd.rolling_min(rsi, n)
+        high_rsi, low_rsi, _, _ = rolling_extrema(rsi, n)
         return (rsi - low_rsi) / (high_rsi - low_rsi)
 
+    @cached
     def trix(self, n=15):
         """
         Calculate TRIX.
@@ -1323,6 +1733,7 @@ class Asset(object):
         ema3 = ema(ema2, n)
         return ema3.pct_change()
 
+    @cached
     def true_strength_index(self, n1=25, n2=13):
         """
         Calculate True Strength Index.
@@ -1340,52 +1751,56 @@ class Asset(object):
         """
         return self.true_strength_index(n1, n2)
 
+    @cached
     def ulcer_index(self, n=14):
         """
         Calculate Ulcer Index.
         """
-        percent_draw_down = 100.0 * (self.close - pd.rolling_max(self.close, n)) / pd.rolling_max(self.close, n)
-        return np.sqrt(pd.rolling_sum(percent_draw_down * percent_draw_down, n) / n)
+        n_day_high, _, _, _ = rolling_extrema(self.close, n)
+        percent_draw_down = 100.0 * (self.close - n_day_high) / n_day_high
+        [square_sum], = rolling_sums([percent_draw_down * percent_draw_down], [n])
+        return np.sqrt(square_sum / n)
 
+    @cached
     def ultimate_oscillator(self, n1=7, n2=14, n3=28):
         """
         Calculate Ultimate Oscillator.
         """
-        bp = self.close - pd.DataFrame([self.low, self.close.shift(1)]).min()
-        hc_max = pd.DataFrame({'a': self.high, 'b': self.close.shift(1)}, index=bp.index).max(1)
-        lc_min = pd.DataFrame({'a': self.low, 'b': self.close.shift(1)}, index=bp.index).min(1)
+        last_close = self.close.shift(1)
+        lc_min = like(self.low, np.fmin(self.low.values, last_close.values))
+        hc_max = like(self.high, np.fmax(self.high.values, last_close.values))
+        bp = self.close - lc_min
         tr = hc_max - lc_min
-        a1 = pd.rolling_sum(bp, n1) / pd.rolling_sum(tr, n1)
-        a2 = pd.rolling_sum(bp, n2) / pd.rolling_sum(tr, n2)
-        a3 = pd.rolling_sum(bp, n3) / pd.rolling_sum(tr, n3)
+        bp_sums, tr_sums = rolling_sums([bp, tr], [n1, n2, n3])
+        a1, a2, a3 = [bp_sum / tr_sum for bp_sum, tr_sum in zip(bp_sums, tr_sums)]
         return 100.0 * (4.0 * a1 + 2.0 * a2 + a3) / (4.0 + 2.0 + 1.0)
 
+    @cached
     def vortex(self, n=14):
         """
         Calculate Vortex.
         """
         pvm = self.high - self.low.shift(1)
         nvm = self.low - self.high.shift(1)
-        pvm14 = pd.rolling_sum(pvm, n)
-        nvm14 = pd.rolling_sum(nvm, n)
         hc_abs = (self.high - self.close.shift(1)).abs()
         lc_abs = (self.low - self.close.shift(1)).abs()
-        tr = pd.DataFrame({'a': self.high_low_spread(), 'b': hc_abs, 'c': lc_abs}, index=pvm.index).max(1)
-        tr14 = pd.rolling_sum(tr, n)
+        tr = like(pvm, np.fmax(np.fmax(self.high_low_spread().values, hc_abs.values), lc_abs.values))
+        [pvm14], [nvm14], [tr14] = rolling_sums([pvm, nvm, tr], [n])
         pvi14 = pvm14 / tr14
         nvi14 = nvm14 / tr14
-        return pd.DataFrame({'+': pvi14, '-': nvi14})
+        return combine({'+': pvi14, '-': nvi14})
 
+    @cached
     def william_percent_r(self, n=14):
         """
         Calculate William Percent R.
         """
-        high_max = pd.rolling_max(self.high, n)
-        low_min = pd.rolling_min(self.low, n)
+        high_max, low_min = self._channel(n)
         return -100.0 * (high_max - self.close) / (high_max - low_min)
 
     # Charting
     # --------------------------------------------------------------------------------------------------------------------------
+    @cached
     def gaps(self):
         """
         Calculate gaps.
@@ -1393,78 +1808,37 @@ class Asset(object):
         o = self.open
         c = self.close
         c2o = self.close_to_open_range()
-        gap = pd.TimeSeries(np.zeros(len(c)), index=c.index)
-        gap[o > c.shift()] = c2o
-        gap[o < c.shift()] = c2o
+        gap = c2o.where((o > c.shift()) | (o < c.shift()), 0.0)
         return gap
 
+    @cached
     def speedlines(self, n=20):
         """
         Calculate Speedlines.
         """
-
-        high = self.high
-        n_day_high = pd.rolling_max(high, n, 0)
-        highs = high[high == n_day_high]
-        time_since_last_max = (highs.index.values[1:] - highs.index.values[0:-1]).astype('timedelta64[D]').astype(int)
-        day_b4_high = (high == n_day_high).shift(-1).fillna(False)
-        days_since_high = pd.TimeSeries(np.nan + np.ones(len(high)), index=high.index)
-        days_since_high[day_b4_high] = time_since_last_max
-        days_since_high[high == n_day_high] = 0.0
-        days_since_high = days_since_high.interpolate('time').astype(int).clip_upper(n)
-
-        low = self.low
-        n_day_low = pd.rolling_min(low, n, 0)
-        lows = low[low == n_day_low]
-        time_since_last_min = (lows.index.values[1:] - lows.index.values[0:-1]).astype('timedelta64[D]').astype(int)
-        day_b4_low = (low == n_day_low).shift(-1).fillna(False)
-        days_since_low = pd.TimeSeries(np.nan + np.ones(len(low)), index=low.index)
-        days_since_low[day_b4_low] = time_since_last_min
-        days_since_low[low == n_day_low] = 0.0
-        days_since_low = days_since_low.interpolate('time').astype(int).clip_upper(n)
-
-        trend_length = (days_since_high - days_since_low)
-        trend = trend_length
-        days_behind = pd.TimeSeries(np.zeros(len(low)), index=low.index)
-        days_behind[trend > 0] = days_since_low
-        days_behind[trend < 0] = days_since_high
-        p = pd.TimeSeries(np.nan + np.zeros(len(low)), index=low.index)
-        p2_3 = pd.TimeSeries(np.nan + np.zeros(len(low)), index=low.index)
-        p1_3 = pd.TimeSeries(np.nan + np.zeros(len(low)), index=low.index)
-        base = pd.TimeSeries(np.nan + np.zeros(len(low)), index=low.index)
-
-        p[trend > 0] = n_day_low
-        p[trend < 0] = n_day_high
-        base[trend > 0] = n_day_high
-        base[trend < 0] = n_day_low
-        p2_3[trend > 0] = n_day_high - ((2.0 / 3.0) * (n_day_high - n_day_low))
-        p2_3[trend < 0] = n_day_low  + ((2.0 / 3.0) * (n_day_high - n_day_low))
-        p1_3[trend > 0] = n_day_high - ((1.0 / 3.0) * (n_day_high - n_day_low))
-        p1_3[trend < 0] = n_day_low  + ((1.0 / 3.0) * (n_day_high - n_day_low))
-        p = p.ffill()
-        base = base.ffill()
-        p2_3 = p2_3.ffill()
-        p1_3 = p1_3.ffill()
-        p_slope = pd.TimeSeries(np.nan + np.zeros(len(low)), index=low.index)
-        p2_3_slope = pd.TimeSeries(np.nan + np.zeros(len(low)), index=low.index)
-        p1_3_slope = pd.TimeSeries(np.nan + np.zeros(len(low)), index=low.index)
-        p_slope[trend > 0] = ((base - p) / (n + trend_length))
-        p_slope[trend < 0] = ((base - p) / (n - trend_length))
-        p2_3_slope[trend > 0] = ((base - p2_3) / (n + trend_length))
-        p2_3_slope[trend < 0] = ((base - p2_3) / (n - trend_length))
-        p1_3_slope[trend > 0] = ((base - p1_3) / (n + trend_length))
-        p1_3_slope[trend < 0] = ((base - p1_3) / (n - trend_length))
-        p_slope = p_slope.ffill()
-        p2_3_slope = p2_3_slope.ffill()
-        p1_3_slope = p1_3_slope.ffill()
-        p_now = p    + (p_slope    * days_behind)
-        # p2_3_now = p2_3 + (p2_3_slope * days_behind)
-        # p1_3_now = p1_3 + (p1_3_slope * days_behind)
-
-        return pd.DataFrame({'p': p_now, 'p2/3': p2_3, 'p1/3': p1_3})
+        n_day_high, n_day_low, days_since_high, days_since_low = self._channel_positions(n, min_periods=0)
+
+        # Lines start at the more recent extreme and are held through bars where the high and low are on the same bar
+        trend_length = days_since_high - days_since_low
+        up = trend_length > 0
+        down = trend_length < 0
+        days_behind = days_since_low.where(up, days_since_high.where(down, 0.0))
+        channel = n_day_high - n_day_low
+        p = n_day_low.where(up, n_day_high.where(down)).ffill()
+        base = n_day_high.where(up, n_day_low.where(down)).ffill()
+        p2_3 = (n_day_high - (2.0 / 3.0) * channel).where(up, (n_day_low + (2.0 / 3.0) * channel).where(down)).ffill()
+        p1_3 = (n_day_high - (1.0 / 3.0) * channel).where(up, (n_day_low + (1.0 / 3.0) * channel).where(down)).ffill()
+        p_slope = ((base - p) / (n + trend_length)).where(up, ((base - p) / (n - trend_length)).where(down)).ffill()
+        p_now = p + (p_slope * days_behind)
+
+        # Lines are held through gaps but end with the last close
+        in_history = self.close.bfill().notnull()
+        p_now, p2_3, p1_3 = p_now.where(in_history), p2_3.where(in_history), p1_3.where(in_history)
+        return combine({'p': p_now, 'p2/3': p2_3, 'p1/3': p1_3})
 
     # Return Asset Performance
     # --------------------------------------------------------------------------------------------------------------------------
+    @cached
     def returns(self, periods=1, freq=None):
         """
         Calculate returns of asset over interval period and frequency offset freq string:
@@ -1586,6 +1960,13 @@ class Asset(object):
         return_delta = self.returns() - benchmark.returns()
         return return_delta.mean() / return_delta.std()
 
+    def rolling_risk(self, market=None, n=63):
+        """
+        Calculate rolling deviation risk and, against a benchmark, rolling beta, correlation, tracking error and information
+        ratio over window n, or a list of windows keyed (stat, n).
+        """
+        return rolling_comparison(self.returns(), None if market is None else market.returns(), n)
+
     # Market Comparisons
     # --------------------------------------------------------------------------------------------------------------------------
     def sharpe_ratio(self, market):
@@ -1609,156 +1990,68 @@ class Asset(object):
         return_delta = excess_returns - market.returns()
         return np.sqrt(N) * return_delta.mean() / return_delta.std()
 
+    def market_comparison(self, market, risk_free_rate=RISK_FREE_RATE):
+        """
+        Calculate beta, alpha, R-squared, tracking error and information ratio to a benchmark in one regression. A Universe
+        gets a row per symbol, and a Universe benchmark gets (stat, benchmark) columns.
+        """
+        return market_comparison(self.returns(), market.returns(), risk_free_rate)
+
+    def _market_stat(self, stat, market, risk_free_rate=RISK_FREE_RATE):
+        """
+        Return one market comparison stat, a number for a single symbol.
+        """
+        result = self.market_comparison(market, risk_free_rate)[stat]
+        return result.iloc[0] if isinstance(self.close, pd.Series) else result
+
     def beta(self, market):
         """
         Calcualte the Beta to a benchmark.
         """
-        cov = np.cov(self.close.returns(), market.close.returns())
-        return cov[0, 1] / cov[1, 1]
+        return self._market_stat('beta', market)
 
     def alpha(self, market, risk_free_rate=RISK_FREE_RATE):
         """
         Calculate the Alpha to a benchmark.
         """
-        return self.close.returns().mean() - risk_free_rate - self.beta(market) * (market.close.returns().mean() - risk_free_rate)
+        return self._market_stat('alpha', market, risk_free_rate)
 
     def r_squared(self, market, risk_free_rate=RISK_FREE_RATE):
         """
         Calculate R-squared.
         """
-        eps_i = 0.0
-        r_i = self.alpha(market) + self.beta(market) * (market.close.returns() - risk_free_rate) + eps_i + risk_free_rate
-        cov = np.cov(self.close.returns(), market.close.returns())
-        ss_res = np.power(r_i - self.close.returns(), 2.0)
-        ss_tot = cov[0, 0] * (len(self.close.returns()) - 1.0)
-        return 1.0 - (ss_res / ss_tot)
+        return self._market_stat('r_squared', market, risk_free_rate)
+
+    def tracking_error(self, market):
+        """
+        Calculate the tracking error, the standard deviation of returns less benchmark returns.
+        """
+        return self._market_stat('tracking_error', market)
 
     # Package it all up...idk, used mostly to test there are no errors
     # --------------------------------------------------------------------------------------------------------------------------
+    def compute_indicators(self, columns=None):
+        """
+        Calculate the indicator columns (names as in all_indicators), defaults to all. Only the graph nodes the columns need
+        are evaluated, and intermediates shared between them are computed once.
+        """
+        columns = sorted(INDICATOR_COLUMNS) if columns is None else list(columns)
+        wanted = set(columns)
+        results = {}
+        self._intermediates = {}
+        try:
+            for name in plan_indicators(columns):
+                node = INDICATOR_GRAPH[name]
+                value = getattr(self, node.method)(**node.params)
+                for column, key in node.outputs.items():
+                    if column in wanted:
+                        results[column] = value if key is None else value[key]
+        finally:
+            self._intermediates = None
+        return combine(results, columns)
+
     def all_indicators(self):
         """
         Calculate all indicators for the asset.
         """
-        # Indicators that return multiple variables, seperated later
-        quadrant_range = self.quadrant_range()
-        bollinger_bands = self.bollinger_bands()
-        chandelier_exit = self.chandelier_exit()
-        ichimoku_clouds = self.ichimoku_clouds()
-        keltner_channels = self.keltner_channels()
-        moving_average_envelopes = self.moving_average_envelopes()
-        parabolic_sar = self.parabolic_sar()
-        pivot_point = self.pivot_point()
-        fibonacci_pivot_point = self.fibonacci_pivot_point()
-        demark_pivot_point = self.demark_pivot_point()
-        price_channel = self.price_channel()
-        aroon = self.aroon()
-        price_momentum_oscillator = self.price_momentum_oscillator()
-        know_sure_thing = self.know_sure_thing()
-        macd = self.macd()
-        negative_volume_index = self.negative_volume_index()
-        percentage_price_oscillator = self.percentage_price_oscillator()
-        percentage_volume_oscillator = self.percentage_volume_oscillator()
-        stochastic_oscillator = self.stochastic_oscillator()
-        vortex = self.vortex()
-        # Return all indicators
-        return pd.DataFrame({
-            'return'                   : self.returns(),
-            'money_flow'               : self.money_flow(),
-            'money_flow_volume'        : self.money_flow_volume(),
-            'typical_price'            : self.typical_price(),
-            'close_to_open_range'      : self.close_to_open_range(),
-            'l1_quadrant_range'        : quadrant_range['1'],
-            'l2_quadrant_range'        : quadrant_range['2'],
-            'l3_quadrant_range'        : quadrant_range['3'],
-            'l4_quadrant_range'        : quadrant_range['4'],
-            'l5_quadrant_range'        : quadrant_range['5'],
-            'true_range'               : self.true_range(),
-            'high_low_spread'          : self.high_low_spread(),
-            'roc'                      : self.rate_of_change(),
-            'upper_bollinger_band'     : bollinger_bands['ub'],
-            'center_bollinger_band'    : bollinger_bands['mb'],
-            'lower_bollinger_band'     : bollinger_bands['lb'],
-            'long_chandelier_exit'     : chandelier_exit['long'],
-            'short_chandelier_exit'    : chandelier_exit['short'],
-            'conversion_ichimoku_cloud': ichimoku_clouds['conversion'],
-            'base_line_ichimoku_cloud' : ichimoku_clouds['base'],
-            'leadingA_ichimoku_cloud'  : ichimoku_clouds['leadA'],
-            'leadingB_ichimoku_cloud'  : ichimoku_clouds['leadB'],
-            'lagging_ichimoku_cloud'   : ichimoku_clouds['lag'],
-            'upper_keltner_channel'    : keltner_channels['ul'],
-            'center_keltner_channel'   : keltner_channels['ml'],
-            'lower_keltner_channel'    : keltner_channels['ll'],
-            'upper_ma_envelope'        : moving_average_envelopes['uma'],
-            'center_ma_envelope'       : moving_average_envelopes['ma'],
-            'lower_ma_envelope'        : moving_average_envelopes['lma'],
-            'rising_parabolic_sar'     : parabolic_sar['rising'],
-            'falling_parabolic_sar'    : parabolic_sar['falling'],
-            'p_pivot_point'            : pivot_point['p'],
-            's1_pivot_point'           : pivot_point['s1'],
-            's2_pivot_point'           : pivot_point['s2'],
-            'r1_pivot_point'           : pivot_point['r1'],
-            'r2_pivot_point'           : pivot_point['r2'],
-            'p_fibonacci_pivot_point'  : fibonacci_pivot_point['p'],
-            's1_fibonacci_pivot_point' : fibonacci_pivot_point['s1'],
-            's2_fibonacci_pivot_point' : fibonacci_pivot_point['s2'],
-            's3_fibonacci_pivot_point' : fibonacci_pivot_point['s3'],
-            'r1_fibonacci_pivot_point' : fibonacci_pivot_point['r1'],
-            'r2_fibonacci_pivot_point' : fibonacci_pivot_point['r2'],
-            'r3_fibonacci_pivot_point' : fibonacci_pivot_point['r3'],
-            'p_demark_pivot_point'     : demark_pivot_point['p'],
-            's1_demark_pivot_point'    : demark_pivot_point['s1'],
-            'r1_demark_pivot_point'    : demark_pivot_point['r1'],
-            'high_price_channel'       : price_channel['high'],
-            'low_price_channel'        : price_channel['low'],
-            'center_price_channel'     : price_channel['center'],
-            'volume_by_price'          : self.volume_by_price(),
-            'vwap'                     : self.volume_weighted_average_price(),
-            'zigzag'                   : self.zigzag(),
-            'adl'                      : self.accumulation_distribution_line(),
-            'aroon_up'                 : aroon['up'],
-            'aroon_down'               : aroon['down'],
-            'aroon_oscillator'         : aroon['oscillator'],
-            'adx'                      : self.average_directional_index(),
-            'atr'                      : self.average_true_range(),
-            'bandwidth'                : self.bandwidth(),
-            '%b'                       : self.percent_b(),
-            'cci'                      : self.commodity_channel_index(),
-            'coppock_curve'            : self.coppock_curve(),
-            'chaikin_money_flow'       : self.chaikin_money_flow,
-            'chaikin_oscillator'       : self.chaikin_oscillator(),
-            'pmo'                      : price_momentum_oscillator['pmo'],
-            'pmo_signal'               : price_momentum_oscillator['signal'],
-            'dpo'                      : self.detrended_price_oscillator(),
-            'ease_of_movement'         : self.ease_of_movement(),
-            'force_index'              : self.force_index(),
-            'kst'                      : know_sure_thing['kst'],
-            'kst_signal'               : know_sure_thing['signal'],
-            'mass_index'               : self.mass_index(),
-            'macd'                     : macd['macd'],
-            'macd_signal'              : macd['signal'],
-            'macd_hist'                : macd['hist'],
-            'money_flow_index'         : self.money_flow_index(),
-            'nvi'                      : negative_volume_index['nvi'],
-            'nvi_signal'               : negative_volume_index['signal'],
-            'obv'                      : self.on_balance_volume,
-            'ppo'                      : percentage_price_oscillator['ppo'],
-            'ppo_signal'               : percentage_price_oscillator['signal'],
-            'ppo_hist'                 : percentage_price_oscillator['hist'],
-            'pvo'                      : percentage_volume_oscillator['pvo'],
-            'pvo_signal'               : percentage_volume_oscillator['signal'],
-            'pvo_hist'                 : percentage_volume_oscillator['hist'],
-            'rsi'                      : self.relative_strength_index(),
-            'sctr'                     : self.stock_charts_tech_ranks(),
-            's'                        : self.slope(),
-            'volatility'               : self.volatility(),
-            '%k_stochastic_oscillator' : stochastic_oscillator['k'],
-            '%d_stochastic_oscillator' : stochastic_oscillator['d'],
-            'stochastic_rsi'           : self.stochastic_rsi(),
-            'trix'                     : self.trix(),
-            'tsi'                      : self.true_strength_index(),
-            'ulcer_index'              : self.ulcer_index(),
-            'ultimate_oscillator'      : self.ultimate_oscillator(),
-            '+vortex'                  : vortex['+'],
-            '-vortex'                  : vortex['-'],
-            'william_percent_r'        : self.william_percent_r()
-        })
+        return self.compute_indicators()
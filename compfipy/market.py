@@ -25,7 +25,6 @@ import urllib
 import urllib2
 import datetime
 import StringIO
-import multiprocessing
 
 import calendar as cal
 import cPickle as pickle
@@ -35,6 +34,11 @@ import pandas as pd
 import dateutil.easter
 import tabulate
 
+from compfipy import store
+from compfipy.asset import Asset
+from compfipy.universe import Universe
+from compfipy.util import DAY_NS
+
 # Local Data Constants
 # ------------------------------------------------------------------------------------------------------------------------------
 # Has the User set the local location of data?
@@ -49,6 +53,8 @@ SYMBOL_MANIFEST = ''
 HISTORY_STATUS = ''
 LOG_FILE = ''
 HISTORY_PATH = ''
+STORE_PATH = ''
+CUBE_PATH = ''
 
 # Download Constants
 # ------------------------------------------------------------------------------------------------------------------------------
@@ -77,7 +83,10 @@ def next_open_day(date=datetime.date.today()):
     """
     # coerce datetimes to dates
     date = date.date() if isinstance(date, datetime.datetime) else date
-    # Add one day to current date
+    next_session = nyse_calendar().next_session(date)
+    if next_session is not None:
+        return next_session
+    # Outside the precomputed calendar, add one day to current date
     date = date + datetime.timedelta(days=1)
     # Continue adding days until the market is open
     while not is_open_on(date):
@@ -166,7 +175,14 @@ def closing_time(date=datetime.date.today()):
     """
     Get closing time of the current date.
     """
-    return datetime.time(13, 0) if date in nyse_close_early_dates(date.year) else datetime.time(16, 0)
+    # coerce datetimes to dates
+    date = date.date() if isinstance(date, datetime.datetime) else date
+    trading_calendar = nyse_calendar()
+    if trading_calendar.covers(date):
+        early = trading_calendar.is_early_close(date)
+    else:
+        early = date in nyse_close_early_dates(date.year)
+    return datetime.time(13, 0) if early else datetime.time(16, 0)
 
 def opening_time():
     """
@@ -180,7 +196,8 @@ def is_holiday(date=datetime.date.today()):
     """
     # coerce datetimes to dates
     date = date.date() if isinstance(date, datetime.datetime) else date
-    return date in nyse_holidays(date.year)
+    trading_calendar = nyse_calendar()
+    return trading_calendar.is_holiday(date) if trading_calendar.covers(date) else date in nyse_holidays(date.year)
 
 def is_open_on(date=datetime.date.today()):
     """
@@ -188,6 +205,9 @@ def is_open_on(date=datetime.date.today()):
     """
     # coerce datetimes to dates
     date = date.date() if isinstance(date, datetime.datetime) else date
+    trading_calendar = nyse_calendar()
+    if trading_calendar.covers(date):
+        return trading_calendar.is_open_on(date)
     return not (date.weekday() >= 5 or is_holiday(date))
 
 def is_open_at(dt=datetime.datetime.today()):
@@ -200,13 +220,201 @@ def is_open_at(dt=datetime.datetime.today()):
     else:
         return datetime.time(9, 30) < dt.time() < closing_time(dt.date())
 
+# Trading Calendar
+# ------------------------------------------------------------------------------------------------------------------------------
+CALENDAR_START_YEAR = 1817
+CALENDAR_END_YEAR = 2100
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+HOUR_NS = 3600 * 10**9
+OPEN_NS = 9 * HOUR_NS + 30 * 60 * 10**9
+CLOSE_NS = 16 * HOUR_NS
+EARLY_CLOSE_NS = 13 * HOUR_NS
+NYSE_CALENDAR = None
+
+class TradingCalendar(object):
+    """
+    NYSE sessions, holidays and early closes from start_year to end_year, generated once from nyse_holidays and
+    nyse_close_early_dates. Days are held as bitsets indexed by days since January 1st of start_year and the sessions as a
+    sorted int64 array of days since 1970-01-01 (datetime64[D] values), so lookups are O(1) or a binary search. open_ns and
+    close_ns hold each day's trading hours in ns after midnight, both 0 on closed days.
+    """
+    def __init__(self, start_year=CALENDAR_START_YEAR, end_year=CALENDAR_END_YEAR):
+        self.first_day = datetime.date(start_year, 1, 1)
+        self.last_day = datetime.date(end_year, 12, 31)
+        self.origin = self.first_day.toordinal()
+        days = self.last_day.toordinal() - self.origin + 1
+
+        holiday = np.zeros(days, dtype=bool)
+        early_close = np.zeros(days, dtype=bool)
+        for year in xrange(start_year, end_year + 1):
+            # A holiday only counts in its own year, as in is_holiday
+            holiday[[d.toordinal() - self.origin for d in nyse_holidays(year) if d.year == year]] = True
+            early_close[[d.toordinal() - self.origin for d in nyse_close_early_dates(year)]] = True
+        weekday = (np.arange(days) + self.first_day.weekday()) % 7
+        is_open = (weekday < 5) & ~holiday
+
+        self.holiday_bits = np.packbits(holiday)
+        self.open_bits = np.packbits(is_open)
+        self.early_close_bits = np.packbits(early_close)
+        self.sessions = np.flatnonzero(is_open).astype(np.int64) + (self.origin - EPOCH_ORDINAL)
+        self.open_ns = np.where(is_open, OPEN_NS, 0).astype(np.int64)
+        self.close_ns = np.where(is_open, np.where(early_close, EARLY_CLOSE_NS, CLOSE_NS), 0).astype(np.int64)
+
+    def covers(self, date):
+        """
+        Return boolean if date is within the calendar.
+        """
+        return self.first_day <= date <= self.last_day
+
+    def _bit(self, bits, date):
+        """
+        Return the bit of date in a bitset.
+        """
+        day = date.toordinal() - self.origin
+        return bool((bits[day >> 3] >> (7 - (day & 7))) & 1)
+
+    def is_holiday(self, date):
+        """
+        Return boolean if date is a NYSE holiday.
+        """
+        return self._bit(self.holiday_bits, date)
+
+    def is_open_on(self, date):
+        """
+        Return boolean if NYSE is open on this date.
+        """
+        return self._bit(self.open_bits, date)
+
+    def is_early_close(self, date):
+        """
+        Return boolean if the NYSE closes early on this date.
+        """
+        return self._bit(self.early_close_bits, date)
+
+    def next_session(self, date):
+        """
+        Return the first session after date, or None if it is not in the calendar.
+        """
+        if not self.first_day - datetime.timedelta(days=1) <= date <= self.last_day:
+            return None
+        i = self.sessions.searchsorted(date.toordinal() - EPOCH_ORDINAL, side='right')
+        return datetime.date.fromordinal(int(self.sessions[i]) + EPOCH_ORDINAL) if i < len(self.sessions) else None
+
+def nyse_calendar():
+    """
+    Return the NYSE TradingCalendar, generating it on first use.
+    """
+    global NYSE_CALENDAR
+    if NYSE_CALENDAR is None:
+        NYSE_CALENDAR = TradingCalendar()
+    return NYSE_CALENDAR
+
+def session_mask(timestamps):
+    """
+    Return a boolean mask of the timestamps within NYSE trading hours, like is_open_at on each. timestamps is a DatetimeIndex
+    (tz-aware ones are converted to New York time) or an int64 array of ns since 1970-01-01 in New York wall time. NaT is
+    never open and times outside the precomputed calendar are checked with is_open_at.
+    """
+    if isinstance(timestamps, pd.DatetimeIndex):
+        if timestamps.tz is not None:
+            timestamps = timestamps.tz_convert('America/New_York').tz_localize(None)
+        timestamps = timestamps.asi8
+    ns = np.asarray(timestamps, dtype=np.int64)
+    trading_calendar = nyse_calendar()
+
+    # Split into the calendar day and the time of day
+    day = ns // DAY_NS
+    time_ns = ns - day * DAY_NS
+    day -= trading_calendar.origin - EPOCH_ORDINAL
+    covered = (day >= 0) & (day < len(trading_calendar.open_ns))
+    day[~covered] = 0
+    mask = covered & (trading_calendar.open_ns[day] < time_ns)
+    mask &= time_ns < trading_calendar.close_ns[day]
+
+    for i in np.flatnonzero(~covered & (ns != pd.NaT.value)):
+        mask[i] = is_open_at(pd.Timestamp(ns[i]).to_pydatetime())
+    return mask
+
+def _epoch_days(dates):
+    """
+    Return a date, datetime, string or array-like of them as int64 days since 1970-01-01.
+    """
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+def _session_dates(days):
+    """
+    Return days since 1970-01-01 as a datetime.date, or a DatetimeIndex for arrays.
+    """
+    if np.ndim(days) == 0:
+        return datetime.date.fromordinal(int(days) + EPOCH_ORDINAL)
+    return pd.DatetimeIndex(np.asarray(days).astype('datetime64[D]'))
+
+def _session_positions(days, roll='forward'):
+    """
+    Return the position in the NYSE sessions of the session on or after (forward) or on or before (backward) each day.
+    """
+    trading_calendar = nyse_calendar()
+    first, last = _epoch_days([trading_calendar.first_day, trading_calendar.last_day])
+    if np.any((days < first) | (days > last)):
+        raise ValueError('Dates must be within the trading calendar, {} to {}'.format(
+            trading_calendar.first_day, trading_calendar.last_day
+        ))
+    if roll == 'forward':
+        return trading_calendar.sessions.searchsorted(days, side='left')
+    elif roll == 'backward':
+        return trading_calendar.sessions.searchsorted(days, side='right') - 1
+    raise ValueError('roll must be forward or backward, not {}'.format(roll))
+
+def _sessions_at(positions):
+    """
+    Return the sessions at positions as dates, raising if any fall outside the trading calendar.
+    """
+    sessions = nyse_calendar().sessions
+    if np.any((positions < 0) | (positions >= len(sessions))):
+        raise ValueError('Sessions must be within the trading calendar')
+    return _session_dates(sessions[positions])
+
+def roll_session(dates, roll='forward'):
+    """
+    Return the session on or after (roll='forward') or on or before (roll='backward') a date or array of dates.
+    """
+    return _sessions_at(_session_positions(_epoch_days(dates), roll))
+
+def session_offset(dates, offsets, roll='forward'):
+    """
+    Return a date or array of dates moved by offsets sessions, after rolling dates that are not sessions forward or backward
+    (like numpy.busday_offset with the NYSE calendar).
+    """
+    return _sessions_at(_session_positions(_epoch_days(dates), roll) + np.asarray(offsets, dtype=np.int64))
+
+def count_sessions(start, end):
+    """
+    Return the number of sessions from start up to but not including end, negative when end is before start (like
+    numpy.busday_count with the NYSE calendar). Either may be an array of dates.
+    """
+    return _session_positions(_epoch_days(end)) - _session_positions(_epoch_days(start))
+
 def date_range(start=datetime.date.today(), end=datetime.date.today(), periods=None):
     """
-    Generate a DatetimeIndex of market open days for the range specific (start+end or start+periods).
+    Generate a DatetimeIndex of market open days for the range specific (start+end or start+periods). Without periods the
+    range runs to the first open day on or after end.
     """
     # coerce datetimes to dates
     start = start.date() if isinstance(start, datetime.datetime) else start
     end = end.date() if isinstance(end, datetime.datetime) else end
+
+    # Slice the precomputed sessions
+    trading_calendar = nyse_calendar()
+    if trading_calendar.covers(start) and (periods or trading_calendar.covers(end)):
+        sessions = trading_calendar.sessions
+        first = sessions.searchsorted(_epoch_days(start))
+        if periods:
+            stop = first + periods
+        else:
+            stop = sessions.searchsorted(_epoch_days(end)) + 1 if start <= end else first
+        if stop <= len(sessions):
+            return _session_dates(sessions[first:stop])
+
     dates = []
     # start from the previous day, because the function used get the next market day....
     current_date = start - datetime.timedelta(days=1)
@@ -229,13 +437,15 @@ def set_data_location(path='', source='google'):
     """
     Define the location of data.
     """
-    global DATA_SET, DATA_LOCATION, DATA_SOURCE, SYMBOL_MANIFEST, HISTORY_STATUS, LOG_FILE, HISTORY_PATH
+    global DATA_SET, DATA_LOCATION, DATA_SOURCE, SYMBOL_MANIFEST, HISTORY_STATUS, LOG_FILE, HISTORY_PATH, STORE_PATH, CUBE_PATH
     DATA_LOCATION = path
     DATA_SOURCE = source
     SYMBOL_MANIFEST = os.path.join(DATA_LOCATION, 'compfi', DATA_SOURCE + 'data', 'symbols.csv')
     HISTORY_STATUS = os.path.join(DATA_LOCATION, 'compfi', DATA_SOURCE + 'data', 'history.json')
     LOG_FILE = os.path.join(DATA_LOCATION, 'compfi', DATA_SOURCE + 'data', 'log.txt')
     HISTORY_PATH = os.path.join(DATA_LOCATION, 'compfi', DATA_SOURCE + 'data', 'history', '{}')
+    STORE_PATH = os.path.join(DATA_LOCATION, 'compfi', DATA_SOURCE + 'data', 'store')
+    CUBE_PATH = os.path.join(DATA_LOCATION, 'compfi', DATA_SOURCE + 'data', 'cube')
     DATA_SET = True
 
 def load_symbols():
@@ -268,27 +478,50 @@ def load_pickle(symbol=''):
     else:
         print NO_DATA_SET
 
-def load_symbol(symbols=None):
+def load_history(symbol='', start=None, end=None, columns=None):
     """
-    Load a groups of symbols.  Uses multiple cores if available.
+    Load history for symbol from start to end (inclusive) for a subset of columns, from the columnar store, or from the
+    pickle if the symbol has not been migrated to the store.
+    """
+    if DATA_SET:
+        if store.stored_columns(STORE_PATH, symbol):
+            return store.read_history(STORE_PATH, symbol, start, end, columns)
+        history = load_pickle(symbol).loc[start:end]
+        return history if columns is None else history[list(columns)]
+    else:
+        print NO_DATA_SET
+
+def load_symbol(symbols=None, start=None, end=None):
+    """
+    Load one symbol as a pandas.DataFrame, or a list of symbols (defaults to every stored symbol) as a Universe, from start to
+    end (inclusive). While the universe cube is current the symbols are memory mapped from it, so loading is nearly instant
+    and processes share its pages, otherwise they are read from the store or pickles. A Universe leaves out symbols without
+    history.
     """
     if DATA_SET:
         # If passed a string load one symbol
         if isinstance(symbols, str) or isinstance(symbols, unicode):
-            return load_pickle(symbols)
+            if store.cube_is_current(STORE_PATH, CUBE_PATH, [symbols]):
+                return store.read_cube_history(CUBE_PATH, symbols, start, end)
+            return load_history(symbols, start, end)
+
+        # Or assume it is an array of strings to load as one universe
+        if symbols is None:
+            symbols = store.cube_symbols(CUBE_PATH) or store.stored_symbols(STORE_PATH)
+        symbols = list(symbols)
+        if store.cube_is_current(STORE_PATH, CUBE_PATH, symbols):
+            return Universe.from_cube(CUBE_PATH, symbols, start, end)
+        histories = [load_history(symbol, start, end) for symbol in symbols]
+        return Universe.from_assets([Asset(history) for history in histories if len(history)])
+    else:
+        print NO_DATA_SET
 
-        # Or assume it is an array of strings to load multiple in parallel
-        else:
-            # Start Workers
-            p = multiprocessing.Pool()
-            # Read in history
-            universe = p.map(load_pickle, symbols)
-            # Convert to pandas Panel
-            universe = pd.Panel({x.index.name: x for x in universe})
-            # Close Workers
-            p.close()
-            p.join()
-            return universe.squeeze()
+def update_cube(symbols=None):
+    """
+    Rebuild the universe cube from the store for symbols (defaults to every stored symbol), returning the symbols written.
+    """
+    if DATA_SET:
+        return store.write_cube(STORE_PATH, CUBE_PATH, symbols)
     else:
         print NO_DATA_SET
 
@@ -437,6 +670,27 @@ def download_yahoo_history(symbols, start):
 
     return history
 
+def save_history(symbol, data, history_path='./data/history/{}', store_path=None):
+    """
+    Merge downloaded data into the stored history of symbol, keeping stored rows for dates already present, and return the
+    merged history. Writes to the columnar store at store_path if given, or the symbol's pickle in history_path.
+    """
+    if store_path:
+        store.append_history(store_path, symbol, data)
+        return store.read_history(store_path, symbol)
+
+    try:
+        with open(history_path.format(symbol + '.pkl'), 'rb') as f:
+            history = pickle.load(f)
+        history = history.append(data)
+    except IOError:
+        history = data
+    # Make sure dupicate dates are removed
+    history = history[~history.index.duplicated(keep='first')].sort_index()
+    with open(history_path.format(symbol + '.pkl'), 'wb') as f:
+        pickle.dump(history, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return history
+
 def log_message(msg, log_location, log=True, display=True):
     """
     Display and log message.
@@ -464,7 +718,8 @@ def update_history(
         log=True,
         display=True,
         trade_days=True,
-        force_day=None
+        force_day=None,
+        store_path=None
     ):
     """
     Checks the current history in storage and downloads updates for any incomplete symbol.
@@ -480,6 +735,8 @@ def update_history(
         display                  : boolean to toggle update process being displayed on stdout, defaults to True
         trade_days               : boolean to only attempt downloads on trading days, defaults to True
         force_day                : datetime.date to force a specific end day instead of using yesterday
+        store_path               : directory path string of a columnar history store (see compfipy.store) to write history to
+                                   instead of `.pkl` files in history_path, defaults to None
 
         Note: symbol_manifest_location, history_status_location, and log_location can also be passed lists of locations to have
         outputs written to multiple places, however this "master" location will only be read from first item in list (`[0]`).
@@ -636,24 +893,11 @@ def update_history(
                 if not data.empty:
                     # Assign name attribute to DataFrame
                     data.name = symbol
-                    # If no end recorded, this is the first data returned, record end and store data
+                    # If no end recorded, this is the first data returned, record end
                     if pd.isnull(symbol_manifest.loc[symbol]['End']):
                         symbol_manifest.loc[symbol, 'End'] = data.index[-1].date()
-                        with open(history_path.format(symbol + '.pkl'), 'wb') as f:
-                            pickle.dump(data, f, protocol=0)
-                    else:
-                        # Get current data
-                        with open(history_path.format(symbol + '.pkl'), 'r') as f:
-                            history = pickle.load(f)
-                        # Append data
-                        history = history.append(data).sort_index()
-                        # Make sure dupicate dates are removed
-                        history = history[~history.index.duplicated(keep='first')]
-                        # Make sure name is kept
-                        history.name = symbol
-                        # Write to disk
-                        with open(history_path.format(symbol + '.pkl'), 'wb') as f:
-                            pickle.dump(history, f, protocol=0)
+                    # Merge with current data and write to disk
+                    save_history(symbol, data, history_path, store_path)
                     # Record start in manifest
                     symbol_manifest.loc[symbol, 'Start'] = data.index[0].date()
 
@@ -700,24 +944,8 @@ def update_history(
 
                     # If that date range returned data
                     if not data.empty:
-                        # Get current data
-                        # pylint: disable=bare-except
-                        try:
-                            with open(history_path.format(symbol + '.pkl'), 'r') as f:
-                                history = pickle.load(f)
-                        except:
-                            # Set up empty DataFrame
-                            history = pd.DataFrame({'Open':[], 'Close':[], 'High':[], 'Low':[], 'Volume':[]})
-                            history.index.name = 'Date'
-                        # pylint: enable=bare-except
-
-                        # Append data
-                        history = history.append(data).sort_index()
-                        # Make sure dupicate dates are removed
-                        history = history[~history.index.duplicated(keep='first')]
-                        # Write to disk
-                        with open(history_path.format(symbol + '.pkl'), 'wb') as f:
-                            pickle.dump(history, f, protocol=0)
+                        # Merge with current data and write to disk
+                        history = save_history(symbol, data, history_path, store_path)
 
                         # Record last ending in manifest (use last non-NaN price date)
                         symbol_manifest.loc[symbol, 'End'] = history.last_valid_index().date()
@@ -54,17 +54,18 @@ def jump_diffusion(time=500, delta_t=(1.0 / 252.0), mu=0.0, sigma=0.3, jd_lambda
     s_n = 0
     t = 0
     small_lambda = -(1.0 / jd_lambda)
-    jump_sizes = pd.Series(np.zeros((time,)))
+    jump_sizes = np.zeros((time,))
+    step_ends = np.arange(1, time + 1) * delta_t
 
     while s_n < time:
         s_n += small_lambda * math.log(np.random.uniform(0, 1))
-        for j in xrange(0, time):
-            if t * delta_t <= s_n * delta_t <= (j+1) * delta_t:
-                jump_sizes[j] += np.random.normal(loc=mu, scale=sigma)
-                break
+        # The jump lands in the first step ending at or after it
+        j = step_ends.searchsorted(s_n * delta_t)
+        if j < time and t * delta_t <= s_n * delta_t:
+            jump_sizes[j] += np.random.normal(loc=mu, scale=sigma)
         t += 1
 
-    return jump_sizes
+    return pd.Series(jump_sizes)
 
 def merton_jump_diffusion(time=500, delta_t=(1.0 / 252.0), sigma=2, gbm_mu=0.5, jd_mu=0.0, jd_sigma=0.3, jd_lambda=0.1):
     """
@@ -76,11 +77,12 @@ def merton_jump_diffusion(time=500, delta_t=(1.0 / 252.0), sigma=2, gbm_mu=0.5,
 
 # Create standard EOD data from price data
 # ------------------------------------------------------------------------------------------------------------------------------
-def generate_ochlv(prices=None, ochl_mu=0.0, ochl_sigma=0.1, v_mu=100000, v_sigma=math.sqrt(10000)):
+def generate_ochlv(prices=None, ochl_mu=0.0, ochl_sigma=0.1, v_mu=100000, v_sigma=math.sqrt(10000), dates=None):
     """
-    Turn asset price into standard EOD data.
+    Turn asset price into standard EOD data, indexed by dates (defaults to market days from today).
     """
-    date_rng = market.date_range(datetime.date.today(), periods=len(prices))
+    # pylint: disable=too-many-arguments
+    date_rng = market.date_range(datetime.date.today(), periods=len(prices)) if dates is None else dates
     ochlv = pd.DataFrame({'Close':prices})
     ochlv['Open'] = prices + prices * np.random.normal(loc=ochl_mu, scale=ochl_sigma, size=prices.shape)
     ochlv['High'] = prices + prices * np.random.normal(loc=ochl_mu, scale=ochl_sigma, size=prices.shape)
@@ -33,7 +33,7 @@ import matplotlib.pyplot as plt
 
 from compfipy.util import COL_DASH_WIDTH
 from compfipy.util import RISK_FREE_RATE, MONTHS_IN_YEAR, DAYS_IN_TRADING_YEAR
-from compfipy.util import calc_returns, calc_cagr, fmtp, fmtn, fmttn
+from compfipy.util import calc_returns, calc_cagr, calc_drawdown_info, fmtp, fmtn, fmttn
 
 # General Portfolio Class
 # ------------------------------------------------------------------------------------------------------------------------------
@@ -595,32 +595,4 @@ class Portfolio(object):
         """
         Return table of drawdown data.
         """
-        drawdown = self.drawdown()
-        is_zero = drawdown == 0
-
-        # Find start and end time
-        start = ~is_zero & is_zero.shift(1)
-        start = list(start[start].index)
-        end = is_zero & (~is_zero).shift(1)
-        end = list(end[end].index)
-
-        # Handle no ending
-        if len(end) is 0:
-            end.append(drawdown.index[-1])
-
-        # Handle startingin drawdown
-        if start[0] > end[0]:
-            start.insert(0, drawdown.index[0])
-
-        # Handle finishing with drawdown
-        if start[-1] > end[-1]:
-            end.append(drawdown.index[-1])
-
-        info = pd.DataFrame({
-            'start': start,
-            'end'  : end,
-            'days' : [(e - s).days for s, e in zip(start, end)],
-            'drawdown':[drawdown[s:e].min() for s, e in zip(start, end)]
-        })
-
-        return info
+        return calc_drawdown_info(self.drawdown())
@@ -0,0 +1,331 @@
+"""
+store.py
+
+A columnar on-disk store of symbol histories, a directory per symbol holding a NumPy .npy file per column plus the dates as
+int64 ns.
+
+    {root}/{symbol}/meta.json      column order
+    {root}/{symbol}/dates.npy      int64 ns since 1970-01-01, sorted
+    {root}/{symbol}/{column}.npy   values
+
+Reads are memory mapped and sliced by a binary search of the dates, so reading a date range or a subset of columns only
+touches the pages it needs. migrate_pickles converts the history/{symbol}.pkl layout written by market.update_history.
+
+write_cube aligns many stored symbols on the union of their dates as a universe cube, a symbols x dates array per field.
+
+    {cube}/cube.json               symbols and fields
+    {cube}/dates.npy               int64 ns since 1970-01-01, sorted
+    {cube}/present.npy             symbols x dates, True where a symbol has a stored row
+    {cube}/{field}.npy             symbols x dates values, NaN where a symbol has no row
+
+Each symbol's history is contiguous in a field file and the transposed memory map is a dates x symbols array in the column
+layout pandas uses itself, so both one symbol and the whole universe load without copying, and processes mapping the same
+cube share its pages.
+
+    python -m compfipy.store migrate ./data/history ./data/store
+    python -m compfipy.store cube ./data/store ./data/cube
+
+"""
+
+import os
+import sys
+import glob
+import shutil
+import json
+import collections
+import cPickle as pickle
+import numpy as np
+import pandas as pd
+
+DATES_FILE = 'dates.npy'
+META_FILE = 'meta.json'
+CUBE_META_FILE = 'cube.json'
+PRESENT_FILE = 'present.npy'
+
+# File Helper Functions
+# ------------------------------------------------------------------------------------------------------------------------------
+def _path(root, symbol, name):
+    """
+    Return the path of a file of a symbol.
+    """
+    return os.path.join(root, symbol, name)
+
+def _column_file(column):
+    """
+    Return the file name of a column.
+    """
+    return '{}.npy'.format(column)
+
+def _save(path, values):
+    """
+    Save an array to path through a temporary file, so readers never see a partial file.
+    """
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        np.save(f, values, allow_pickle=False)
+    os.rename(temp, path)
+
+def _read_meta(root, symbol):
+    """
+    Return the stored columns of a symbol, or None if it is not in the store.
+    """
+    try:
+        with open(_path(root, symbol, META_FILE)) as f:
+            return [str(column) for column in json.load(f)['columns']]
+    except IOError:
+        return None
+
+def _read_column(root, symbol, column, lo, hi):
+    """
+    Read rows lo to hi of a stored column, NaN if the column is not stored.
+    """
+    try:
+        return np.array(np.load(_path(root, symbol, _column_file(column)), mmap_mode='r')[lo:hi])
+    except IOError:
+        values = np.empty(hi - lo)
+        values.fill(np.nan)
+        return values
+
+# Store Functions
+# ------------------------------------------------------------------------------------------------------------------------------
+def stored_symbols(root):
+    """
+    Return the sorted symbols in the store.
+    """
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root) if not name.startswith('.') and os.path.exists(_path(root, name, META_FILE))
+    )
+
+def stored_columns(root, symbol):
+    """
+    Return the stored columns of a symbol (empty if it is not in the store).
+    """
+    return _read_meta(root, symbol) or []
+
+def write_history(root, symbol, history):
+    """
+    Replace the stored history of a symbol with a pandas.DataFrame indexed by date. The files are written to a hidden
+    temporary directory that then replaces the symbol's directory, so a failed write never leaves old and new files mixed.
+    """
+    history = history[~history.index.duplicated(keep='first')].sort_index()
+    path = os.path.join(root, symbol)
+    temp = os.path.join(root, '.{}.tmp'.format(symbol))
+    old = os.path.join(root, '.{}.old'.format(symbol))
+    for leftover in [temp, old]:
+        if os.path.isdir(leftover):
+            shutil.rmtree(leftover)
+    os.makedirs(temp)
+    for column in history.columns:
+        np.save(os.path.join(temp, _column_file(column)), np.ascontiguousarray(history[column].values), allow_pickle=False)
+    np.save(os.path.join(temp, DATES_FILE), history.index.asi8, allow_pickle=False)
+    with open(os.path.join(temp, META_FILE), 'w') as f:
+        json.dump({'columns': [str(column) for column in history.columns]}, f)
+
+    # Swap the directories, readers see the old or the new history (or briefly none), never a mix
+    if os.path.isdir(path):
+        os.rename(path, old)
+    os.rename(temp, path)
+    if os.path.isdir(old):
+        shutil.rmtree(old)
+
+def append_history(root, symbol, data):
+    """
+    Merge a pandas.DataFrame indexed by date into the stored history of a symbol. Dates already stored keep their stored rows
+    and new columns are added.
+    """
+    history = read_history(root, symbol)
+    if len(history.columns):
+        columns = list(history.columns) + [column for column in data.columns if column not in history.columns]
+        data = history.append(data).reindex(columns=columns)
+    write_history(root, symbol, data)
+
+def read_history(root, symbol, start=None, end=None, columns=None):
+    """
+    Read the history of a symbol from start to end (inclusive, dates or anything pandas.Timestamp takes), for a subset of
+    columns (defaults to all), as a pandas.DataFrame with the index named by symbol. Unknown symbols return an empty DataFrame.
+    """
+    known_columns = _read_meta(root, symbol)
+    if known_columns is None:
+        history = pd.DataFrame()
+        history.index.name = symbol
+        return history
+    columns = known_columns if columns is None else list(columns)
+
+    dates = np.load(_path(root, symbol, DATES_FILE), mmap_mode='r')
+    lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start).value, side='left')
+    hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end).value, side='right')
+    values = {column: _read_column(root, symbol, column, lo, hi) for column in columns}
+    history = pd.DataFrame(values, index=pd.DatetimeIndex(np.array(dates[lo:hi])), columns=columns)
+    history.index.name = symbol
+    return history
+
+# Migration
+# ------------------------------------------------------------------------------------------------------------------------------
+def migrate_pickles(history_dir, root, symbols=None, display=True):
+    """
+    Copy the history/{symbol}.pkl pickles written by market.update_history into the store at root, returning the migrated
+    symbols. Defaults to every pickle in history_dir. The pickles are left in place.
+    """
+    if symbols is None:
+        paths = sorted(glob.glob(os.path.join(history_dir, '*.pkl')))
+    else:
+        paths = [os.path.join(history_dir, symbol + '.pkl') for symbol in symbols]
+    migrated = []
+    for path in paths:
+        symbol = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'rb') as f:
+            history = pickle.load(f)
+        write_history(root, symbol, history)
+        migrated.append(symbol)
+        if display:
+            sys.stdout.write('\rmigrated {} of {}: {:10s}'.format(len(migrated), len(paths), symbol))
+            sys.stdout.flush()
+    if display:
+        sys.stdout.write('\n')
+    return migrated
+
+# Universe Cube
+# ------------------------------------------------------------------------------------------------------------------------------
+def _read_cube_meta(cube):
+    """
+    Return the symbols and fields of a cube, or None if there is no cube.
+    """
+    try:
+        with open(os.path.join(cube, CUBE_META_FILE)) as f:
+            meta = json.load(f)
+    except IOError:
+        return None
+    return [str(symbol) for symbol in meta['symbols']], [str(field) for field in meta['fields']]
+
+def _cube_rows(cube, start, end):
+    """
+    Return the memory mapped dates of a cube and the rows from start to end (inclusive).
+    """
+    dates = np.load(os.path.join(cube, DATES_FILE), mmap_mode='r')
+    lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start).value, side='left')
+    hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end).value, side='right')
+    return dates, lo, hi
+
+def cube_symbols(cube):
+    """
+    Return the symbols of a cube (empty if there is no cube).
+    """
+    meta = _read_cube_meta(cube)
+    return meta[0] if meta else []
+
+def cube_is_current(root, cube, symbols):
+    """
+    Return True if the cube holds every symbol and none of them was written to the store at root after the cube. False if
+    there is no cube, even for no symbols.
+    """
+    meta = _read_cube_meta(cube)
+    if meta is None or not set(symbols) <= set(meta[0]):
+        return False
+    built = os.path.getmtime(os.path.join(cube, CUBE_META_FILE))
+    return all(
+        not os.path.exists(_path(root, symbol, META_FILE)) or os.path.getmtime(_path(root, symbol, META_FILE)) <= built
+        for symbol in symbols
+    )
+
+def write_cube(root, cube, symbols=None, fields=None, dtype=np.float64):
+    """
+    Write the stored histories of symbols (defaults to every stored symbol) as a cube at cube, aligned on the union of their
+    dates. fields default to the columns of the first symbol. Returns the symbols written.
+    """
+    # pylint: disable=too-many-locals
+    symbols = stored_symbols(root) if symbols is None else [symbol for symbol in symbols if _read_meta(root, symbol)]
+    fields = list(fields) if fields else (stored_columns(root, symbols[0]) if symbols else [])
+    symbol_dates = [np.load(_path(root, symbol, DATES_FILE), mmap_mode='r') for symbol in symbols]
+    dates = np.unique(np.concatenate(symbol_dates)) if symbols else np.empty(0, dtype=np.int64)
+    if not os.path.isdir(cube):
+        os.makedirs(cube)
+
+    # Fill the symbols x dates arrays a symbol (one contiguous row) at a time, marking the dates each symbol has a row for
+    paths = [os.path.join(cube, _column_file(field)) for field in fields]
+    shape = (len(symbols), len(dates))
+    values = [np.lib.format.open_memmap(path + '.tmp', 'w+', dtype, shape) for path in paths]
+    present = np.zeros(shape, dtype=bool)
+    for i, (symbol, stored) in enumerate(zip(symbols, symbol_dates)):
+        rows = dates.searchsorted(stored)
+        present[i, rows] = True
+        for field, field_values in zip(fields, values):
+            field_values[i] = np.nan
+            field_values[i, rows] = _read_column(root, symbol, field, 0, len(stored))
+    for field_values in values:
+        field_values.flush()
+    del values
+
+    # Files of the old and new cube are never read together, the old meta data goes before any file is replaced
+    if os.path.exists(os.path.join(cube, CUBE_META_FILE)):
+        os.remove(os.path.join(cube, CUBE_META_FILE))
+    for path in paths:
+        os.rename(path + '.tmp', path)
+    _save(os.path.join(cube, PRESENT_FILE), present)
+    _save(os.path.join(cube, DATES_FILE), dates)
+
+    # The meta data is written last, marking the cube as complete
+    with open(os.path.join(cube, CUBE_META_FILE + '.tmp'), 'w') as f:
+        json.dump({'symbols': symbols, 'fields': fields}, f)
+    os.rename(os.path.join(cube, CUBE_META_FILE + '.tmp'), os.path.join(cube, CUBE_META_FILE))
+    return symbols
+
+def read_cube(cube, symbols=None, start=None, end=None, fields=None):
+    """
+    Memory map a cube from start to end (inclusive), returning its dates as a pandas.DatetimeIndex, the symbols and an
+    OrderedDict of read-only dates x symbols arrays keyed by field. All symbols (the default) are views of the files, a subset
+    of symbols is copied.
+    """
+    cube_symbol_list, cube_fields = _read_cube_meta(cube)
+    dates, lo, hi = _cube_rows(cube, start, end)
+    rows = None
+    if symbols is not None and list(symbols) != cube_symbol_list:
+        rows = pd.Index(cube_symbol_list).get_indexer(list(symbols))
+        if (rows < 0).any():
+            raise KeyError('symbols not in cube: {}'.format([s for s, row in zip(symbols, rows) if row < 0]))
+    values = collections.OrderedDict()
+    for field in fields or cube_fields:
+        field_values = np.load(os.path.join(cube, _column_file(field)), mmap_mode='r')
+        values[field] = (field_values[:, lo:hi] if rows is None else field_values[rows, lo:hi]).T
+    symbols = cube_symbol_list if symbols is None else list(symbols)
+    return pd.DatetimeIndex(np.array(dates[lo:hi])), pd.Index(symbols), values
+
+def read_cube_present(cube, symbols=None, start=None, end=None):
+    """
+    Return a dates x symbols boolean array of the dates from start to end (inclusive) each symbol has a stored row for, in the
+    order of read_cube. Defaults to all symbols.
+    """
+    cube_symbol_list = _read_cube_meta(cube)[0]
+    _, lo, hi = _cube_rows(cube, start, end)
+    present = np.load(os.path.join(cube, PRESENT_FILE), mmap_mode='r')[:, lo:hi]
+    if symbols is not None and list(symbols) != cube_symbol_list:
+        present = present[pd.Index(cube_symbol_list).get_indexer(list(symbols))]
+    return np.array(present.T)
+
+def read_cube_history(cube, symbol, start=None, end=None, fields=None):
+    """
+    Read the history of one symbol of a cube from start to end (inclusive) like read_history, keeping only the dates it has a
+    stored row for.
+    """
+    cube_symbol_list, cube_fields = _read_cube_meta(cube)
+    row = cube_symbol_list.index(symbol)
+    dates, lo, hi = _cube_rows(cube, start, end)
+    present = np.load(os.path.join(cube, PRESENT_FILE), mmap_mode='r')[row, lo:hi]
+    fields = list(fields or cube_fields)
+    values = {
+        field: np.load(os.path.join(cube, _column_file(field)), mmap_mode='r')[row, lo:hi][present] for field in fields
+    }
+    history = pd.DataFrame(values, index=pd.DatetimeIndex(np.array(dates[lo:hi])[present]), columns=fields)
+    history.index.name = symbol
+    return history
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] not in ('migrate', 'cube'):
+        print 'usage: python -m compfipy.store migrate HISTORY_DIR STORE_DIR'
+        print '       python -m compfipy.store cube STORE_DIR CUBE_DIR'
+        sys.exit(1)
+    if sys.argv[1] == 'migrate':
+        migrate_pickles(sys.argv[2], sys.argv[3])
+    else:
+        write_cube(sys.argv[2], sys.argv[3])
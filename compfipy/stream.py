@@ -0,0 +1,866 @@
+"""
+stream.py
+
+Incremental indicators that update bar by bar. Each keeps only the state it needs, so update(bar) costs O(1) however long the
+history is, and each reproduces the matching Asset method for the latest bar. A bar is a mapping of OCHLV fields (a row of
+Asset.data, or a dict with 'Open', 'Close', 'High', 'Low', 'Volume'). RunningStats keeps the same kind of state for
+Asset.calc_stats.
+
+"""
+
+import collections
+import numpy as np
+import pandas as pd
+
+from compfipy.util import MONTHS_IN_YEAR, DAYS_IN_YEAR, DAYS_IN_TRADING_YEAR, DAY_NS, STATS_KEYS
+
+# Base Streaming Indicator
+# ------------------------------------------------------------------------------------------------------------------------------
+class StreamingIndicator(object):
+    """
+    Base class for incremental indicators, value holds the result for the latest bar.
+    """
+
+    def __init__(self):
+        """
+        Create an indicator with no history.
+        """
+        self.value = np.nan
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated value.
+        """
+        raise NotImplementedError
+
+    def seed(self, data):
+        """
+        Replay a pandas.DataFrame of OCHLV price data, oldest first, and return the latest value.
+        """
+        for bar in data.to_dict('records'):
+            self.update(bar)
+        return self.value
+
+    @classmethod
+    def from_asset(cls, asset, *args, **kwargs):
+        """
+        Create an indicator and seed it with the price history of an Asset.
+        """
+        indicator = cls(*args, **kwargs)
+        indicator.seed(asset.data)
+        return indicator
+
+# Moving Averages
+# ------------------------------------------------------------------------------------------------------------------------------
+class EMA(StreamingIndicator):
+    """
+    Exponential moving average of a price field, matches util.ema (pandas ewma with center of mass n).
+    """
+
+    def __init__(self, n=20, field='Close'):
+        """
+        Create an EMA of field over interval n.
+        """
+        super(EMA, self).__init__()
+        self.field = field
+        self.decay = 1.0 - 1.0 / (1.0 + n)
+        self.weight = 1.0
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated EMA.
+        """
+        return self.push(bar[self.field])
+
+    def push(self, x):
+        """
+        Add the next raw value and return the updated EMA.
+        """
+        if self.value == self.value:
+            # NaN values leave the average unchanged but still age the older values
+            self.weight *= self.decay
+            if x == x:
+                if self.value != x:
+                    self.value = ((self.weight * self.value) + x) / (self.weight + 1.0)
+                self.weight += 1.0
+        elif x == x:
+            self.value = x
+        return self.value
+
+class SMA(StreamingIndicator):
+    """
+    Simple moving average of a price field, matches util.sma (pandas rolling_mean).
+    """
+
+    def __init__(self, n=20, field='Close'):
+        """
+        Create an SMA of field over interval n.
+        """
+        super(SMA, self).__init__()
+        self.n = n
+        self.field = field
+        self.window = collections.deque()
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated SMA.
+        """
+        return self.push(bar[self.field])
+
+    def push(self, x):
+        """
+        Add the next raw value and return the updated SMA.
+        """
+        self.window.append(x)
+        if x == x:
+            self.total += x
+            self.count += 1
+        if len(self.window) > self.n:
+            old = self.window.popleft()
+            if old == old:
+                self.total -= old
+                self.count -= 1
+        self.value = self.total / self.count if self.count >= self.n else np.nan
+        return self.value
+
+class RollingStd(StreamingIndicator):
+    """
+    Rolling sample standard deviation of a price field, matches pandas rolling_std.
+    """
+
+    def __init__(self, n=20, field='Close'):
+        """
+        Create a rolling standard deviation of field over interval n.
+        """
+        super(RollingStd, self).__init__()
+        self.n = n
+        self.field = field
+        self.window = collections.deque()
+        self.count = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated standard deviation.
+        """
+        return self.push(bar[self.field])
+
+    def push(self, x):
+        """
+        Add the next raw value and return the updated standard deviation, with Welford's running mean and sum of squares.
+        """
+        self.window.append(x)
+        if x == x:
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.ssqdm += delta * (x - self.mean)
+        if len(self.window) > self.n:
+            old = self.window.popleft()
+            if old == old:
+                self.count -= 1
+                if self.count:
+                    delta = old - self.mean
+                    self.mean -= delta / self.count
+                    self.ssqdm -= delta * (old - self.mean)
+                else:
+                    self.mean = 0.0
+                    self.ssqdm = 0.0
+        if self.count >= self.n and self.count > 1:
+            self.value = np.sqrt(max(self.ssqdm / (self.count - 1.0), 0.0))
+        else:
+            self.value = np.nan
+        return self.value
+
+class WilderSmooth(StreamingIndicator):
+    """
+    Wilder's recursive smoothing of a price field, matches util.wilder_smooth. The average is seeded with the mean of the first
+    n values, then each later value is added with weight 1 / n. A NaN value after the seed gives NaN and the average is held.
+    """
+
+    def __init__(self, n=14, field='Close'):
+        """
+        Create Wilder smoothing of field over interval n.
+        """
+        super(WilderSmooth, self).__init__()
+        self.n = n
+        self.field = field
+        self.decay = (n - 1.0) / n
+        self.seen = 0
+        self.total = 0.0
+        self.average = np.nan
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated average.
+        """
+        return self.push(bar[self.field])
+
+    def push(self, x):
+        """
+        Add the next raw value and return the updated average. NaNs are ignored in the seed sum and skipped after it.
+        """
+        if self.seen < self.n:
+            if x == x:
+                self.total += x
+        elif self.seen == self.n:
+            self.average = self.total / self.n
+            self.value = self.average
+        elif x == x:
+            self.average = (1.0 / self.n) * x + self.decay * self.average
+            self.value = self.average
+        else:
+            self.value = np.nan
+        self.seen += 1
+        return self.value
+
+# Indicators
+# ------------------------------------------------------------------------------------------------------------------------------
+class RSI(StreamingIndicator):
+    """
+    Relative Strength Index, matches Asset.relative_strength_index.
+    """
+
+    def __init__(self, n=14):
+        """
+        Create an RSI over interval n.
+        """
+        super(RSI, self).__init__()
+        self.last_close = np.nan
+        self.avg_gain = WilderSmooth(n)
+        self.avg_loss = WilderSmooth(n)
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated RSI.
+        """
+        change = bar['Close'] - self.last_close
+        self.last_close = bar['Close']
+        gain = self.avg_gain.push(max(change, 0.0) if change == change else change)
+        loss = self.avg_loss.push(-1.0 * min(change, 0.0) if change == change else change)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.value = 100.0 - (100.0 / (1.0 + np.float64(gain) / loss))
+        return self.value
+
+class MACD(StreamingIndicator):
+    """
+    Moving Average Convergence Divergence, matches Asset.moving_avg_converge_diverge. value is a dict of macd, signal and hist.
+    """
+
+    def __init__(self, sn=26, fn=12, n_sig=9):
+        """
+        Create a MACD from slow sn and fast fn EMAs, with an n_sig signal line.
+        """
+        super(MACD, self).__init__()
+        self.slow = EMA(sn)
+        self.fast = EMA(fn)
+        self.signal = EMA(n_sig)
+        self.value = {'macd': np.nan, 'signal': np.nan, 'hist': np.nan}
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated MACD.
+        """
+        macd = self.fast.update(bar) - self.slow.update(bar)
+        signal = self.signal.push(macd)
+        self.value = {'macd': macd, 'signal': signal, 'hist': macd - signal}
+        return self.value
+
+class BollingerBands(StreamingIndicator):
+    """
+    Bollinger Bands, matches Asset.bollinger_bands. value is a dict of ub, mb and lb.
+    """
+
+    def __init__(self, n=20, k=2):
+        """
+        Create Bollinger Bands k standard deviations around an n day SMA.
+        """
+        super(BollingerBands, self).__init__()
+        self.k = k
+        self.ma = SMA(n)
+        self.sd = RollingStd(n)
+        self.value = {'ub': np.nan, 'mb': np.nan, 'lb': np.nan}
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated bands.
+        """
+        ma = self.ma.update(bar)
+        sd = self.sd.update(bar)
+        self.value = {'ub': ma + self.k * sd, 'mb': ma, 'lb': ma - self.k * sd}
+        return self.value
+
+class ATR(StreamingIndicator):
+    """
+    Average True Range, matches Asset.average_true_range.
+    """
+
+    def __init__(self, n=14):
+        """
+        Create an ATR over interval n.
+        """
+        super(ATR, self).__init__()
+        self.last_low = np.nan
+        self.average = WilderSmooth(n)
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated ATR.
+        """
+        true_range = bar['High'] - self.last_low
+        self.last_low = bar['Low']
+        self.value = self.average.push(true_range)
+        return self.value
+
+class OBV(StreamingIndicator):
+    """
+    On Balance Volume, matches Asset.on_balance_volume (a day with an unchanged close repeats the last volume change).
+    """
+
+    def __init__(self):
+        """
+        Create an OBV with no history.
+        """
+        super(OBV, self).__init__()
+        self.last_close = np.nan
+        self.last_change = np.nan
+        self.total = 0.0
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated OBV.
+        """
+        close = bar['Close']
+        volume = float(bar['Volume'])
+        if close > self.last_close:
+            change = volume
+        elif close < self.last_close:
+            change = -volume
+        elif close == self.last_close:
+            change = np.nan
+        else:
+            # Missing close on either day
+            change = volume - volume
+        # Unchanged closes and missing volumes carry the last change forward
+        if change == change:
+            self.last_change = change
+        self.last_close = close
+        if self.last_change == self.last_change:
+            self.total += self.last_change
+            self.value = self.total
+        else:
+            self.value = np.nan
+        return self.value
+
+class ADL(StreamingIndicator):
+    """
+    Accumulation Distribution Line, matches Asset.accumulation_distribution_line.
+    """
+
+    def __init__(self):
+        """
+        Create an ADL with no history.
+        """
+        super(ADL, self).__init__()
+        self.total = 0.0
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated ADL.
+        """
+        close, high, low = bar['Close'], bar['High'], bar['Low']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            money_flow_volume = np.float64((close - low) - (high - close)) / (high - low) * bar['Volume']
+        if money_flow_volume == money_flow_volume:
+            self.total += money_flow_volume
+            self.value = self.total
+        else:
+            self.value = np.nan
+        return self.value
+
+class StochasticOscillator(StreamingIndicator):
+    """
+    Stochastic Oscillator, matches Asset.stochastic_oscillator. value is a dict of k and d. The n day high and low are kept in
+    monotonic deques, so each bar is amortized O(1).
+    """
+
+    def __init__(self, n=20, n1=3):
+        """
+        Create a Stochastic Oscillator over n days with an n1 day %D.
+        """
+        super(StochasticOscillator, self).__init__()
+        self.n = n
+        self.bars = 0
+        self.last_nan = -n
+        self.highs = collections.deque()
+        self.lows = collections.deque()
+        self.percent_d = SMA(n1)
+        self.value = {'k': np.nan, 'd': np.nan}
+
+    def update(self, bar):
+        """
+        Add the next bar and return the updated %K and %D.
+        """
+        i = self.bars
+        self.bars += 1
+        high, low = bar['High'], bar['Low']
+        if high != high or low != low:
+            self.last_nan = i
+        else:
+            while self.highs and self.highs[-1][1] <= high:
+                self.highs.pop()
+            self.highs.append((i, high))
+            while self.lows and self.lows[-1][1] >= low:
+                self.lows.pop()
+            self.lows.append((i, low))
+        while self.highs and self.highs[0][0] <= i - self.n:
+            self.highs.popleft()
+        while self.lows and self.lows[0][0] <= i - self.n:
+            self.lows.popleft()
+
+        if self.bars >= self.n and self.last_nan <= i - self.n:
+            n_day_high, n_day_low = self.highs[0][1], self.lows[0][1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                percent_k = 100.0 * np.float64(bar['Close'] - n_day_low) / (n_day_high - n_day_low)
+        else:
+            percent_k = np.nan
+        self.value = {'k': percent_k, 'd': self.percent_d.push(percent_k)}
+        return self.value
+
+# Running Statistics
+# ------------------------------------------------------------------------------------------------------------------------------
+def _nanmin(a, b):
+    """
+    Minimum of two values ignoring NaN, NaN if both are.
+    """
+    return b if a != a or b < a else a
+
+def _div(a, b):
+    """
+    Divide floats like numpy, inf or NaN rather than ZeroDivisionError when b is 0.
+    """
+    return a / b if b else np.float64(a) / b
+
+def _zero_out(x):
+    """
+    Zero floating point error, like pandas skew and kurt.
+    """
+    return 0.0 if abs(x) < 1e-14 else x
+
+def _cagr(start_price, end_price, days):
+    """
+    Compound annual growth rate over days, like util.calc_cagr.
+    """
+    return np.power(np.float64(end_price) / start_price, 1.0 / (days / DAYS_IN_YEAR)) - 1.0
+
+class Moments(object):
+    """
+    Running count, mean and sums of squared, cubed and fourth power deviations of values, NaNs are ignored. Matches the
+    pandas mean, std, skew and kurt to floating point error.
+    """
+    __slots__ = ['n', 'mean', 'm2', 'm3', 'm4']
+
+    def __init__(self):
+        """
+        Create moments of no values.
+        """
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+
+    def copy(self):
+        """
+        Return a copy, to add values without changing these moments.
+        """
+        moments = Moments()
+        moments.n, moments.mean, moments.m2, moments.m3, moments.m4 = self.n, self.mean, self.m2, self.m3, self.m4
+        return moments
+
+    def push(self, x):
+        """
+        Add a value, with the one pass update of the central moment sums.
+        """
+        if x != x:
+            return
+        n1 = self.n
+        self.n += 1
+        n = self.n
+        delta = x - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+        self.mean += delta_n
+        self.m4 += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+
+    def average(self):
+        """
+        Return the mean, NaN without values.
+        """
+        return self.mean if self.n else np.nan
+
+    def std(self):
+        """
+        Return the sample standard deviation.
+        """
+        return np.sqrt(self.m2 / (self.n - 1.0)) if self.n > 1 else np.nan
+
+    def skew(self):
+        """
+        Return the sample skewness, like pandas skew.
+        """
+        n, m2, m3 = self.n, _zero_out(self.m2), _zero_out(self.m3)
+        if n < 3:
+            return np.nan
+        if m2 == 0:
+            return 0
+        return (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2 ** 1.5)
+
+    def kurt(self):
+        """
+        Return the sample excess kurtosis, like pandas kurt.
+        """
+        n = self.n
+        if n < 4:
+            return np.nan
+        numer = _zero_out(n * (n + 1) * (n - 1) * self.m4)
+        denom = _zero_out((n - 2) * (n - 3) * self.m2 ** 2)
+        if denom == 0:
+            return 0
+        return numer / denom - 3.0 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+
+class PeriodReturns(object):
+    """
+    Returns of the months or years of a daily price series, like calc_returns of the resampled last prices. Closed periods
+    are folded into running totals and the open period is added when the totals are read.
+    """
+
+    def __init__(self, monthly=True):
+        """
+        Create monthly, or yearly, period returns with no history.
+        """
+        self.monthly = monthly
+        self.key = None
+        self.last = np.nan
+        self.prev = np.nan
+        self.count = 0
+        self.moments = Moments()
+        self.nonzero = 0
+        self.positive = 0
+        self.up = (0.0, 0)
+        self.down = (0.0, 0)
+        self.best = (np.nan, None)
+        self.worst = (np.nan, None)
+        self.table = {}
+        self.filled = collections.deque(maxlen=11)
+        self.twelve_month_wins = 0
+
+    def push(self, year, month, price, first_price):
+        """
+        Add the price of a day, closing the open period and any empty periods before a new one.
+        """
+        key = year * 12 + month - 1 if self.monthly else year
+        if key != self.key:
+            if self.key is not None:
+                self.record(self.key, self.last, first_price)
+                self.prev = self.last
+                for empty in xrange(self.key + 1, key):
+                    self.record(empty, np.nan, first_price)
+                    self.prev = np.nan
+            self.key = key
+            self.last = np.nan
+        if price == price:
+            self.last = price
+
+    def record(self, key, last, first_price):
+        """
+        Fold a closed period, with last price last, into the running totals.
+        """
+        value = _div(last, self.prev) - 1.0
+        self.count += 1
+        self.moments.push(value)
+        if value == value:
+            self.nonzero += value != 0
+            if not value <= self.best[0]:
+                self.best = (value, key)
+            if not value >= self.worst[0]:
+                self.worst = (value, key)
+            if value > 0:
+                self.positive += 1
+                self.up = (self.up[0] + value, self.up[1] + 1)
+            else:
+                self.down = (self.down[0] + value, self.down[1] + 1)
+        if not self.monthly:
+            return
+
+        # Return table, the first month is measured from the first daily price
+        year, month = divmod(key, 12)
+        self.table.setdefault(year, {})[month + 1] = value if self.count > 1 else _div(last, first_price) - 1
+        if month + 1 == 12:
+            self.table[year][13] = np.prod(np.array(self.table[year].values()) + 1) - 1.0
+
+        # Twelve month change of forward filled prices, skipping months without a price
+        filled = last if last == last else (self.filled[-1] if self.filled else np.nan)
+        if len(self.filled) == self.filled.maxlen and last == last and _div(filled, self.filled[0]) - 1.0 > 0:
+            self.twelve_month_wins += 1
+        self.filled.append(filled)
+
+    def totals(self, first_price):
+        """
+        Return the running totals with the open period added, without closing it.
+        """
+        totals = PeriodReturns(self.monthly)
+        totals.__dict__.update(self.__dict__)
+        totals.moments = self.moments.copy()
+        totals.table = {year: dict(months) for year, months in self.table.items()}
+        totals.filled = collections.deque(self.filled, maxlen=self.filled.maxlen)
+        totals.record(self.key, self.last, first_price)
+        return totals
+
+    def label(self, key):
+        """
+        Return the resample label of a period, its last calendar day.
+        """
+        if self.monthly:
+            year, month = divmod(key, 12)
+            return pd.Timestamp(year, month + 1, 1) + pd.offsets.MonthEnd(0)
+        return pd.Timestamp(key, 12, 31)
+
+class RunningStats(object):
+    """
+    Running accumulators behind Asset.calc_stats. push() adds a day in amortized O(1): moments of the daily returns, the
+    running high and drawdown episodes, and month and year buckets. stats() returns the Asset.calc_stats dict for the days
+    so far.
+    """
+
+    def __init__(self):
+        """
+        Create running stats with no history.
+        """
+        self.name = None
+        self.index_name = None
+        self.dates = []
+        self.prices = []
+        self.daily = Moments()
+        self.nonzero = 0
+        self.best = (np.nan, None)
+        self.worst = (np.nan, None)
+        self.months = PeriodReturns(monthly=True)
+        self.years = PeriodReturns(monthly=False)
+        self.rows = {}
+
+        # Drawdown state, the current episode and totals of finished episodes
+        self.filled = np.nan
+        self.high = -np.inf
+        self.at_high = True
+        self.episode = None
+        self.depths = (0.0, 0)
+        self.max_drawdown = np.nan
+        self.episode_days = (0, 0)
+
+    @property
+    def bars(self):
+        """
+        Return number of days added.
+        """
+        return len(self.prices)
+
+    def extend(self, close):
+        """
+        Add a pandas.Series of closing prices, oldest first.
+        """
+        self.name = close.name
+        self.index_name = close.index.name
+        dates = close.index
+        days = zip(dates.asi8.tolist(), dates.year.tolist(), dates.month.tolist(), close.values.tolist())
+        for date, year, month, price in days:
+            self.push(date, year, month, price)
+        return self
+
+    def push(self, date, year, month, price):
+        """
+        Add the closing price of a day, date in ns since epoch.
+        """
+        # pylint: disable=too-many-branches
+        first = not self.prices
+        if not first:
+            value = _div(price, self.prices[-1]) - 1.0
+            self.daily.push(value)
+            if value == value:
+                self.nonzero += value != 0
+                if not value <= self.best[0]:
+                    self.best = (value, date)
+                if not value >= self.worst[0]:
+                    self.worst = (value, date)
+        self.dates.append(date)
+        self.prices.append(price)
+        first_price = self.prices[0]
+        self.months.push(year, month, price, first_price)
+        self.years.push(year, month, price, first_price)
+
+        # Drawdown from the highest forward filled price, days before the first price count as drawn down
+        if price == price:
+            self.filled = price
+        level = self.filled if self.filled == self.filled else -np.inf
+        self.high = max(self.high, level)
+        drawdown = _div(level, self.high) - 1.0 if level > -np.inf else np.nan
+        at_high = drawdown == 0
+        if not at_high:
+            if self.at_high or first:
+                self.episode = (date, drawdown)
+            else:
+                self.episode = (self.episode[0], _nanmin(self.episode[1], drawdown))
+        elif not self.at_high:
+            self.finish(date)
+        self.at_high = at_high
+
+    def finish(self, date):
+        """
+        Fold the current drawdown episode, ending on date, into the episode totals.
+        """
+        start, depth = self.episode
+        depth = _nanmin(depth, 0.0)
+        if depth == depth:
+            self.depths = (self.depths[0] + depth, self.depths[1] + 1)
+            self.max_drawdown = _nanmin(self.max_drawdown, depth)
+        self.episode_days = (self.episode_days[0] + (date - start) // DAY_NS, self.episode_days[1] + 1)
+        self.episode = None
+
+    def price_before(self, key, target):
+        """
+        Return the row of the last day on or before target, advancing a pointer kept per lookback.
+        """
+        row = self.rows.get(key, -1)
+        while row + 1 < len(self.dates) and self.dates[row + 1] <= target:
+            row += 1
+        self.rows[key] = row
+        return self.prices[row] if row >= 0 else np.nan
+
+    def cagr_since(self, key, target):
+        """
+        Return the CAGR from the first day on or after target, advancing a pointer kept per lookback.
+        """
+        row = self.rows.get(key, 0)
+        while row < len(self.dates) - 1 and self.dates[row] < target:
+            row += 1
+        self.rows[key] = row
+        return _cagr(self.prices[row], self.prices[-1], (self.dates[-1] - self.dates[row]) // DAY_NS)
+
+    def one_row(self, value, label, name):
+        """
+        Return a best or worst period as a one row pandas.Series, like slicing the returns at its idxmax.
+        """
+        return pd.Series([value], index=pd.DatetimeIndex([label], name=name), name=self.name)
+
+    def stats(self, yearly_risk_free_return, name=None, market_cap=1.0):
+        """
+        Return the Asset.calc_stats dict of the days so far.
+        """
+        # pylint: disable=too-many-locals,too-many-statements
+        monthly_risk_free_return = (np.power(1 + yearly_risk_free_return, 1.0 / MONTHS_IN_YEAR) - 1.0) * MONTHS_IN_YEAR
+        daily_risk_free_return = (np.power(1 + yearly_risk_free_return, 1.0 / DAYS_IN_TRADING_YEAR) - 1.0) * DAYS_IN_TRADING_YEAR
+
+        stats = {key: np.nan for key in STATS_KEYS}
+        stats.update({
+            'name': name,
+            'start': pd.Timestamp(self.dates[0]),
+            'end': pd.Timestamp(self.dates[-1]),
+            'market_cap': market_cap,
+            'yearly_risk_free_return': yearly_risk_free_return,
+            'return_table': {}
+        })
+        if self.bars < 4:
+            return stats
+
+        # Stats with daily prices
+        end = pd.Timestamp(self.dates[-1])
+        first_price, last_price = np.float64(self.prices[0]), np.float64(self.prices[-1])
+        stats['daily_mean'] = DAYS_IN_TRADING_YEAR * self.daily.average()
+        stats['daily_vol'] = np.sqrt(DAYS_IN_TRADING_YEAR) * self.daily.std()
+        stats['daily_sharpe'] = (stats['daily_mean'] - daily_risk_free_return) / stats['daily_vol']
+        stats['best_day'] = self.one_row(self.best[0], pd.Timestamp(self.best[1]), self.index_name)
+        stats['worst_day'] = self.one_row(self.worst[0], pd.Timestamp(self.worst[1]), self.index_name)
+        stats['total_return'] = (last_price / first_price) - 1.0
+        stats['ytd'] = stats['total_return']
+        stats['cagr'] = _cagr(first_price, last_price, (self.dates[-1] - self.dates[0]) // DAY_NS)
+        stats['incep'] = stats['cagr']
+        depths, max_drawdown, episode_days = self.depths, self.max_drawdown, self.episode_days
+        if self.episode is not None:
+            # Close the open drawdown on the last day without changing the running state
+            start, depth = self.episode
+            if depth == depth:
+                depths = (depths[0] + depth, depths[1] + 1)
+                max_drawdown = _nanmin(max_drawdown, depth)
+            episode_days = (episode_days[0] + (self.dates[-1] - start) // DAY_NS, episode_days[1] + 1)
+        stats['max_drawdown'] = max_drawdown
+        stats['avg_drawdown'] = depths[0] / depths[1] if depths[1] else np.nan
+        stats['avg_drawdown_days'] = episode_days[0] / float(episode_days[1]) if episode_days[1] else np.nan
+        stats['daily_skew'] = self.daily.skew()
+        stats['daily_kurt'] = self.daily.kurt() if self.nonzero > 0 else np.nan
+
+        # Stats with monthly prices
+        months = self.months.totals(first_price)
+        if months.count < 2:
+            return stats
+
+        stats['monthly_mean'] = MONTHS_IN_YEAR * months.moments.average()
+        stats['monthly_vol'] = np.sqrt(MONTHS_IN_YEAR) * months.moments.std()
+        stats['monthly_sharpe'] = (stats['monthly_mean'] - monthly_risk_free_return) / stats['monthly_vol']
+        stats['best_month'] = self.one_row(months.best[0], months.label(months.best[1]), self.index_name)
+        stats['worst_month'] = self.one_row(months.worst[0], months.label(months.worst[1]), self.index_name)
+        stats['mtd'] = (last_price / months.prev) - 1.0
+        stats['pos_month_perc'] = months.positive / float(months.count - 1.0)
+        stats['avg_up_month'] = months.up[0] / months.up[1] if months.up[1] else np.nan
+        stats['avg_down_month'] = months.down[0] / months.down[1] if months.down[1] else np.nan
+
+        # Table for lookback periods, the open year is totalled by totals()
+        stats['return_table'] = collections.defaultdict(dict, months.table)
+        year_months = stats['return_table'][months.key // 12]
+        year_months.pop(13, None)
+        year_months[13] = np.prod(np.array(year_months.values()) + 1) - 1.0
+
+        if months.count < 3:
+            return stats
+
+        stats['three_month'] = (last_price / self.price_before('three_month', (end - pd.DateOffset(months=3)).value)) - 1
+
+        if months.count < 4:
+            return stats
+
+        stats['monthly_skew'] = months.moments.skew()
+        stats['monthly_kurt'] = months.moments.kurt() if months.nonzero > 0 else np.nan
+        stats['six_month'] = (last_price / self.price_before('six_month', (end - pd.DateOffset(months=6)).value)) - 1
+
+        # Stats with yearly prices
+        years = self.years.totals(first_price)
+        if years.count < 2:
+            return stats
+
+        stats['ytd'] = (last_price / years.prev) - 1.0
+        stats['one_year'] = (last_price / self.price_before('one_year', (end - pd.DateOffset(years=1)).value)) - 1
+        stats['yearly_mean'] = years.moments.average()
+        stats['yearly_vol'] = years.moments.std()
+        stats['yearly_sharpe'] = (stats['yearly_mean'] - yearly_risk_free_return) / stats['yearly_vol']
+        stats['best_year'] = self.one_row(years.best[0], years.label(years.best[1]), self.index_name)
+        stats['worst_year'] = self.one_row(years.worst[0], years.label(years.worst[1]), self.index_name)
+
+        # Annualize stat for over 1 year
+        stats['three_year'] = self.cagr_since('three_year', (end - pd.DateOffset(years=3)).value)
+        stats['win_year_perc'] = years.positive / float(years.count - 1.0)
+        stats['twelve_month_win_perc'] = np.float64(months.twelve_month_wins) / (months.count - (MONTHS_IN_YEAR - 1.0))
+
+        if years.count < 4:
+            return stats
+
+        stats['yearly_skew'] = years.moments.skew()
+        stats['yearly_kurt'] = years.moments.kurt() if years.nonzero > 0 else np.nan
+        stats['five_year'] = self.cagr_since('five_year', (end - pd.DateOffset(years=5)).value)
+        stats['ten_year'] = self.cagr_since('ten_year', (end - pd.DateOffset(years=10)).value)
+
+        return stats
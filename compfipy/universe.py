@@ -0,0 +1,417 @@
+"""
+universe.py
+
+Define a universe class holding aligned price data for many symbols, so Asset indicators run on every symbol at once.
+
+"""
+
+import functools
+import collections
+import numpy as np
+import pandas as pd
+
+from compfipy import store
+from compfipy.asset import Asset, CompactOCHLV
+from compfipy.util import RISK_FREE_RATE, MONTHS_IN_YEAR, DAYS_IN_YEAR, DAYS_IN_TRADING_YEAR, DAY_NS, STATS_KEYS
+from compfipy.util import calc_returns, drawdown_episodes
+
+FIELDS = ['Open', 'Close', 'High', 'Low', 'Volume']
+
+# Batch Statistics
+# ------------------------------------------------------------------------------------------------------------------------------
+def valid_span(values):
+    """
+    Return the first and last row with a value in each column of a 2-D array (0 and -1 for empty columns).
+    """
+    valid = ~np.isnan(values)
+    first = valid.argmax(axis=0)
+    last = len(values) - 1 - valid[::-1].argmax(axis=0)
+    empty = ~valid.any(axis=0)
+    first[empty] = 0
+    last[empty] = -1
+    return first, last
+
+def calc_stats(prices, yearly_risk_free_return=RISK_FREE_RATE, market_cap=1.0):
+    """
+    Calculate the Asset.calc_stats statistics for every column of a dates x symbols price matrix at once. Each symbol is
+    measured from its first to its last price, as if it were its own Asset. Returns a DataFrame with a row per symbol and a
+    column per stat; best and worst periods are the return values rather than one row Series.
+    """
+    # pylint: disable=too-many-locals,too-many-statements
+    prices = pd.DataFrame(prices).astype(float)
+    values = prices.values
+    dates = prices.index
+    cols = np.arange(values.shape[1])
+    first, last = valid_span(values)
+    first_price = values[first, cols]
+    last_price = values[last, cols]
+
+    monthly_risk_free_return = (np.power(1 + yearly_risk_free_return, 1.0 / MONTHS_IN_YEAR) - 1.0) * MONTHS_IN_YEAR
+    daily_risk_free_return = (np.power(1 + yearly_risk_free_return, 1.0 / DAYS_IN_TRADING_YEAR) - 1.0) * DAYS_IN_TRADING_YEAR
+
+    # Sample prices, each symbol's months and years run from its first to its last price
+    monthly_price = prices.resample('M').last()
+    yearly_price = prices.resample('A').last()
+    month_first, month_last = valid_span(monthly_price.values)
+    year_first, year_last = valid_span(yearly_price.values)
+    n_days = last - first + 1
+    n_months = month_last - month_first + 1
+    n_years = year_last - year_first + 1
+
+    stats = collections.OrderedDict()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Stats with daily prices
+        r = calc_returns(prices)
+        stats['daily_mean'] = DAYS_IN_TRADING_YEAR * r.mean().values
+        stats['daily_vol'] = np.sqrt(DAYS_IN_TRADING_YEAR) * r.std().values
+        stats['daily_sharpe'] = (stats['daily_mean'] - daily_risk_free_return) / stats['daily_vol']
+        stats['best_day'] = r.max().values
+        stats['worst_day'] = r.min().values
+        stats['total_return'] = (last_price / first_price) - 1.0
+        stats['cagr'] = _cagr(values, dates, first, last)
+        stats['incep'] = stats['cagr']
+        stats['max_drawdown'], stats['avg_drawdown'], stats['avg_drawdown_days'] = _drawdown_stats(values, dates, first, last)
+        stats['daily_skew'] = r.skew().values
+        stats['daily_kurt'] = _kurt(r)
+
+        # Stats with monthly prices
+        mr = calc_returns(monthly_price)
+        stats['monthly_mean'] = MONTHS_IN_YEAR * mr.mean().values
+        stats['monthly_vol'] = np.sqrt(MONTHS_IN_YEAR) * mr.std().values
+        stats['monthly_sharpe'] = (stats['monthly_mean'] - monthly_risk_free_return) / stats['monthly_vol']
+        stats['best_month'] = mr.max().values
+        stats['worst_month'] = mr.min().values
+        stats['mtd'] = (last_price / monthly_price.values[month_last - 1, cols]) - 1.0
+        stats['pos_month_perc'] = (mr > 0).sum().values / (n_months - 1.0)
+        stats['avg_up_month'] = mr.where(mr > 0).mean().values
+        stats['avg_down_month'] = mr.where(mr <= 0).mean().values
+        stats['three_month'] = (last_price / _lookback(values, dates, first, last, pd.DateOffset(months=3))[0]) - 1.0
+        stats['monthly_skew'] = mr.skew().values
+        stats['monthly_kurt'] = _kurt(mr)
+        stats['six_month'] = (last_price / _lookback(values, dates, first, last, pd.DateOffset(months=6))[0]) - 1.0
+
+        # Stats with yearly prices
+        yr = calc_returns(yearly_price)
+        stats['ytd'] = (last_price / yearly_price.values[year_last - 1, cols]) - 1.0
+        stats['one_year'] = (last_price / _lookback(values, dates, first, last, pd.DateOffset(years=1))[0]) - 1.0
+        stats['yearly_mean'] = yr.mean().values
+        stats['yearly_vol'] = yr.std().values
+        stats['yearly_sharpe'] = (stats['yearly_mean'] - yearly_risk_free_return) / stats['yearly_vol']
+        stats['best_year'] = yr.max().values
+        stats['worst_year'] = yr.min().values
+        for key, years in [('three_year', 3), ('five_year', 5), ('ten_year', 10)]:
+            start = _lookback(values, dates, first, last, pd.DateOffset(years=years), side='left')[1]
+            stats[key] = _cagr(values, dates, start, last)
+        stats['win_year_perc'] = (yr > 0).sum().values / (n_years - 1.0)
+        # Like pct_change, compare forward filled prices but skip months without a price
+        filled = monthly_price.ffill()
+        twelve_month = (filled / filled.shift(11) - 1.0).where(monthly_price.notnull())
+        stats['twelve_month_win_perc'] = (twelve_month > 0).sum().values / (n_months - (MONTHS_IN_YEAR - 1.0))
+        stats['yearly_skew'] = yr.skew().values
+        stats['yearly_kurt'] = _kurt(yr)
+
+    # Each group of stats needs enough history, like the early returns of Asset.calc_stats
+    daily = n_days >= 4
+    monthly = daily & (n_months >= 2)
+    groups = [
+        (daily, ['daily_mean', 'daily_vol', 'daily_sharpe', 'best_day', 'worst_day', 'total_return', 'cagr', 'incep',
+                 'max_drawdown', 'avg_drawdown', 'avg_drawdown_days', 'daily_skew', 'daily_kurt']),
+        (monthly, ['monthly_mean', 'monthly_vol', 'monthly_sharpe', 'best_month', 'worst_month', 'mtd', 'pos_month_perc',
+                   'avg_up_month', 'avg_down_month']),
+        (monthly & (n_months >= 3), ['three_month']),
+        (monthly & (n_months >= 4), ['monthly_skew', 'monthly_kurt', 'six_month']),
+        (monthly & (n_months >= 4) & (n_years >= 2), ['one_year', 'yearly_mean', 'yearly_vol', 'yearly_sharpe', 'best_year',
+                                                      'worst_year', 'three_year', 'win_year_perc', 'twelve_month_win_perc']),
+        (monthly & (n_months >= 4) & (n_years >= 4), ['yearly_skew', 'yearly_kurt', 'five_year', 'ten_year']),
+    ]
+    for ok, keys in groups:
+        for key in keys:
+            stats[key] = np.where(ok, stats[key], np.nan)
+    # Year to date falls back to the total return without a full prior year
+    stats['ytd'] = np.where(groups[4][0], stats['ytd'], stats['total_return'])
+
+    table = pd.DataFrame(stats, index=prices.columns)
+    table['name'] = prices.columns
+    table['start'] = np.where(n_days > 0, dates.values[first], np.datetime64('NaT'))
+    table['end'] = np.where(n_days > 0, dates.values[last], np.datetime64('NaT'))
+    table['market_cap'] = market_cap
+    table['yearly_risk_free_return'] = yearly_risk_free_return
+    table['return_table'] = _return_tables(monthly_price, mr, first_price, month_first, month_last, monthly)
+    return table[STATS_KEYS]
+
+def _kurt(returns):
+    """
+    Kurtosis of a returns matrix per column, NaN when every return is 0 or missing.
+    """
+    flat = (returns.fillna(0.0) == 0.0).all()
+    return returns.kurt().where(~flat).values
+
+def _lookback(values, dates, first, last, offset, side='right'):
+    """
+    Price and row per column at the last date on or before (side='right'), or the first date on or after (side='left'), the
+    column end date less offset, never before the column first date. The price is NaN when side='right' finds no date.
+    """
+    # pylint: disable=too-many-arguments
+    cols = np.arange(values.shape[1])
+    target = pd.DatetimeIndex(dates.values[last]) - offset
+    row = np.searchsorted(dates.asi8, target.asi8, side=side)
+    if side == 'right':
+        row = row - 1
+        return np.where(row >= first, values[np.maximum(row, 0), cols], np.nan), row
+    row = np.maximum(row, first)
+    return values[row, cols], row
+
+def _cagr(values, dates, start, end):
+    """
+    Compound annual growth rate per column between rows start and end, like util.calc_cagr.
+    """
+    cols = np.arange(values.shape[1])
+    days = (dates.asi8[end] - dates.asi8[start]) // DAY_NS
+    return np.power(values[end, cols] / values[start, cols], 1.0 / (days / DAYS_IN_YEAR)) - 1.0
+
+def _drawdown_stats(values, dates, first, last):
+    """
+    Max drawdown, average drawdown and average drawdown days per column, like Asset.drawdown_info. Every drawdown of every
+    column comes from one util.drawdown_episodes pass; columns that never draw down are NaN.
+    """
+    n_symbols = values.shape[1]
+    rows = np.arange(len(values))[:, np.newaxis]
+    inside = (rows >= first) & (rows <= last)
+    prices = pd.DataFrame(values).ffill().values
+    prices[~inside] = np.nan
+    drawdown = prices / np.fmax.accumulate(prices, axis=0) - 1.0
+    # Days outside a column's span are at its high, and episodes still open at its last date end there
+    drawdown[~inside] = 0.0
+    symbol, start, end, _, depth, _ = drawdown_episodes(drawdown)
+    end = np.minimum(end, last[symbol])
+    days = (dates.asi8[end] - dates.asi8[start]) // DAY_NS
+    count = np.bincount(symbol, minlength=n_symbols).astype(float)
+
+    max_drawdown = np.empty(n_symbols)
+    max_drawdown.fill(np.nan)
+    avg_drawdown = max_drawdown.copy()
+    avg_drawdown_days = max_drawdown.copy()
+    drawn = count > 0
+    max_drawdown[drawn] = 0.0
+    np.minimum.at(max_drawdown, symbol, depth)
+    avg_drawdown[drawn] = np.bincount(symbol, depth, minlength=n_symbols)[drawn] / count[drawn]
+    avg_drawdown_days[drawn] = np.bincount(symbol, days, minlength=n_symbols)[drawn] / count[drawn]
+    return max_drawdown, avg_drawdown, avg_drawdown_days
+
+def _return_tables(monthly_price, monthly_returns, first_price, month_first, month_last, ok):
+    """
+    Monthly return table per column, {year: {month: return, 13: year return}}, like Asset.calc_stats. The first month is
+    measured from the first daily price.
+    """
+    # pylint: disable=too-many-arguments
+    cols = np.arange(monthly_price.shape[1])
+    years = monthly_price.index.year
+    months = monthly_price.index.month
+    returns = monthly_returns.values.copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[month_first, cols] = (monthly_price.values[month_first, cols] / first_price) - 1
+    tables = []
+    for col in cols:
+        table = collections.defaultdict(dict)
+        if ok[col]:
+            for row in xrange(month_first[col], month_last[col] + 1):
+                table[years[row]][months[row]] = returns[row, col]
+            for year_months in table.values():
+                year_months[13] = np.prod(np.array(year_months.values()) + 1) - 1.0
+        tables.append(table)
+    return tables
+
+# Symbols With Different Dates
+# ------------------------------------------------------------------------------------------------------------------------------
+def by_dates(method):
+    """
+    Decorate an Asset method for Universe. When some symbols are missing dates inside their history that other symbols have,
+    each group of symbols missing the same dates is computed on its own rows and the results are realigned on the universe
+    dates, so no symbol sees a row its Asset would not have.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        # pylint: disable=protected-access,missing-docstring
+        groups = self._date_groups()
+        if not groups:
+            return method(self, *args, **kwargs)
+        return realign([getattr(group, method.__name__)(*args, **kwargs) for group in groups], self.symbols)
+    return wrapper
+
+def realign(results, symbols):
+    """
+    Join the results of groups of symbols (dates x symbols or (key, symbol) DataFrames, or tuples of them) on the union of
+    their dates, with the columns in symbols order.
+    """
+    if isinstance(results[0], tuple):
+        return tuple(realign(list(parts), symbols) for parts in zip(*results))
+    index = results[0].index
+    for result in results[1:]:
+        index = index.union(result.index)
+    joined = pd.concat([result.reindex(index) for result in results], axis=1)
+    if isinstance(joined.columns, pd.MultiIndex):
+        keys = results[0].columns.get_level_values(0).unique()
+        columns = pd.MultiIndex.from_product([keys, symbols], names=results[0].columns.names)
+    else:
+        columns = symbols
+    joined = joined.reindex(columns=columns)
+    joined.index.name = results[0].index.name
+    return joined
+
+# General Universe Class
+# ------------------------------------------------------------------------------------------------------------------------------
+class Universe(Asset):
+    """
+    Universe Class for storing OCHLV price data of many symbols on one date index. data is a pandas.DataFrame with (field,
+    symbol) columns, so close, high, etc. are dates x symbols DataFrames and the Asset overlays and indicators are computed
+    column-wise for all symbols at once. Multiple output indicators return (key, symbol) columns and compute_indicators
+    returns (indicator, symbol) columns, so result['rsi'] is a dates x symbols DataFrame. Values match running the Asset method
+    on each symbol to floating-point round-off. A symbol listed late (or delisted early) is NaN on the dates before (after)
+    its history, and rolling windows that reach back past its listing use only its own bars, as its Asset would. present
+    marks the dates each symbol has a row for. A symbol missing a date inside its history is NaN on that date and its
+    indicators and stats are computed without the row, as its Asset would (see by_dates).
+    """
+
+    def __init__(self, data=None, market_cap=1.0, cache_size=0, storage='frame', dtype=np.float64, present=None):
+        """
+        Create a universe from a pandas.DataFrame with (field, symbol) columns, or a dict of dates x symbols DataFrames keyed
+        by field. present is an optional dates x symbols boolean DataFrame of the dates each symbol has a row for, dates and
+        symbols it does not cover count as present.
+        """
+        # pylint: disable=too-many-arguments
+        if isinstance(data, dict):
+            data = pd.concat(data, axis=1)
+        self._present = None
+        self._groups = None
+        super(Universe, self).__init__(data, market_cap, cache_size, storage, dtype)
+        self._present = present
+
+    @classmethod
+    def from_assets(cls, assets, fields=None, **kwargs):
+        """
+        Create a universe from a list of Asset, keyed by symbol and aligned on the union of their dates, marking the dates
+        each asset has.
+        """
+        fields = fields if fields else FIELDS
+        # Compact assets build their data on every read, so read it once per asset
+        histories = [(asset.symbol, asset.data) for asset in assets]
+        frames = {field: pd.DataFrame({symbol: data[field] for symbol, data in histories}) for field in fields}
+        present = pd.DataFrame({symbol: pd.Series(True, index=data.index) for symbol, data in histories})
+        return cls(frames, present=present.fillna(False).astype(bool), **kwargs)
+
+    @classmethod
+    def from_cube(cls, cube, symbols=None, start=None, end=None, fields=None, **kwargs):
+        """
+        Create a universe from a cube written by store.write_cube, from start to end (inclusive). The price data is held
+        compact as read-only memory maps of the cube files, so nothing is read until it is used. Defaults to all symbols. The
+        dates each symbol has a stored row for are marked present.
+        """
+        dates, symbols, values = store.read_cube(cube, symbols, start, end, fields)
+        present = pd.DataFrame(store.read_cube_present(cube, symbols, start, end), index=dates, columns=symbols)
+        return cls(CompactOCHLV.from_arrays(None, dates, values, symbols), present=present, **kwargs)
+
+    @property
+    def symbols(self):
+        """
+        Return symbols of the universe.
+        """
+        return self.close.columns
+
+    @Asset.data.setter
+    def data(self, data):
+        """
+        Replace the price data of universe, invalidating cached results and the dates present.
+        """
+        Asset.data.fset(self, data)
+        self._present = None
+        self._groups = None
+
+    def append(self, data):
+        """
+        Append rows of price data, invalidating cached results. The appended dates count as present for every symbol.
+        """
+        present = self._present
+        super(Universe, self).append(data)
+        self._present = present
+
+    def _view(self, start, stop):
+        """
+        Return a Universe of rows start to stop sharing this universe's price arrays, with its own cache and stats.
+        """
+        view = super(Universe, self)._view(start, stop)
+        view._groups = None # pylint: disable=protected-access
+        return view
+
+    @property
+    def present(self):
+        """
+        Return a dates x symbols boolean DataFrame of the dates each symbol has a row for.
+        """
+        if self._present is None:
+            return pd.DataFrame(True, index=self.close.index, columns=self.symbols)
+        return self._present.reindex(index=self.close.index, columns=self.symbols).fillna(True).astype(bool)
+
+    def _date_groups(self):
+        """
+        Return a universe for each group of symbols missing the same dates inside their history, holding only its own rows,
+        or an empty list when no symbol is missing a date.
+        """
+        if self._groups is None:
+            self._groups = []
+            present = self.present.values
+            inside = np.logical_or.accumulate(present, axis=0) & np.logical_or.accumulate(present[::-1], axis=0)[::-1]
+            missing = inside & ~present
+            if missing.any():
+                groups = collections.OrderedDict()
+                for col in xrange(missing.shape[1]):
+                    groups.setdefault(missing[:, col].tobytes(), []).append(col)
+                self._groups = [self._subset(~missing[:, cols[0]], cols) for cols in groups.values()]
+        return self._groups
+
+    def _subset(self, rows, cols):
+        """
+        Return a Universe of the rows (a boolean mask) and columns (positions) of this universe, all present.
+        """
+        if self._storage == 'compact':
+            # pylint: disable=protected-access
+            fields = [(field, values[rows][:, cols]) for field, values in self._data.fields.items()]
+            data = CompactOCHLV.from_arrays(None, self._data.index[rows], fields, self.symbols[cols])
+        else:
+            data = self._data.iloc[rows, self._data.columns.get_level_values(1).isin(self.symbols[cols])]
+        return Universe(data, self.market_cap, self._cache_size, self._storage, self._dtype)
+
+    def asset(self, symbol):
+        """
+        Return the Asset of one symbol, on the dates it has.
+        """
+        rows = self.present[symbol].values
+        if self._storage == 'compact':
+            # pylint: disable=protected-access
+            column = self._data.symbols.get_loc(symbol)
+            fields = [(field, np.ascontiguousarray(values[rows, column])) for field, values in self._data.fields.items()]
+            compact = CompactOCHLV.from_arrays(symbol, self._data.index[rows], fields)
+            return Asset(compact, self.market_cap, storage=self._storage, dtype=self._dtype)
+        data = self.data.xs(symbol, axis=1, level=1)[rows].copy()
+        data.index = data.index.rename(symbol)
+        return Asset(data, self.market_cap, storage=self._storage, dtype=self._dtype)
+
+    # Summary stats
+    # --------------------------------------------------------------------------------------------------------------------------
+    def calc_stats(self, yearly_risk_free_return=RISK_FREE_RATE, full=True):
+        """
+        Calculate common statistics for every symbol, stats is a DataFrame with a row per symbol. The batch statistics are
+        always computed from the full price history, full is accepted for compatibility with Asset.calc_stats and ignored.
+        """
+        # pylint: disable=unused-argument
+        groups = self._date_groups()
+        if groups:
+            tables = [calc_stats(group.close, yearly_risk_free_return, self.market_cap) for group in groups]
+            self.stats = pd.concat(tables).reindex(self.symbols)
+        else:
+            self.stats = calc_stats(self.close, yearly_risk_free_return, self.market_cap)
+        return self
+
+# Every cached indicator (and compute_indicators, so intermediates are shared within a group) runs per group of dates
+for _name, _method in vars(Asset).items():
+    if (getattr(_method, 'cached', False) or _name == 'compute_indicators') and _name not in vars(Universe):
+        setattr(Universe, _name, by_dates(_method))
@@ -4,8 +4,15 @@ util.py
 General constants and functions that will be used throughout the package.
 """
 
+import collections
 import numpy as np
 import pandas as pd
+import scipy.signal
+
+try:
+    import numba
+except ImportError:
+    numba = None
 
 # Constants
 # ------------------------------------------------------------------------------------------------------------------------------
@@ -17,10 +24,24 @@ DEFAULT_INITIAL_PRICE = 100.0
 DAYS_IN_YEAR = 365.25
 DAYS_IN_TRADING_YEAR = 252.0
 MONTHS_IN_YEAR = 12.0
+DAY_NS = 86400 * 10**9
+
+# Kernel Constants
+ROLLING_BLOCK_SIZE = 2**20
 
 # Percent Constants
 RISK_FREE_RATE = 0.01
 
+# Stats Constants, in Asset.calc_stats order
+STATS_KEYS = [
+    'name', 'start', 'end', 'market_cap', 'yearly_risk_free_return', 'daily_mean', 'daily_vol', 'daily_sharpe', 'best_day',
+    'worst_day', 'total_return', 'cagr', 'incep', 'max_drawdown', 'avg_drawdown', 'avg_drawdown_days', 'daily_skew',
+    'daily_kurt', 'monthly_mean', 'monthly_vol', 'monthly_sharpe', 'best_month', 'worst_month', 'mtd', 'pos_month_perc',
+    'avg_up_month', 'avg_down_month', 'three_month', 'monthly_skew', 'monthly_kurt', 'six_month', 'ytd', 'one_year',
+    'yearly_mean', 'yearly_vol', 'yearly_sharpe', 'best_year', 'worst_year', 'three_year', 'win_year_perc',
+    'twelve_month_win_perc', 'yearly_skew', 'yearly_kurt', 'five_year', 'ten_year', 'return_table'
+]
+
 # Trading Signal Constants
 FIBONACCI_DECIMAL = np.array([0, 0.236, 0.382, 0.5, 0.618, 1])
 FIBONACCI_SEQUENCE = [0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233]
@@ -117,6 +138,12 @@ def ema(x, n=20):
     """
     return pd.ewma(x, n)
 
+def wma(x, n=20):
+    """
+    Return linearly weighted moving average pandas data, x, over interval, n, the latest value weighted n and the oldest 1.
+    """
+    return sum((n - i) * x.shift(i) for i in xrange(n)) / (n * (n + 1) / 2.0)
+
 def calc_returns(x):
     """
     Calculate arithmetic returns of price series.
@@ -143,12 +170,769 @@ def calc_cagr(x):
     end = x.index[-1]
     return np.power((x.ix[-1] / x.ix[0]), 1.0 / ((end - start).days / DAYS_IN_YEAR)) - 1.0
 
+def calc_drawdown_info(drawdown):
+    """
+    Return table of the drawdown episodes of a drawdown series: start, trough and end dates, days from start to end, days
+    from trough to recovery (NaN while still in drawdown) and drawdown depth.
+    """
+    _, start, end, trough, depth, recovered = drawdown_episodes(drawdown.values)
+    dates = drawdown.index
+    days = dates.asi8
+    return pd.DataFrame({
+        'start': dates[start],
+        'end': dates[end],
+        'trough': dates[trough],
+        'days': (days[end] - days[start]) // DAY_NS,
+        'recovery_days': np.where(recovered, (days[end] - days[trough]) // DAY_NS, np.nan),
+        'drawdown': depth
+    })
+
 def rebase_price(x, x0=DEFAULT_INITIAL_PRICE):
     """
     Convert a series to another initial price.
     """
     return x0 * x / x.ix[0]
 
+# Kernel Backends
+# ------------------------------------------------------------------------------------------------------------------------------
+# Sequential kernels (Parabolic SAR, Wilder smoothing, zigzag) run as numpy code or, with 'numba', as JIT compiled loops that
+# give identical results. Defaults to 'numba' when it is installed.
+KERNEL_BACKENDS = ('numpy', 'numba')
+KERNEL_BACKEND = 'numba' if numba is not None else 'numpy'
+JIT_KERNELS = {}
+
+def set_kernel_backend(backend):
+    """
+    Select the backend of the sequential kernels, 'numpy' or 'numba'.
+    """
+    global KERNEL_BACKEND # pylint: disable=global-statement
+    if backend not in KERNEL_BACKENDS:
+        raise ValueError('Unknown kernel backend: {}'.format(backend))
+    if backend == 'numba' and numba is None:
+        raise ImportError('The numba kernel backend needs numba installed')
+    KERNEL_BACKEND = backend
+
+def jit(kernel):
+    """
+    Return a loop kernel compiled by numba, compiling it on first use. Division follows numpy, inf or NaN rather than raising.
+    """
+    if kernel not in JIT_KERNELS:
+        JIT_KERNELS[kernel] = numba.njit(error_model='numpy', cache=True)(kernel)
+    return JIT_KERNELS[kernel]
+
+def _columns(values):
+    """
+    Return a 2-D dates x columns view of 1-D or 2-D values.
+    """
+    return values.reshape(len(values), -1)
+
+def _column_starts(start, n_columns):
+    """
+    Return a start row per column as a contiguous int64 array.
+    """
+    return np.ascontiguousarray(np.broadcast_to(np.asarray(start), (n_columns,)), dtype=np.int64)
+
+# Array Kernels
+# ------------------------------------------------------------------------------------------------------------------------------
+def like(x, values):
+    """
+    Wrap numpy values in the pandas type of x (Series or DataFrame), numpy data is returned as is.
+    """
+    if isinstance(x, pd.Series):
+        return pd.Series(values, index=x.index, name=x.name)
+    elif isinstance(x, pd.DataFrame):
+        return pd.DataFrame(values, index=x.index, columns=x.columns)
+    else:
+        return values
+
+def combine(results, keys=None):
+    """
+    Combine a dict of named pandas results into one DataFrame, with keys in order (default sorted). Series become columns and
+    dates x symbols DataFrames become column groups, so result[key] returns the original either way.
+    """
+    keys = sorted(results) if keys is None else keys
+    if any(isinstance(results[key], pd.DataFrame) for key in keys):
+        return pd.concat([results[key] for key in keys], axis=1, keys=keys)
+    return pd.DataFrame(results, columns=keys)
+
+def first_valid(x):
+    """
+    Return the row of the first valid value of pandas or numpy data, x, per column (the length of x if there is none).
+    """
+    valid = ~np.isnan(np.asarray(x, dtype=float))
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(valid))
+
+def wilder_smooth(x, n=14, start=0):
+    """
+    Return Wilder's recursive smoothing of pandas or numpy data, x, over interval, n, along the first (date) axis.
+        avg[n] = sum(x[0:n]) / n
+        avg[i] = (n - 1) * avg[i - 1] / n + x[i] / n, for i > n
+    Values before n are NaN and NaNs are ignored in the seed sum. After the seed a NaN input gives NaN for that row and the
+    average is held over it. The recursion is run as a first order linear filter, so a single column or a 2-D dates x symbols
+    block is smoothed at once. Rows are counted from start, which may be given per column for symbols whose history begins
+    later.
+    """
+    values = np.asarray(x, dtype=float)
+    smooth = np.empty(values.shape)
+    smooth.fill(np.nan)
+    starts = np.asarray(start)
+    if KERNEL_BACKEND == 'numba':
+        columns = np.ascontiguousarray(_columns(values))
+        jit(_wilder_smooth_loop)(columns, n, _column_starts(starts, columns.shape[1]), _columns(smooth))
+    elif starts.ndim == 0:
+        smooth[starts:] = _wilder_smooth(values[starts:], n)
+    else:
+        for first in np.unique(starts):
+            columns = starts == first
+            smooth[first:, columns] = _wilder_smooth(values[first:, columns], n)
+    return like(x, smooth)
+
+def _wilder_smooth(values, n):
+    """
+    Wilder's smoothing of raw values counted from the first row.
+    """
+    smooth = np.empty(values.shape)
+    smooth.fill(np.nan)
+    if len(values) > n:
+        # Sum the seed row by row, so one symbol and a block of symbols round the same way
+        seed = np.zeros(values.shape[1:])
+        for row in values[:n]:
+            seed = seed + np.where(np.isnan(row), 0.0, row)
+        seed = seed / n
+        smooth[n] = seed
+        if len(values) > n + 1:
+            decay = (n - 1.0) / n
+            tail = _columns(values[n + 1:])
+            gaps = np.isnan(tail).any(axis=0)
+            out = np.empty(tail.shape)
+            zi = decay * np.reshape(seed, -1)
+            out[:, ~gaps], _ = scipy.signal.lfilter(
+                [1.0 / n], [1.0, -decay], tail[:, ~gaps], axis=0, zi=np.expand_dims(zi[~gaps], 0)
+            )
+            # Columns with NaN inputs run the recursion over their valid rows only, holding the average across the gaps
+            out[:, gaps] = np.nan
+            for col in np.flatnonzero(gaps):
+                valid = ~np.isnan(tail[:, col])
+                if valid.any():
+                    out[valid, col], _ = scipy.signal.lfilter([1.0 / n], [1.0, -decay], tail[valid, col], zi=zi[col:col + 1])
+            smooth[n + 1:] = out.reshape(smooth[n + 1:].shape)
+    return smooth
+
+def _wilder_smooth_loop(values, n, starts, smooth):
+    """
+    Wilder's smoothing of each column from its start row, written into smooth. A plain loop for the numba backend, rounding
+    like the seed sum and lfilter recursion of _wilder_smooth, NaN inputs after the seed are skipped and left NaN.
+    """
+    b0 = 1.0 / n
+    a1 = -((n - 1.0) / n)
+    for col in range(values.shape[1]):
+        first = starts[col]
+        if values.shape[0] - first <= n:
+            continue
+        seed = 0.0
+        for i in range(first, first + n):
+            if values[i, col] == values[i, col]:
+                seed = seed + values[i, col]
+        seed = seed / n
+        smooth[first + n, col] = seed
+        z = -a1 * seed
+        for i in range(first + n + 1, values.shape[0]):
+            x = values[i, col]
+            if x != x:
+                continue
+            y = z + b0 * x
+            z = 0.0 * x - a1 * y
+            smooth[i, col] = y
+
+def psar(high, low, step_r=0.02, step_f=0.02, max_af_r=0.2, max_af_f=0.2, start=0):
+    """
+    Return the rising and falling Parabolic SAR of high and low pandas or numpy data, as a tuple (rising, falling).
+    One symbol is run as a plain float loop, a 2-D dates x symbols block is run one date at a time with the trend state of
+    every symbol held in arrays. Bars that are not in a rising (falling) trend are 0. The trend starts at row start, which may
+    be given per column for symbols whose history begins later.
+    """
+    # pylint: disable=too-many-arguments
+    high_values = np.asarray(high, dtype=float)
+    low_values = np.asarray(low, dtype=float)
+    rising = np.zeros(high_values.shape)
+    falling = np.zeros(high_values.shape)
+    starts = np.asarray(start)
+    if KERNEL_BACKEND == 'numba':
+        high_columns = np.ascontiguousarray(_columns(high_values))
+        jit(_parabolic_sar_loop)(
+            high_columns, np.ascontiguousarray(_columns(low_values)), _column_starts(starts, high_columns.shape[1]),
+            step_r, step_f, max_af_r, max_af_f, _columns(rising), _columns(falling)
+        )
+    elif high_values.ndim == 1:
+        rising[starts:], falling[starts:] = _parabolic_sar_1d(
+            high_values[starts:], low_values[starts:], step_r, step_f, max_af_r, max_af_f
+        )
+    else:
+        for first in np.unique(np.broadcast_to(starts, high_values.shape[1:])):
+            columns = np.broadcast_to(starts, high_values.shape[1:]) == first
+            rising[first:, columns], falling[first:, columns] = _parabolic_sar_2d(
+                high_values[first:, columns], low_values[first:, columns], step_r, step_f, max_af_r, max_af_f
+            )
+    return like(high, rising), like(high, falling)
+
+def _parabolic_sar_1d(high, low, step_r, step_f, max_af_r, max_af_f):
+    """
+    Parabolic SAR of one symbol on raw floats.
+    """
+    # pylint: disable=too-many-arguments
+    rising = np.zeros(len(high))
+    falling = np.zeros(len(high))
+    if len(high) == 0:
+        return rising, falling
+    high = high.tolist()
+    low = low.tolist()
+    ep = high[0]
+    af = step_r
+    sar = low[0]
+    up = True
+
+    for i in xrange(1, len(high)):
+        h = high[i]
+        l = low[i]
+        if up:
+            # Rising SAR, a NaN extreme point stays NaN
+            if ep != ep or h != h:
+                ep = np.nan
+            elif h > ep:
+                ep = h
+            af = min(af + step_r if ep == h else af, max_af_r)
+            sar = sar + af * (ep - sar)
+            rising[i] = sar
+        else:
+            # Falling SAR
+            if ep != ep or l != l:
+                ep = np.nan
+            elif l < ep:
+                ep = l
+            af = min(af + step_f if ep == l else af, max_af_f)
+            sar = sar + af * (ep - sar)
+            falling[i] = sar
+        # Trend switch
+        if up and (sar > l or sar > h):
+            up = False
+            sar = ep
+            af = step_f
+        elif not up and (sar < l or sar < h):
+            up = True
+            sar = ep
+            af = step_r
+
+    return rising, falling
+
+def _parabolic_sar_2d(high, low, step_r, step_f, max_af_r, max_af_f):
+    """
+    Parabolic SAR of a dates x symbols block, stepping all symbols together.
+    """
+    # pylint: disable=too-many-arguments
+    rising = np.zeros(high.shape)
+    falling = np.zeros(high.shape)
+    if len(high) == 0:
+        return rising, falling
+    ep = high[0].copy()
+    af = np.empty(high.shape[1:])
+    af.fill(step_r)
+    sar = low[0].copy()
+    up = np.ones(high.shape[1:], dtype=bool)
+
+    for i in xrange(1, len(high)):
+        h = high[i]
+        l = low[i]
+        # Rising and falling symbols update their extreme point and acceleration factor
+        ep = np.where(up, np.maximum(ep, h), np.minimum(ep, l))
+        af = np.where(
+            up,
+            np.minimum(np.where(ep == h, af + step_r, af), max_af_r),
+            np.minimum(np.where(ep == l, af + step_f, af), max_af_f)
+        )
+        sar = sar + af * (ep - sar)
+        rising[i] = np.where(up, sar, 0.0)
+        falling[i] = np.where(up, 0.0, sar)
+        # Trend switch
+        down_switch = up & ((sar > l) | (sar > h))
+        up_switch = ~up & ((sar < l) | (sar < h))
+        switch = down_switch | up_switch
+        sar = np.where(switch, ep, sar)
+        af = np.where(down_switch, step_f, np.where(up_switch, step_r, af))
+        up = up ^ switch
+
+    return rising, falling
+
+def _parabolic_sar_loop(high, low, starts, step_r, step_f, max_af_r, max_af_f, rising, falling):
+    """
+    Parabolic SAR of each column from its start row, written into rising and falling. A plain loop for the numba backend,
+    stepping like _parabolic_sar_1d.
+    """
+    # pylint: disable=too-many-arguments
+    for col in range(high.shape[1]):
+        first = starts[col]
+        if first >= high.shape[0]:
+            continue
+        ep = high[first, col]
+        af = step_r
+        sar = low[first, col]
+        up = True
+        for i in range(first + 1, high.shape[0]):
+            h = high[i, col]
+            l = low[i, col]
+            if up:
+                if ep != ep or h != h:
+                    ep = np.nan
+                elif h > ep:
+                    ep = h
+                af = min(af + step_r if ep == h else af, max_af_r)
+                sar = sar + af * (ep - sar)
+                rising[i, col] = sar
+            else:
+                if ep != ep or l != l:
+                    ep = np.nan
+                elif l < ep:
+                    ep = l
+                af = min(af + step_f if ep == l else af, max_af_f)
+                sar = sar + af * (ep - sar)
+                falling[i, col] = sar
+            if up and (sar > l or sar > h):
+                up = False
+                sar = ep
+                af = step_f
+            elif not up and (sar < l or sar < h):
+                up = True
+                sar = ep
+                af = step_r
+
+def zigzag_pivots(close, percent=7.0, start=0):
+    """
+    Return the zigzag pivots of close pandas or numpy data, per column, as booleans like close. The close at row start is a
+    pivot and each later close is one when it moves more than percent from the last pivot. start may be given per column for
+    symbols whose history begins later.
+    """
+    values = np.asarray(close, dtype=float)
+    pivots = np.zeros(values.shape, dtype=bool)
+    threshold = percent / 100.0
+    starts = np.asarray(start)
+    if len(values) == 0:
+        return like(close, pivots)
+    if KERNEL_BACKEND == 'numba':
+        columns = np.ascontiguousarray(_columns(values))
+        jit(_zigzag_loop)(columns, threshold, _column_starts(starts, columns.shape[1]), _columns(pivots))
+    elif values.ndim == 1:
+        pivots[starts:] = _zigzag_1d(values[starts:], threshold)
+    else:
+        # Step all symbols together, one date at a time, each symbol's last pivot is NaN until its start
+        starts = np.broadcast_to(starts, values.shape[1:])
+        last = np.empty(values.shape[1:])
+        last.fill(np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i in xrange(starts.min(), len(values)):
+                pivots[i] = (np.abs((last - values[i]) / values[i]) > threshold) | (starts == i)
+                last = np.where(pivots[i], values[i], last)
+    return like(close, pivots)
+
+def _zigzag_1d(values, threshold):
+    """
+    Zigzag pivots of one symbol on raw floats.
+    """
+    pivots = np.zeros(len(values), dtype=bool)
+    if len(values) == 0:
+        return pivots
+    values = values.tolist()
+    last = values[0]
+    pivots[0] = True
+    for i in xrange(1, len(values)):
+        x = values[i]
+        # Divide like numpy when the close is 0
+        move = abs((last - x) / x) if x else abs(np.float64(last - x) / x)
+        if move > threshold:
+            pivots[i] = True
+            last = x
+    return pivots
+
+def _zigzag_loop(values, threshold, starts, pivots):
+    """
+    Zigzag pivots of each column from its start row, written into pivots. A plain loop for the numba backend, run a date at a
+    time to read values in memory order.
+    """
+    last = np.empty(values.shape[1])
+    for i in range(values.shape[0]):
+        for col in range(values.shape[1]):
+            if i == starts[col] or (i > starts[col] and abs((last[col] - values[i, col]) / values[i, col]) > threshold):
+                pivots[i, col] = True
+                last[col] = values[i, col]
+
+def zigzag_line(close, pivots):
+    """
+    Return the zigzag line of close pandas or numpy data through its pivots, like close. Rows between two pivots are linearly
+    interpolated, rows after the last pivot hold its price up to the last valid close and the rest are NaN.
+    """
+    values = np.asarray(close, dtype=float)
+    is_pivot = np.asarray(pivots, dtype=bool)
+    rows = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+
+    # Previous and next pivot row of every row, -1 and len(values) where there is none
+    prev = np.maximum.accumulate(np.where(is_pivot, rows, -1), axis=0)
+    after = np.minimum.accumulate(np.where(is_pivot, rows, len(values))[::-1], axis=0)[::-1]
+    has_next = after < len(values)
+    prev_price = np.take_along_axis(values, prev.clip(0), axis=0)
+    next_price = np.take_along_axis(values, np.where(has_next, after, prev).clip(0), axis=0)
+
+    # Interpolate like np.interp, holding the last pivot
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (next_price - prev_price) / (after - prev)
+        line = np.where(has_next, slope * (rows - prev) + prev_price, prev_price)
+    line[is_pivot] = values[is_pivot]
+    line[(prev < 0) | (rows > len(values) - 1 - first_valid(values[::-1]))] = np.nan
+    return like(close, line)
+
+def zigzag_pivot_list(close, pivots):
+    """
+    Return the pivots of close pandas or numpy data as a DataFrame of date, price and direction in date order. Direction is 1
+    where the zigzag rose into the pivot, -1 where it fell and 0 at a symbol's first pivot. 2-D data adds a symbol column.
+    """
+    values = _columns(np.asarray(close, dtype=float))
+    col, row = np.nonzero(_columns(np.asarray(pivots, dtype=bool)).T)
+    price = values[row, col]
+    direction = np.sign(np.diff(price, prepend=np.nan))
+    direction[np.r_[True, col[1:] != col[:-1]]] = 0
+    order = np.lexsort((col, row))
+
+    table = pd.DataFrame(collections.OrderedDict([
+        ('date', close.index[row] if hasattr(close, 'index') else row),
+        ('symbol', close.columns[col] if isinstance(close, pd.DataFrame) else col),
+        ('price', price),
+        ('direction', direction.astype(int)),
+    ])).iloc[order].reset_index(drop=True)
+    return table if np.ndim(close) > 1 else table.drop('symbol', axis=1)
+
+def rolling_extrema(high, n=20, low=None, min_periods=None):
+    """
+    Return the rolling maximum of high and rolling minimum of low (defaults to high) pandas or numpy data over interval, n, as a
+    tuple (n_day_high, n_day_low, argmax, argmin). argmax and argmin are the row positions of the most recent extremes.
+    NaNs are skipped like pandas rolling max and min, windows with fewer than min_periods (defaults to n, at least 1) valid
+    values are NaN. Uses the van Herk/Gil-Werman block scan, O(n) with a few whole-array passes, along the first axis so a 2-D
+    dates x symbols block is done at once.
+    """
+    high_values = np.asarray(high, dtype=float)
+    low_values = high_values if low is None else np.asarray(low, dtype=float)
+    min_periods = n if min_periods is None else max(min(min_periods, n), 1)
+    n_day_high, argmax = _rolling_max(high_values, n, min_periods)
+    n_day_low, argmin = _rolling_max(-low_values, n, min_periods)
+    return like(high, n_day_high), like(high, -n_day_low), like(high, argmax), like(high, argmin)
+
+def rolling_sums(inputs, windows, block_size=ROLLING_BLOCK_SIZE):
+    """
+    Return the rolling sums of several aligned pandas or numpy inputs over several windows, as a list per input of a list per
+    window, each like its input. One cumulative sum of each input serves every window. Windows containing NaN or inf, or
+    shorter than the window at the start, are NaN. Rows are summed in blocks of about block_size values (overlapping by the
+    longest window), which bounds both the temporaries and the size of the running totals.
+    """
+    longest = max(windows)
+    sums = []
+    for x in inputs:
+        values = np.asarray(x, dtype=float)
+        length = len(values)
+        width = values[0].size if length else 1
+        block = max(block_size // width, 4 * longest)
+        out = [np.empty(values.shape) for _ in windows]
+        for result in out:
+            result.fill(np.nan)
+
+        for begin in xrange(0, length, block):
+            stop = min(begin + block, length)
+            lo = max(begin - longest + 1, 0)
+            chunk = values[lo:stop]
+            missing = ~np.isfinite(chunk)
+            total = np.zeros((len(chunk) + 1,) + values.shape[1:])
+            np.cumsum(np.where(missing, 0.0, chunk), axis=0, out=total[1:])
+            count = np.zeros(total.shape, dtype=np.int64)
+            np.cumsum(missing, axis=0, out=count[1:])
+
+            # The window ending at row i is total[i - lo + 1] - total[i - lo + 1 - n]
+            for n, result in zip(windows, out):
+                first = max(begin, n - 1)
+                if first >= stop:
+                    continue
+                rows = slice(first - lo + 1, stop - lo + 1)
+                back = slice(first - lo + 1 - n, stop - lo + 1 - n)
+                window = total[rows] - total[back]
+                window[count[rows] > count[back]] = np.nan
+                result[first:stop] = window
+        sums.append([like(x, result) for result in out])
+    return sums
+
+def bars_since_extrema(high, n=20, low=None, min_periods=None):
+    """
+    Return the bars since the rolling maximum of high and rolling minimum of low (defaults to high) pandas or numpy data over
+    interval, n, as a tuple (bars_since_high, bars_since_low). The bar setting an extreme counts 0 and ties count from the most
+    recent one, so values run from 0 to n - 1. NaN where rolling_extrema is NaN.
+    """
+    _, _, argmax, argmin = rolling_extrema(high, n, low, min_periods)
+    return bars_since(argmax), bars_since(argmin)
+
+def bars_since(positions):
+    """
+    Return the bars from the row positions of pandas or numpy data (like the argmax and argmin of rolling_extrema) to each row.
+    """
+    rows = np.arange(len(positions)).reshape((-1,) + (1,) * (np.ndim(positions) - 1))
+    return like(positions, rows - np.asarray(positions))
+
+def _rolling_max(values, n, min_periods):
+    """
+    Rolling maximum and position of the most recent maximum along the first axis, from block prefix and suffix maximums.
+    NaNs are skipped and windows with fewer than min_periods valid values are NaN.
+    """
+    length = len(values)
+    n_day_high = np.empty(values.shape)
+    n_day_high.fill(np.nan)
+    argmax = n_day_high.copy()
+    if length == 0:
+        return n_day_high, argmax
+
+    # Count the valid values of each window, NaN never wins a maximum as -inf
+    missing = np.isnan(values)
+    valid = np.zeros((length + 1,) + values.shape[1:], dtype=np.int64)
+    np.cumsum(~missing, axis=0, out=valid[1:])
+    valid = valid[1:] - valid[np.maximum(np.arange(1, length + 1) - n, 0)]
+    values = np.where(missing, -np.inf, values)
+
+    # Split into blocks of n, padding the end of the last block
+    blocks = -(-length // n)
+    padded = np.empty((blocks * n,) + values.shape[1:])
+    padded.fill(-np.inf)
+    padded[:length] = values
+    padded = padded.reshape((blocks, n) + values.shape[1:])
+    position = np.arange(blocks * n).reshape((blocks, n) + (1,) * (values.ndim - 1))
+
+    # Running max from each block start, the most recent position to reach it
+    prefix = np.maximum.accumulate(padded, axis=1)
+    prefix_arg = np.maximum.accumulate(np.where(padded == prefix, position, -1), axis=1)
+
+    # Running max to each block end, the position that beats everything after it
+    suffix = np.maximum.accumulate(padded[:, ::-1], axis=1)[:, ::-1]
+    after = np.empty(suffix.shape)
+    after[:, :-1] = suffix[:, 1:]
+    after[:, -1] = -np.inf
+    suffix_arg = np.minimum.accumulate(np.where(padded > after, position, blocks * n)[:, ::-1], axis=1)[:, ::-1]
+
+    # Back to one row per date
+    flat_shape = (blocks * n,) + values.shape[1:]
+    prefix = prefix.reshape(flat_shape)[:length]
+    prefix_arg = prefix_arg.reshape(flat_shape)[:length]
+    suffix = suffix.reshape(flat_shape)[:length]
+    suffix_arg = suffix_arg.reshape(flat_shape)[:length]
+
+    # A full window is the suffix of the block it starts in plus the prefix of the block it ends in
+    if length >= n:
+        use_prefix = prefix[n - 1:] >= suffix[:length - n + 1]
+        n_day_high[n - 1:] = np.maximum(prefix[n - 1:], suffix[:length - n + 1])
+        argmax[n - 1:] = np.where(use_prefix, prefix_arg[n - 1:], suffix_arg[:length - n + 1])
+    # Partial windows at the start are prefixes of the first block
+    start = min(n - 1, length)
+    n_day_high[:start] = prefix[:start]
+    argmax[:start] = prefix_arg[:start]
+
+    too_few = valid < min_periods
+    n_day_high[too_few] = np.nan
+    argmax[too_few] = np.nan
+    return n_day_high, argmax
+
+def volume_profile(close, volume, n=14, block_num=12):
+    """
+    Return the rolling volume by price of close and volume pandas or numpy data as a numpy array. For every date the volume of
+    the last n days is tallied into block_num price blocks spaced evenly from the n day closing low to the n day closing high,
+    a price falls in the last block edge at or below it. Dates before the first full window are 0.
+    One symbol returns a dates x blocks array, a 2-D dates x symbols block returns a dates x symbols x blocks array.
+    """
+    close_values = np.asarray(close, dtype=float)
+    volume_values = np.asarray(volume, dtype=float)
+    profile = np.zeros(close_values.shape + (block_num,))
+    if len(close_values) < n:
+        return profile
+
+    # Block edges of each full window, built like np.linspace(low, high, block_num)
+    high, low, _, _ = rolling_extrema(close_values, n)
+    high = high[n - 1:]
+    low = low[n - 1:]
+    step = (high - low) / max(block_num - 1, 1)
+    edges = np.arange(block_num) * step[..., np.newaxis] + low[..., np.newaxis]
+    edges[..., -1] = high
+    window_profile = profile[n - 1:]
+
+    # Bin every day of every window at once, one pass per position within the window
+    for lag in xrange(n):
+        end = len(close_values) - lag
+        price = close_values[n - 1 - lag:end]
+        day_volume = volume_values[n - 1 - lag:end]
+        blocks = np.maximum((edges <= price[..., np.newaxis]).sum(axis=-1) - 1, 0)
+        valid = np.isfinite(price) & np.isfinite(day_volume) & np.isfinite(high) & np.isfinite(low)
+        np.add.at(window_profile, np.nonzero(valid) + (blocks[valid],), day_volume[valid])
+
+    return profile
+
+def drawdown_episodes(drawdown):
+    """
+    Find every drawdown episode of a drawdown array, 1-D or dates x symbols, in one pass. An episode starts on the first day
+    below the high (or the first day, if it is) and ends on the day back at the high, or on the last day while still in
+    drawdown. Days with no drawdown value count as below the high. Returns arrays of the column, start, end and trough row,
+    depth and whether the high was regained, one entry per episode ordered by column then start.
+    """
+    values = np.asarray(drawdown, dtype=float)
+    n_dates = max(len(values), 1)
+    flat = values.reshape(len(values), -1).T.ravel()
+
+    # Episode boundaries as flat (column, row) positions, each column starts at its high
+    at_high = flat == 0
+    prior = np.roll(at_high, 1)
+    prior[::n_dates] = True
+    starts = np.flatnonzero(~at_high & prior)
+    if not len(starts):
+        empty = np.zeros(0, dtype=int)
+        return empty, empty, empty, empty, np.zeros(0), np.zeros(0, dtype=bool)
+    highs = np.flatnonzero(at_high & ~prior)
+    column = starts // n_dates
+    column_end = (column + 1) * n_dates - 1
+    following = np.searchsorted(highs, starts)
+    ends = np.append(highs, len(flat))[following]
+    recovered = ends <= column_end
+    ends = np.where(recovered, ends, column_end)
+
+    # Depth is the NaN ignoring minimum over [start, end], the sentinel keeps end + 1 in bounds
+    bounds = np.empty(2 * len(starts), dtype=int)
+    bounds[0::2] = starts
+    bounds[1::2] = ends + 1
+    depth = np.fmin.reduceat(np.append(flat, np.nan), bounds)[0::2]
+
+    # Trough is the first day of each episode at its depth
+    marks = np.zeros(len(flat) + 1, dtype=int)
+    np.add.at(marks, starts, 1)
+    np.add.at(marks, ends + 1, -1)
+    inside = np.cumsum(marks)[:-1] > 0
+    episode = np.maximum(np.cumsum(np.bincount(starts, minlength=len(flat))) - 1, 0)
+    hits = np.flatnonzero(inside & (flat == depth[episode]))
+    trough = starts.copy()
+    found, first = np.unique(episode[hits], return_index=True)
+    trough[found] = hits[first]
+
+    return column, starts - column * n_dates, ends - column * n_dates, trough - column * n_dates, depth, recovered
+
+def market_comparison(returns, benchmarks, risk_free_rate=RISK_FREE_RATE):
+    """
+    Regress every column of a returns matrix on every benchmark returns column at once, each pair over the dates both have a
+    return. Returns a DataFrame with a row per returns column and beta, alpha, r_squared, tracking_error and
+    information_ratio columns, keyed by (stat, benchmark) when benchmarks is a DataFrame. Alpha is the mean return over
+    risk_free_rate less beta times the benchmark mean over it, like Asset.alpha.
+    """
+    # pylint: disable=too-many-locals
+    keys = None if isinstance(benchmarks, pd.Series) else pd.DataFrame(benchmarks).columns
+    returns = pd.DataFrame(returns)
+    benchmarks = pd.DataFrame(benchmarks).reindex(returns.index)
+    r, r_valid, r_center = _centered(returns.values)
+    m, m_valid, m_center = _centered(benchmarks.values)
+
+    # Pairwise sums as matrix products, symbols x benchmarks
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = r_valid.T.dot(m_valid)
+        sum_r = r.T.dot(m_valid)
+        sum_m = r_valid.T.dot(m)
+        mean_r = sum_r / n
+        mean_m = sum_m / n
+        cov = (r.T.dot(m) - sum_r * mean_m) / (n - 1)
+        var_r = (np.square(r).T.dot(m_valid) - sum_r * mean_r) / (n - 1)
+        var_m = (r_valid.T.dot(np.square(m)) - sum_m * mean_m) / (n - 1)
+        mean_r = mean_r + r_center[:, np.newaxis]
+        mean_m = mean_m + m_center[np.newaxis, :]
+        beta = cov / var_m
+        tracking_error = np.sqrt(np.maximum(var_r + var_m - 2.0 * cov, 0.0))
+        stats = {
+            'beta': beta,
+            'alpha': mean_r - risk_free_rate - beta * (mean_m - risk_free_rate),
+            'r_squared': np.square(cov) / (var_r * var_m),
+            'tracking_error': tracking_error,
+            'information_ratio': (mean_r - mean_m) / tracking_error
+        }
+
+    columns = ['beta', 'alpha', 'r_squared', 'tracking_error', 'information_ratio']
+    if keys is None:
+        return pd.DataFrame({key: stat[:, 0] for key, stat in stats.items()}, index=returns.columns, columns=columns)
+    return combine({key: pd.DataFrame(stat, index=returns.columns, columns=keys) for key, stat in stats.items()}, columns)
+
+def _centered(values):
+    """
+    Return values less each column mean with missing and infinite values as 0, the valid mask as floats and the column means.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = np.isfinite(values)
+    centered = np.where(valid, values, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        center = centered.sum(axis=0) / valid.sum(axis=0)
+    centered -= np.nan_to_num(center)
+    centered[~valid] = 0.0
+    return centered, valid.astype(float), center
+
+def rolling_comparison(returns, benchmark=None, n=63):
+    """
+    Rolling deviation risk (standard deviation) of returns and, with benchmark returns, rolling beta, correlation, tracking
+    error and information ratio (mean over standard deviation of returns less benchmark returns, as are Asset.sharpe_ratio
+    and Asset.information_ratio). n is a window or a list of windows, keyed (stat, n). All windows come from one set of
+    cumulative sums of x, y, x^2, y^2 and xy, so each costs O(dates) whatever its length. Windows with a missing value are
+    NaN, like pandas rolling. pandas returns give a DataFrame and a benchmark Series is aligned on their dates. numpy returns
+    (one column or a dates x symbols array) give a dict of arrays with the same keys. Otherwise the benchmark must have a
+    return per row of returns.
+    """
+    # pylint: disable=too-many-locals
+    windows = [n] if np.isscalar(n) else list(n)
+    frame = isinstance(returns, (pd.Series, pd.DataFrame))
+    x, x_valid, x_center = _centered(np.asarray(returns, dtype=float).reshape(len(returns), -1))
+    terms = {'n_x': x_valid, 'x': x, 'xx': np.square(x)}
+    if benchmark is not None:
+        if frame and isinstance(benchmark, pd.Series):
+            benchmark = benchmark.reindex(returns.index)
+        benchmark = np.asarray(benchmark, dtype=float).reshape(-1)
+        if len(benchmark) != len(returns):
+            raise ValueError('benchmark must have a return per row of returns')
+        y, y_valid, y_center = _centered(benchmark)
+        y, y_valid = y[:, np.newaxis], y_valid[:, np.newaxis]
+        # Pair sums only count days both have a return, a side with no missing days stays one column or unmasked
+        x_all, y_all = x_valid.all(), y_valid.all()
+        terms['n'] = x_valid if y_all else (y_valid if x_all else x_valid * y_valid)
+        terms['x_pair'] = x if y_all else x * y_valid
+        terms['xx_pair'] = terms['xx'] if y_all else np.square(terms['x_pair'])
+        terms['y'] = y if x_all else y * x_valid
+        terms['yy'] = np.square(terms['y'])
+        terms['xy'] = terms['x_pair'] * y
+    # Cumulative sums with a leading 0, so every window sum is one subtraction
+    totals = {key: np.vstack([np.zeros((1, term.shape[1])), term.cumsum(axis=0)]) for key, term in terms.items()}
+
+    results = {}
+    for w in windows:
+        # Sums of the windows ending on rows w - 1 onwards, NaN unless the window has no missing days
+        sums = {key: total[w:] - total[:-w] for key, total in totals.items()}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sums['x'][sums['n_x'] != w] = np.nan
+            # Sums of squared deviations scaled by w, so the (w - 1) and w factors cancel in the ratios
+            dev_x = w * sums['xx'] - np.square(sums['x'])
+            stats = {'deviation_risk': np.sqrt(np.maximum(dev_x, 0.0) / (w * (w - 1.0)))}
+            if benchmark is not None:
+                x_pair = np.where(sums['n'] == w, sums['x_pair'], np.nan)
+                dev_x = w * sums['xx_pair'] - np.square(x_pair)
+                dev_y = w * sums['yy'] - np.square(sums['y'])
+                dev_xy = w * sums['xy'] - x_pair * sums['y']
+                tracking_error = np.sqrt(np.maximum(dev_x + dev_y - 2.0 * dev_xy, 0.0) / (w * (w - 1.0)))
+                stats['beta'] = dev_xy / dev_y
+                stats['correlation'] = dev_xy / np.sqrt(dev_x * dev_y)
+                stats['tracking_error'] = tracking_error
+                stats['information_ratio'] = ((x_pair - sums['y']) / w + (x_center - y_center)) / tracking_error
+        for key, stat in stats.items():
+            padded = np.empty(x.shape)
+            padded[:w - 1] = np.nan
+            padded[w - 1:] = stat
+            results[key if np.isscalar(n) else (key, w)] = like(returns, padded if np.ndim(returns) == 2 else padded[:, 0])
+
+    return combine(results) if frame else results
+
 # General Number Helper Functions
 # ------------------------------------------------------------------------------------------------------------------------------
 def scale(x, (xmin, xmax), (ymin, ymax)):
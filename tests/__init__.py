@@ -0,0 +1,5 @@
+"""
+tests
+
+Unit tests of compfipy, run with nosetests from the repository root.
+"""
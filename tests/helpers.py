@@ -0,0 +1,21 @@
+"""
+helpers.py
+
+Synthetic data shared by the tests and the benchmarks.
+
+"""
+
+import numpy as np
+
+from compfipy import models
+
+def random_history(symbol, dates, seed=None):
+    """
+    Random walk OCHLV for one symbol over dates, named by its index. Reseeds numpy first unless seed is None.
+    """
+    if seed is not None:
+        np.random.seed(seed)
+    prices = models.convert_to_price(100.0, models.geometric_brownian_motion(len(dates), sigma=0.3, mu=0.05))
+    history = models.generate_ochlv(prices, ochl_sigma=0.01, dates=dates)
+    history.index = history.index.rename(symbol)
+    return history
@@ -0,0 +1,91 @@
+"""
+test_asset.py
+
+Tests of the Asset indicator cache.
+
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from compfipy.asset import Asset
+from tests.helpers import random_history
+
+# Indicator Cache
+# ------------------------------------------------------------------------------------------------------------------------------
+class TestCache(unittest.TestCase):
+    """
+    Cached indicators count hits and misses, evict the least recently used result, and are invalidated by new price data.
+    """
+
+    def setUp(self):
+        self.history = random_history('TEST', pd.bdate_range('2000-01-03', periods=400), 0)
+        self.asset = Asset(self.history.iloc[:300], cache_size=2)
+
+    def test_hits_and_misses(self):
+        self.asset.rsi()
+        self.asset.rsi()
+        self.asset.rsi(n=14)
+        self.asset.rsi(20)
+        self.assertEqual(tuple(self.asset.cache_info()), (2, 2, 2, 2))
+        self.asset.cache_clear()
+        self.assertEqual(tuple(self.asset.cache_info()), (0, 0, 2, 0))
+
+    def test_disabled(self):
+        asset = Asset(self.history)
+        asset.rsi()
+        asset.rsi()
+        self.assertEqual(tuple(asset.cache_info()), (0, 0, 0, 0))
+
+    def test_least_recently_used(self):
+        self.asset.rsi(10)
+        self.asset.rsi(20)
+        self.asset.rsi(10)
+        self.asset.rsi(30)
+        # rsi(20) was used least recently, so it was evicted
+        self.asset.rsi(10)
+        self.assertEqual(self.asset.cache_info().hits, 2)
+        self.asset.rsi(20)
+        self.assertEqual(self.asset.cache_info().misses, 4)
+
+    def test_set_cache_size(self):
+        for n in [10, 20, 30]:
+            self.asset.set_cache_size(3)
+            self.asset.rsi(n)
+        self.asset.set_cache_size(1)
+        self.assertEqual(self.asset.cache_info().currsize, 1)
+        self.asset.rsi(30)
+        self.assertEqual(self.asset.cache_info().hits, 1)
+        self.asset.set_cache_size(0)
+        self.assertEqual(self.asset.cache_info().currsize, 0)
+        self.asset.rsi(30)
+        self.assertEqual(self.asset.cache_info().hits, 1)
+
+    def test_copy_on_hit(self):
+        expected = self.asset.rsi().copy()
+        self.asset.rsi()[:] = 0.0
+        rsi = self.asset.rsi()
+        self.assertTrue(rsi.equals(expected))
+        rsi[:] = 0.0
+        self.assertTrue(self.asset.rsi().equals(expected))
+        # Tuples of results are copied part by part
+        high, _, _, _ = self.asset._channel_positions(20) # pylint: disable=protected-access
+        high[:] = 0.0
+        self.assertTrue(np.isfinite(self.asset._channel_positions(20)[0].iloc[-1])) # pylint: disable=protected-access
+
+    def test_data_invalidates(self):
+        before = self.asset.rsi()
+        self.asset.data = self.history
+        self.assertEqual(self.asset.cache_info().currsize, 0)
+        self.assertTrue(self.asset.rsi().equals(Asset(self.history).rsi()))
+        self.assertEqual(len(before), 300)
+
+    def test_append_invalidates(self):
+        self.asset.rsi()
+        self.asset.append(self.history.iloc[300:])
+        self.assertTrue(self.asset.rsi().equals(Asset(self.history).rsi()))
+        self.assertEqual(self.asset.cache_info().misses, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+test_kernels.py
+
+The numpy and numba kernel backends give identical results.
+
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from compfipy import util
+from compfipy.universe import Universe
+
+# Kernel Backends
+# ------------------------------------------------------------------------------------------------------------------------------
+class TestKernelBackends(unittest.TestCase):
+    """
+    Run every kernel under both backends, on one symbol and on a dates x symbols block with late starts and NaN gaps, and
+    assert the results are exactly equal.
+    """
+
+    def setUp(self):
+        if util.numba is None:
+            raise unittest.SkipTest('numba is not installed')
+        self.backend = util.KERNEL_BACKEND
+        np.random.seed(0)
+        n_dates, n_symbols = 500, 6
+        close = 100.0 * np.exp(np.cumsum(0.02 * np.random.randn(n_dates, n_symbols), axis=0))
+        spread = np.abs(np.random.randn(n_dates, n_symbols))
+        self.start = np.array([0, 0, 30, 120, 7, 499])
+        for col, first in enumerate(self.start):
+            close[:first, col] = np.nan
+        close[200:210, 1] = np.nan
+        dates = pd.bdate_range('2000-01-03', periods=n_dates)
+        self.close = pd.DataFrame(close, index=dates)
+        self.high = self.close + spread
+        self.low = self.close - spread
+
+    def tearDown(self):
+        util.set_kernel_backend(self.backend)
+
+    def both(self, kernel):
+        """
+        Return the results of kernel() under the numpy and numba backends.
+        """
+        util.set_kernel_backend('numpy')
+        numpy_result = kernel()
+        util.set_kernel_backend('numba')
+        numba_result = kernel()
+        return numpy_result, numba_result
+
+    def assert_same(self, kernel):
+        numpy_result, numba_result = self.both(kernel)
+        if not isinstance(numpy_result, tuple):
+            numpy_result, numba_result = (numpy_result,), (numba_result,)
+        self.assertEqual(len(numpy_result), len(numba_result))
+        for expected, actual in zip(numpy_result, numba_result):
+            self.assertEqual(type(expected), type(actual))
+            np.testing.assert_array_equal(np.asarray(expected), np.asarray(actual))
+
+    def test_wilder_smooth(self):
+        for n in [1, 14, 30]:
+            self.assert_same(lambda: util.wilder_smooth(self.close, n, self.start))
+            self.assert_same(lambda: util.wilder_smooth(self.close[0], n))
+            self.assert_same(lambda: util.wilder_smooth(self.close[2], n, 30))
+            self.assert_same(lambda: util.wilder_smooth(self.close.values, n, 7))
+
+    def test_psar(self):
+        self.assert_same(lambda: util.psar(self.high, self.low, start=self.start))
+        self.assert_same(lambda: util.psar(self.high[0], self.low[0]))
+        self.assert_same(lambda: util.psar(self.high[3], self.low[3], 0.01, 0.03, 0.1, 0.3, start=120))
+
+    def test_zigzag_pivots(self):
+        for percent in [1.0, 7.0]:
+            self.assert_same(lambda: util.zigzag_pivots(self.close, percent, self.start))
+            self.assert_same(lambda: util.zigzag_pivots(self.close[0], percent))
+            self.assert_same(lambda: util.zigzag_pivots(self.close[2], percent, 30))
+
+    def test_zigzag_line(self):
+        def line():
+            return util.zigzag_line(self.close, util.zigzag_pivots(self.close, 5.0, self.start))
+        self.assert_same(line)
+
+    def test_rolling_extrema(self):
+        for n, min_periods in [(1, None), (20, None), (25, 0)]:
+            self.assert_same(lambda: util.rolling_extrema(self.high, n, self.low, min_periods))
+            self.assert_same(lambda: util.bars_since_extrema(self.high, n, self.low, min_periods))
+            self.assert_same(lambda: util.rolling_extrema(self.high[1], n, min_periods=min_periods))
+
+    def test_indicators(self):
+        volume = pd.DataFrame(1000.0, index=self.close.index, columns=self.close.columns)
+        fields = {'Open': self.close, 'Close': self.close, 'High': self.high, 'Low': self.low, 'Volume': volume}
+        universe = Universe(fields)
+        for method in ['relative_strength_index', 'average_true_range', 'average_directional_index', 'parabolic_sar',
+                       'zigzag', 'aroon', 'speedlines']:
+            self.assert_same(lambda: getattr(Universe(universe.data), method)())
+
+    def test_set_kernel_backend(self):
+        self.assertRaises(ValueError, util.set_kernel_backend, 'fortran')
+        util.set_kernel_backend('numpy')
+        self.assertEqual(util.KERNEL_BACKEND, 'numpy')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+test_market.py
+
+The precomputed NYSE trading calendar matches the holiday rules it is built from.
+
+"""
+
+import datetime
+import unittest
+import numpy as np
+import pandas as pd
+
+from compfipy import market
+
+def days(start, end):
+    """
+    Every calendar day from start to end, inclusive.
+    """
+    return [d.date() for d in pd.date_range(start, end)]
+
+# Trading Calendar
+# ------------------------------------------------------------------------------------------------------------------------------
+class TestTradingCalendar(unittest.TestCase):
+    """
+    The holiday, open and early close bitsets agree with nyse_holidays and nyse_close_early_dates day by day.
+    """
+
+    def setUp(self):
+        self.calendar = market.nyse_calendar()
+
+    def test_bitsets(self):
+        for year in [1817, 1900, 1999, 2000, 2012, 2016, 2022, 2100]:
+            holidays = set(market.nyse_holidays(year))
+            early = set(market.nyse_close_early_dates(year))
+            for day in days(datetime.date(year, 1, 1), datetime.date(year, 12, 31)):
+                self.assertEqual(self.calendar.is_holiday(day), day in holidays, day)
+                self.assertEqual(self.calendar.is_open_on(day), day.weekday() < 5 and day not in holidays, day)
+                self.assertEqual(self.calendar.is_early_close(day), day in early, day)
+
+    def test_special_closures(self):
+        for day in [datetime.date(2012, 10, 29), datetime.date(2012, 10, 30)]:
+            self.assertTrue(market.is_holiday(day))
+            self.assertFalse(market.is_open_on(day))
+        # New Year's Day on a Sunday moves to Monday
+        self.assertFalse(market.is_open_on(datetime.date(2017, 1, 2)))
+        self.assertEqual(market.closing_time(datetime.date(2015, 11, 25)), datetime.time(13, 0))
+        self.assertEqual(market.closing_time(datetime.datetime(2015, 11, 27, 10)), datetime.time(16, 0))
+
+    def test_sessions(self):
+        sessions = [d for d in days('2010-01-01', '2011-12-31') if self.calendar.is_open_on(d)]
+        epoch = datetime.date(1970, 1, 1).toordinal()
+        stored = self.calendar.sessions
+        first = stored.searchsorted(sessions[0].toordinal() - epoch)
+        self.assertEqual(list(stored[first:first + len(sessions)]), [d.toordinal() - epoch for d in sessions])
+        self.assertTrue((np.diff(stored) > 0).all())
+
+    def test_edges(self):
+        calendar = market.TradingCalendar(2000, 2001)
+        self.assertTrue(calendar.covers(datetime.date(2000, 1, 1)))
+        self.assertTrue(calendar.covers(datetime.date(2001, 12, 31)))
+        self.assertFalse(calendar.covers(datetime.date(1999, 12, 31)))
+        self.assertFalse(calendar.covers(datetime.date(2002, 1, 1)))
+        self.assertEqual(calendar.next_session(datetime.date(1999, 12, 31)), datetime.date(2000, 1, 3))
+        self.assertEqual(calendar.next_session(datetime.date(2001, 12, 28)), datetime.date(2001, 12, 31))
+        self.assertIsNone(calendar.next_session(datetime.date(2001, 12, 31)))
+        self.assertIsNone(calendar.next_session(datetime.date(1999, 12, 30)))
+        # Outside the precomputed calendar the module functions use the rules directly
+        self.assertEqual(market.next_open_day(datetime.date(2100, 12, 31)), datetime.date(2101, 1, 3))
+        self.assertTrue(market.is_holiday(datetime.date(2101, 7, 4)))
+
+# Session Arithmetic
+# ------------------------------------------------------------------------------------------------------------------------------
+def holidays(start_year, end_year):
+    """
+    NYSE holidays from start_year to end_year as datetime64[D], for the numpy business day functions.
+    """
+    found = [d for year in xrange(start_year, end_year + 1) for d in market.nyse_holidays(year) if d.year == year]
+    return np.array(found, dtype='datetime64[D]')
+
+class TestSessionArithmetic(unittest.TestCase):
+    """
+    date_range, roll_session, session_offset and count_sessions agree with the rules and with numpy's business day functions
+    given the NYSE holidays, and raise at the calendar edges.
+    """
+
+    def setUp(self):
+        np.random.seed(0)
+        self.holidays = holidays(1990, 2030)
+        self.dates = np.datetime64('1995-01-01') + np.random.randint(0, 365 * 30, 500)
+
+    def test_date_range(self):
+        expected = [d for d in days('2015-12-20', '2016-01-20') if market.is_open_on(d)]
+        result = market.date_range(datetime.date(2015, 12, 20), datetime.date(2016, 1, 20))
+        self.assertEqual([d.date() for d in result], expected)
+        # Without periods the range runs to the first open day on or after end
+        result = market.date_range(datetime.date(2015, 12, 20), datetime.datetime(2016, 1, 18, 12))
+        self.assertEqual(result[-1].date(), datetime.date(2016, 1, 19))
+        result = market.date_range(datetime.date(2015, 12, 24), periods=5)
+        self.assertEqual([d.date() for d in result], expected[3:8])
+        self.assertEqual(len(market.date_range(datetime.date(2016, 1, 20), datetime.date(2016, 1, 1))), 0)
+
+    def test_date_range_fallback(self):
+        # Ranges past the precomputed calendar come from next_open_day
+        result = market.date_range(datetime.date(2100, 12, 28), periods=4)
+        expected = [datetime.date(2100, 12, 28), datetime.date(2100, 12, 29), datetime.date(2100, 12, 30),
+                    datetime.date(2100, 12, 31)]
+        self.assertEqual([pd.Timestamp(d).date() for d in result], expected)
+        result = market.date_range(datetime.date(2100, 12, 30), periods=3)
+        self.assertEqual([pd.Timestamp(d).date() for d in result][-1], datetime.date(2101, 1, 3))
+
+    def test_roll_session(self):
+        for roll in ['forward', 'backward']:
+            expected = np.busday_offset(self.dates, 0, roll=roll, holidays=self.holidays)
+            np.testing.assert_array_equal(market.roll_session(self.dates, roll).values.astype('datetime64[D]'), expected)
+        self.assertEqual(market.roll_session(datetime.date(2016, 1, 1)), datetime.date(2016, 1, 4))
+        self.assertEqual(market.roll_session('2016-01-01', 'backward'), datetime.date(2015, 12, 31))
+        self.assertRaises(ValueError, market.roll_session, self.dates, 'sideways')
+
+    def test_session_offset(self):
+        offsets = np.random.randint(-300, 300, len(self.dates))
+        for roll in ['forward', 'backward']:
+            expected = np.busday_offset(self.dates, offsets, roll=roll, holidays=self.holidays)
+            result = market.session_offset(self.dates, offsets, roll)
+            np.testing.assert_array_equal(result.values.astype('datetime64[D]'), expected)
+        self.assertEqual(market.session_offset(datetime.date(2015, 12, 24), 1), datetime.date(2015, 12, 28))
+
+    def test_count_sessions(self):
+        ends = self.dates + np.random.randint(-400, 400, len(self.dates))
+        expected = np.busday_count(self.dates, ends, holidays=self.holidays)
+        np.testing.assert_array_equal(market.count_sessions(self.dates, ends), expected)
+        self.assertEqual(market.count_sessions('2016-01-01', '2016-01-08'), 4)
+        self.assertEqual(market.count_sessions('2016-01-08', '2016-01-01'), -4)
+
+    def test_edges(self):
+        calendar = market.nyse_calendar()
+        first = market.roll_session(calendar.first_day)
+        last = market.roll_session(calendar.last_day, 'backward')
+        self.assertEqual(market.session_offset(first, 0), first)
+        self.assertEqual(market.session_offset(last, 0), last)
+        self.assertRaises(ValueError, market.session_offset, first, -1)
+        self.assertRaises(ValueError, market.session_offset, last, 1)
+        self.assertRaises(ValueError, market.roll_session, calendar.last_day + datetime.timedelta(days=1))
+        self.assertRaises(ValueError, market.roll_session, calendar.first_day - datetime.timedelta(days=1))
+        self.assertRaises(ValueError, market.count_sessions, '1800-01-01', '2000-01-01')
+
+# Session Mask
+# ------------------------------------------------------------------------------------------------------------------------------
+class TestSessionMask(unittest.TestCase):
+    """
+    session_mask agrees with is_open_at on each timestamp, including tz-aware input, NaT and times outside the calendar.
+    """
+
+    def setUp(self):
+        np.random.seed(0)
+        start = pd.Timestamp('1990-01-01').value
+        ns = start + np.random.randint(0, 40 * 365, 5000) * market.DAY_NS
+        # Times of day on the minute, with more of them near the open and close
+        minutes = np.random.choice([9 * 60 + 29, 9 * 60 + 30, 9 * 60 + 31, 12 * 60 + 59, 13 * 60, 15 * 60 + 59, 16 * 60], 5000)
+        minutes = np.where(np.random.rand(5000) < 0.5, minutes, np.random.randint(0, 24 * 60, 5000))
+        self.timestamps = pd.DatetimeIndex(ns + minutes * 60 * 10**9)
+
+    def expected(self, timestamps):
+        """
+        is_open_at of each timestamp.
+        """
+        return np.array([market.is_open_at(t.to_pydatetime()) for t in timestamps])
+
+    def test_matches_is_open_at(self):
+        np.testing.assert_array_equal(market.session_mask(self.timestamps), self.expected(self.timestamps))
+        np.testing.assert_array_equal(market.session_mask(self.timestamps.asi8), self.expected(self.timestamps))
+
+    def test_hours(self):
+        times = pd.DatetimeIndex(['2015-11-25 09:30', '2015-11-25 09:30:01', '2015-11-25 12:59:59', '2015-11-25 13:00',
+                                  '2015-11-27 15:59:59', '2015-11-27 16:00', '2015-11-26 12:00', '2015-11-28 12:00'])
+        np.testing.assert_array_equal(market.session_mask(times), [False, True, True, False, True, False, False, False])
+
+    def test_tz_aware(self):
+        utc = self.timestamps.tz_localize('America/New_York', ambiguous='NaT').tz_convert('UTC')
+        ok = pd.notnull(utc)
+        np.testing.assert_array_equal(market.session_mask(utc[ok]), self.expected(self.timestamps[ok]))
+        # 14:25 UTC is 9:25 in New York winter time and 10:25 in summer time, 20:30 UTC is after the close either way
+        times = pd.DatetimeIndex(['2016-01-05 14:25', '2016-07-05 14:25', '2016-07-05 20:30'], tz='UTC')
+        np.testing.assert_array_equal(market.session_mask(times), [False, True, False])
+
+    def test_nat(self):
+        times = pd.DatetimeIndex([pd.NaT, '2016-01-05 10:00', pd.NaT])
+        np.testing.assert_array_equal(market.session_mask(times), [False, True, False])
+        np.testing.assert_array_equal(market.session_mask(times.tz_localize('UTC')), [False, False, False])
+
+    def test_outside_calendar(self):
+        times = pd.DatetimeIndex(['1800-06-02 10:00', '2101-07-05 10:00', '2101-07-04 10:00', '2101-07-05 17:00'])
+        np.testing.assert_array_equal(market.session_mask(times[1:]), [True, False, False])
+        # Before the NYSE was founded there are no holidays, only weekdays
+        np.testing.assert_array_equal(market.session_mask(times[:1]), self.expected(times[:1]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+test_store.py
+
+Tests of the columnar history store and the universe cube.
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from compfipy import store
+from tests.helpers import random_history
+
+# History Store
+# ------------------------------------------------------------------------------------------------------------------------------
+class TestHistoryStore(unittest.TestCase):
+    """
+    Histories round trip through the store and a failed rewrite leaves the stored history whole.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.history = random_history('AAA', pd.bdate_range('2010-01-01', periods=300), 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_round_trip(self):
+        store.write_history(self.root, 'AAA', self.history)
+        self.assertTrue(store.read_history(self.root, 'AAA').equals(self.history))
+        self.assertEqual(store.stored_symbols(self.root), ['AAA'])
+
+    def test_rewrite(self):
+        store.write_history(self.root, 'AAA', self.history)
+        shorter = self.history.iloc[:100][['Close', 'Volume']]
+        store.write_history(self.root, 'AAA', shorter)
+        self.assertTrue(store.read_history(self.root, 'AAA').equals(shorter))
+        self.assertEqual(sorted(os.listdir(self.root)), ['AAA'])
+
+    def test_failed_rewrite(self):
+        store.write_history(self.root, 'AAA', self.history)
+        bad = self.history.iloc[:100].copy()
+        bad['Bad'] = object()
+        self.assertRaises(ValueError, store.write_history, self.root, 'AAA', bad)
+        self.assertTrue(store.read_history(self.root, 'AAA').equals(self.history))
+        self.assertEqual(store.stored_symbols(self.root), ['AAA'])
+
+# Universe Cube
+# ------------------------------------------------------------------------------------------------------------------------------
+class TestCube(unittest.TestCase):
+    """
+    Histories read back from a cube equal the stored histories.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        dates = pd.bdate_range('2010-01-01', periods=300)
+        self.histories = {
+            'FULL': random_history('FULL', dates, 1),
+            'LATE': random_history('LATE', dates, 2).iloc[50:],
+            'GAP': random_history('GAP', dates, 3).drop(dates[100:110]),
+        }
+        # A row stored as all NaN is part of the history
+        self.histories['FULL'].iloc[200] = np.nan
+        for symbol, history in self.histories.items():
+            store.write_history(os.path.join(self.root, 'store'), symbol, history)
+        self.cube = os.path.join(self.root, 'cube')
+        store.write_cube(os.path.join(self.root, 'store'), self.cube)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_cube_history(self):
+        for symbol, history in self.histories.items():
+            self.assertTrue(store.read_cube_history(self.cube, symbol).equals(history), symbol)
+
+    def test_cube_history_range(self):
+        history = self.histories['GAP']
+        start, end = history.index[90], history.index[150]
+        self.assertTrue(store.read_cube_history(self.cube, 'GAP', start, end).equals(history.loc[start:end]))
+
+    def test_cube_is_current(self):
+        store_root = os.path.join(self.root, 'store')
+        self.assertTrue(store.cube_is_current(store_root, self.cube, []))
+        self.assertTrue(store.cube_is_current(store_root, self.cube, ['FULL', 'GAP']))
+        self.assertFalse(store.cube_is_current(store_root, self.cube, ['FULL', 'MISSING']))
+        missing = os.path.join(self.root, 'missing')
+        self.assertFalse(store.cube_is_current(store_root, missing, []))
+        self.assertFalse(store.cube_is_current(store_root, missing, ['FULL']))
+
+    def test_read_cube(self):
+        dates, symbols, values = store.read_cube(self.cube)
+        self.assertEqual(list(symbols), sorted(self.histories))
+        for symbol, history in self.histories.items():
+            close = pd.Series(values['Close'][:, symbols.get_loc(symbol)], index=dates)
+            self.assertTrue(close.reindex(history.index).equals(history['Close'].rename(None)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+test_stream.py
+
+Streaming indicators replayed bar by bar reproduce the matching Asset methods.
+
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from compfipy import models, stream
+from compfipy.asset import Asset
+from compfipy.util import wilder_smooth
+
+def replay(indicator, data):
+    """
+    Update indicator with every bar of data, returning its value after each bar as a Series (a DataFrame for dict values).
+    """
+    values = [indicator.update(bar) for bar in data.to_dict('records')]
+    if isinstance(values[0], dict):
+        return pd.DataFrame(values, index=data.index)
+    return pd.Series(values, index=data.index)
+
+# Streaming Indicators
+# ------------------------------------------------------------------------------------------------------------------------------
+class TestReplay(unittest.TestCase):
+    """
+    Replay a history with NaN rows through each streaming indicator and compare with the batch result on every bar.
+    """
+
+    def setUp(self):
+        np.random.seed(0)
+        dates = pd.bdate_range('2005-01-03', periods=1500)
+        prices = models.convert_to_price(100.0, models.geometric_brownian_motion(len(dates), sigma=0.3, mu=0.05))
+        data = models.generate_ochlv(prices, ochl_sigma=0.01, dates=dates)
+        data.iloc[[300, 301, 302, 900]] = np.nan
+        data.index = data.index.rename('TEST')
+        self.data = data
+        self.asset = Asset(data)
+
+    def assert_replays(self, indicator, expected, rtol=0.0, data=None):
+        actual = replay(indicator, self.data if data is None else data)
+        if isinstance(expected, pd.DataFrame):
+            actual = actual[expected.columns]
+        if rtol:
+            np.testing.assert_allclose(actual.values, expected.values, rtol=rtol)
+        else:
+            np.testing.assert_array_equal(actual.values, expected.values)
+
+    def test_ema(self):
+        self.assert_replays(stream.EMA(20), self.asset._ema('close', 20)) # pylint: disable=protected-access
+        self.assert_replays(stream.EMA(12, 'Volume'), self.asset._ema('volume', 12)) # pylint: disable=protected-access
+
+    def test_sma(self):
+        self.assert_replays(stream.SMA(20), self.asset._sma('close', 20)) # pylint: disable=protected-access
+
+    def test_wilder_smooth(self):
+        self.assert_replays(stream.WilderSmooth(14), wilder_smooth(self.data['Close'], 14))
+        self.assert_replays(stream.WilderSmooth(5, 'High'), wilder_smooth(self.data['High'], 5))
+
+    def test_rsi(self):
+        self.assert_replays(stream.RSI(14), self.asset.relative_strength_index(14))
+        # Wilder smoothing holds over the NaN rows, so the latest values are valid
+        self.assertTrue(np.isfinite(replay(stream.RSI(14), self.data).iloc[-1]))
+        clean = self.data.dropna()
+        self.assert_replays(stream.RSI(14), Asset(clean).relative_strength_index(14), data=clean)
+
+    def test_atr(self):
+        self.assert_replays(stream.ATR(14), self.asset.average_true_range(14))
+        self.assertTrue(np.isfinite(replay(stream.ATR(14), self.data).iloc[-1]))
+        clean = self.data.dropna()
+        self.assert_replays(stream.ATR(14), Asset(clean).average_true_range(14), data=clean)
+
+    def test_macd(self):
+        self.assert_replays(stream.MACD(), self.asset.moving_avg_converge_diverge())
+
+    def test_bollinger_bands(self):
+        # Welford's running variance matches pandas rolling_std to round-off
+        self.assert_replays(stream.BollingerBands(), self.asset.bollinger_bands(), rtol=1e-9)
+
+    def test_stochastic_oscillator(self):
+        self.assert_replays(stream.StochasticOscillator(), self.asset.stochastic_oscillator())
+
+    def test_obv(self):
+        self.assert_replays(stream.OBV(), self.asset.on_balance_volume())
+
+    def test_adl(self):
+        self.assert_replays(stream.ADL(), self.asset.accumulation_distribution_line())
+
+    def test_from_asset(self):
+        asset = Asset(self.data.dropna())
+        rsi = stream.RSI.from_asset(asset)
+        self.assertTrue(np.isfinite(rsi.value))
+        self.assertEqual(rsi.value, asset.relative_strength_index().iloc[-1])
+
+if __name__ == '__main__':
+    unittest.main()
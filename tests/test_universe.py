@@ -0,0 +1,160 @@
+"""
+test_universe.py
+
+Universe batch statistics and indicators match Asset symbol by symbol.
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from compfipy import store
+from compfipy.asset import Asset, INDICATOR_GRAPH
+from compfipy.universe import Universe
+from compfipy.util import STATS_KEYS
+from tests.helpers import random_history
+
+def scalar(value):
+    """
+    Return the value of a one row Series (the best and worst periods of Asset.calc_stats), other values as they are.
+    """
+    if isinstance(value, pd.Series):
+        return value.iloc[0] if len(value) else np.nan
+    return value
+
+def assert_stats_equal(case, expected, actual):
+    """
+    Assert that the Asset.calc_stats stats, expected, equal a row of Universe.calc_stats, actual.
+    """
+    for key in STATS_KEYS:
+        value, batch = scalar(expected[key]), actual[key]
+        if key == 'return_table':
+            case.assertEqual(sorted(value), sorted(batch))
+            for year in value:
+                case.assertEqual(sorted(value[year]), sorted(batch[year]))
+                for month in value[year]:
+                    case.assertAlmostEqual(value[year][month], batch[year][month], places=12)
+        elif isinstance(value, (float, np.floating)):
+            case.assertTrue(np.isclose(value, batch, rtol=1e-9, atol=1e-12, equal_nan=True), (key, value, batch))
+        else:
+            case.assertEqual(value, batch, key)
+
+# Batch Statistics
+# ------------------------------------------------------------------------------------------------------------------------------
+class TestCalcStats(unittest.TestCase):
+    """
+    Each row of Universe.calc_stats equals Asset.calc_stats of that symbol alone, from its first to its last price.
+    """
+
+    def setUp(self):
+        dates = pd.bdate_range('2008-01-01', periods=1600)
+        full = random_history('FULL', dates, 1)
+        late = random_history('LATE', dates, 2).iloc[400:]
+        gap = random_history('GAP', dates, 3)
+        gap.iloc[700:730] = np.nan
+        short = random_history('SHORT', dates, 4).iloc[:1200]
+        self.assets = [Asset(history) for history in [full, late, gap, short]]
+        self.universe = Universe.from_assets(self.assets).calc_stats()
+
+    def test_rows_match_asset(self):
+        for asset in self.assets:
+            stats = Asset(asset.data).calc_stats(full=True).stats
+            assert_stats_equal(self, stats, self.universe.stats.loc[asset.symbol])
+
+    def test_rows_match_running_asset(self):
+        for asset in self.assets:
+            stats = Asset(asset.data).calc_stats().stats
+            assert_stats_equal(self, stats, self.universe.stats.loc[asset.symbol])
+
+    def test_full_keyword(self):
+        for full in [True, False]:
+            stats = Universe(self.universe.data).calc_stats(full=full).stats
+            self.assertTrue(stats.drop('return_table', axis=1).equals(self.universe.stats.drop('return_table', axis=1)))
+
+    def test_late_listing_and_gap(self):
+        stats = self.universe.stats
+        self.assertEqual(stats.loc['LATE', 'start'], self.assets[1].data.index[0])
+        self.assertEqual(stats.loc['SHORT', 'end'], self.assets[3].data.index[-1])
+        self.assertTrue(np.isfinite(stats.loc['GAP', 'daily_vol']))
+
+# Indicators
+# ------------------------------------------------------------------------------------------------------------------------------
+INDICATORS = sorted(set(node.method for node in INDICATOR_GRAPH.values() if not node.method.startswith('_')))
+
+class TestIndicators(unittest.TestCase):
+    """
+    Each column of a Universe indicator equals the Asset indicator of that symbol alone, on the dates the symbol has, when the
+    symbols have different dates.
+    """
+
+    def setUp(self):
+        dates = pd.bdate_range('2008-01-01', periods=600)
+        full = random_history('FULL', dates, 1)
+        missing = random_history('MISSING', dates, 2).drop(dates[[300, 410, 411, 412]])
+        late = random_history('LATE', dates, 3).iloc[100:].drop(dates[250])
+        nan = random_history('NAN', dates, 4)
+        nan.iloc[[200, 201]] = np.nan
+        self.assets = [Asset(history) for history in [full, missing, late, nan]]
+        self.universe = Universe.from_assets(self.assets)
+
+    def assert_matches(self, universe, method):
+        result = getattr(universe, method)()
+        for asset in self.assets:
+            expected = getattr(Asset(asset.data), method)()
+            if isinstance(result.columns, pd.MultiIndex):
+                actual = result.xs(asset.symbol, axis=1, level=1)[expected.columns]
+            else:
+                actual = result[asset.symbol]
+            actual = actual.reindex(asset.data.index)
+            np.testing.assert_allclose(
+                actual.values.astype(float), expected.values.astype(float), rtol=1e-9, atol=1e-12, err_msg=method
+            )
+
+    def test_indicators_match_asset(self):
+        for method in INDICATORS:
+            self.assert_matches(self.universe, method)
+
+    def test_compact(self):
+        universe = Universe(self.universe.data, storage='compact', present=self.universe.present)
+        for method in ['relative_strength_index', 'parabolic_sar', 'aroon']:
+            self.assert_matches(universe, method)
+
+    def test_cube(self):
+        root = tempfile.mkdtemp()
+        try:
+            for asset in self.assets:
+                store.write_history(os.path.join(root, 'store'), asset.symbol, asset.data)
+            store.write_cube(os.path.join(root, 'store'), os.path.join(root, 'cube'))
+            universe = Universe.from_cube(os.path.join(root, 'cube'))
+            for method in ['relative_strength_index', 'average_directional_index', 'parabolic_sar', 'zigzag']:
+                self.assert_matches(universe, method)
+            for asset in self.assets:
+                data = universe.asset(asset.symbol).data
+                self.assertTrue(data[asset.data.columns].equals(asset.data), asset.symbol)
+        finally:
+            shutil.rmtree(root)
+
+    def test_compute_indicators(self):
+        columns = ['rsi', 'atr', 'adx', 'macd', 'rising_parabolic_sar']
+        result = self.universe.compute_indicators(columns)
+        for asset in self.assets:
+            expected = Asset(asset.data).compute_indicators(columns)
+            actual = result.xs(asset.symbol, axis=1, level=1)[expected.columns].reindex(asset.data.index)
+            np.testing.assert_allclose(actual.values, expected.values, rtol=1e-9, atol=1e-12)
+
+    def test_calc_stats(self):
+        stats = self.universe.calc_stats().stats
+        for asset in self.assets:
+            assert_stats_equal(self, Asset(asset.data).calc_stats(full=True).stats, stats.loc[asset.symbol])
+
+    def test_asset(self):
+        for asset in self.assets:
+            data = self.universe.asset(asset.symbol).data
+            self.assertTrue(data[asset.data.columns].equals(asset.data))
+
+if __name__ == '__main__':
+    unittest.main()
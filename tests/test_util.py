@@ -0,0 +1,619 @@
+"""
+test_util.py
+
+Tests of the array kernels in compfipy.util.
+
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from compfipy import util
+from compfipy.asset import Asset
+from compfipy.util import rolling_extrema, bars_since_extrema, wilder_smooth, rolling_comparison, drawdown_episodes, calc_drawdown_info
+from compfipy.util import market_comparison, rolling_sums, psar, zigzag_pivots, zigzag_line, zigzag_pivot_list
+from tests.helpers import random_history
+
+# Rolling Extrema
+# ------------------------------------------------------------------------------------------------------------------------------
+class TestRollingExtrema(unittest.TestCase):
+    """
+    rolling_extrema matches pandas rolling max and min, NaN gaps included.
+    """
+
+    def setUp(self):
+        np.random.seed(0)
+        values = np.random.randn(300, 4).round(2)
+        values[np.random.rand(300, 4) < 0.2] = np.nan
+        values[50:70, 1] = np.nan
+        values[:40, 2] = np.nan
+        self.data = pd.DataFrame(values, index=pd.bdate_range('2000-01-03', periods=300), columns=list('ABCD'))
+
+    def check(self, n, min_periods):
+        high, low, argmax, argmin = rolling_extrema(self.data, n, min_periods=min_periods)
+        pandas_min_periods = n if min_periods is None else min_periods
+        self.assertTrue(high.equals(self.data.rolling(n, min_periods=pandas_min_periods).max()))
+        self.assertTrue(low.equals(self.data.rolling(n, min_periods=pandas_min_periods).min()))
+
+        # Positions point at the extreme, inside the window
+        values = self.data.values
+        rows = np.arange(len(values)).reshape(-1, 1)
+        for extreme, position in [(high, argmax), (low, argmin)]:
+            ok = extreme.notnull().values
+            self.assertTrue(np.array_equal(ok, position.notnull().values))
+            at = position.values[ok].astype(int)
+            self.assertTrue(np.array_equal(values[at, np.nonzero(ok)[1]], extreme.values[ok]))
+            self.assertTrue(((np.broadcast_to(rows, ok.shape)[ok] - at) < n).all())
+
+    def test_full_windows(self):
+        for n in [1, 5, 20]:
+            self.check(n, None)
+
+    def test_min_periods_with_gaps(self):
+        for n in [5, 20]:
+            for min_periods in [0, 1, 5]:
+                self.check(n, min_periods)
+
+    def test_series(self):
+        high, low, _, _ = rolling_extrema(self.data['B'], 10, min_periods=3)
+        self.assertTrue(high.equals(self.data['B'].rolling(10, min_periods=3).max()))
+        self.assertTrue(low.equals(self.data['B'].rolling(10, min_periods=3).min()))
+
+# Wilder Smoothing
+# ------------------------------------------------------------------------------------------------------------------------------
+def rsi_loop(close, n=14):
+    """
+    Relative Strength Index as the original per-bar loop computed it.
+    """
+    change = close - close.shift(1)
+    gain = change.clip_lower(0.0).values
+    loss = -1.0 * change.clip_upper(0.0).values
+    avg_gain = np.zeros(len(gain))
+    avg_loss = np.zeros(len(loss))
+    avg_gain[n] = np.nansum(gain[0:n]) / n
+    avg_loss[n] = np.nansum(loss[0:n]) / n
+    for i in range(n + 1, len(gain)):
+        avg_gain[i] = (n - 1) * (avg_gain[i - 1] / n) + (gain[i] / n)
+        avg_loss[i] = (n - 1) * (avg_loss[i - 1] / n) + (loss[i] / n)
+    rs = avg_gain / avg_loss
+    return 100.0 - (100.0 / (1.0 + rs))
+
+class TestWilderSmooth(unittest.TestCase):
+    """
+    wilder_smooth matches the original RSI loop and holds its average over NaN inputs.
+    """
+
+    def setUp(self):
+        self.data = random_history('TEST', pd.bdate_range('2000-01-03', periods=600), 0)
+        self.gaps = [200, 201, 202, 450]
+
+    def test_rsi_matches_loop(self):
+        for n in [2, 14, 30]:
+            expected = rsi_loop(self.data['Close'], n)
+            actual = Asset(self.data).relative_strength_index(n).values
+            self.assertTrue(np.isnan(actual[:n]).all())
+            # The filter and the loop round differently, to a few ulps
+            np.testing.assert_allclose(actual[n:], expected[n:], rtol=1e-12)
+
+    def test_nan_held(self):
+        values = self.data['Close'].values.copy()
+        values[self.gaps] = np.nan
+        valid = ~np.isnan(values)
+        for n in [1, 14]:
+            smooth = wilder_smooth(values, n)
+            self.assertTrue(np.isnan(smooth[self.gaps]).all())
+            self.assertTrue(np.isfinite(smooth[n:][valid[n:]]).all())
+            # Over the valid rows, the same as smoothing the history with the NaN rows removed
+            np.testing.assert_array_equal(smooth[valid], wilder_smooth(values[valid], n))
+
+    def test_nan_in_seed(self):
+        values = self.data['Close'].values.copy()
+        values[[3, 5]] = np.nan
+        smooth = wilder_smooth(values, 14)
+        self.assertEqual(smooth[14], np.nansum(values[:14]) / 14)
+        self.assertTrue(np.isfinite(smooth[14:]).all())
+
+    def test_block_matches_columns(self):
+        block = np.column_stack([self.data[field].values for field in ['Open', 'Close', 'High', 'Low']])
+        block[self.gaps, 1] = np.nan
+        block[:50, 2] = np.nan
+        block[300, 2] = np.nan
+        start = np.array([0, 0, 50, 0])
+        smooth = wilder_smooth(block, 14, start)
+        for col, first in enumerate(start):
+            np.testing.assert_array_equal(smooth[:, col], wilder_smooth(block[:, col], 14, first))
+
+    def test_indicators_recover(self):
+        data = self.data.copy()
+        data.iloc[self.gaps] = np.nan
+        asset = Asset(data)
+        for method in ['average_true_range', 'average_directional_index', 'relative_strength_index']:
+            result = getattr(asset, method)().values
+            # Only the NaN rows and the bar after each (whose change or true range needs the NaN row) are missing
+            missing = np.flatnonzero(np.isnan(result[60:])) + 60
+            self.assertTrue(set(missing) <= set(self.gaps + [203, 451]), (method, missing))
+
+# Drawdown Episodes
+# ------------------------------------------------------------------------------------------------------------------------------
+def drawdown_info_loop(drawdown):
+    """
+    Drawdown table as the original label slicing loop computed it.
+    """
+    is_zero = drawdown == 0
+    start = ~is_zero & is_zero.shift(1)
+    start = list(start[start].index)
+    end = is_zero & (~is_zero).shift(1)
+    end = list(end[end].index)
+    if len(end) == 0:
+        end.append(drawdown.index[-1])
+    if start[0] > end[0]:
+        start.insert(0, drawdown.index[0])
+    if start[-1] > end[-1]:
+        end.append(drawdown.index[-1])
+    return pd.DataFrame({
+        'start': start,
+        'end': end,
+        'days': [(e - s).days for s, e in zip(start, end)],
+        'drawdown': [drawdown[s:e].min() for s, e in zip(start, end)]
+    })
+
+class TestDrawdownInfo(unittest.TestCase):
+    """
+    calc_drawdown_info matches the original loop, with leading NaN, a gap and no drawdown at all.
+    """
+
+    def setUp(self):
+        self.data = random_history('TEST', pd.bdate_range('2000-01-03', periods=800), 3)
+
+    def assert_matches_loop(self, data):
+        drawdown = Asset(data).drawdown()
+        expected = drawdown_info_loop(drawdown)
+        actual = calc_drawdown_info(drawdown)
+        self.assertTrue(len(actual) > 1)
+        for column in ['start', 'end', 'days', 'drawdown']:
+            np.testing.assert_array_equal(actual[column].values, expected[column].values, column)
+        # Troughs are inside the episode, at its depth
+        for _, episode in actual.iterrows():
+            self.assertTrue(episode['start'] <= episode['trough'] <= episode['end'])
+            self.assertEqual(drawdown[episode['trough']], episode['drawdown'])
+
+    def test_matches_loop(self):
+        self.assert_matches_loop(self.data)
+
+    def test_leading_nan(self):
+        data = self.data.copy()
+        data.iloc[:25] = np.nan
+        self.assert_matches_loop(data)
+
+    def test_gap(self):
+        data = self.data.copy()
+        data.iloc[300:340] = np.nan
+        self.assert_matches_loop(data)
+        self.assert_matches_loop(self.data.drop(self.data.index[300:340]))
+
+    def test_ends_at_high(self):
+        data = self.data.copy()
+        data.iloc[-1] = 2.0 * data['Close'].max()
+        self.assert_matches_loop(data)
+        self.assertTrue(calc_drawdown_info(Asset(data).drawdown())['recovery_days'].notnull().all())
+
+    def test_no_drawdown(self):
+        close = pd.Series(np.arange(1.0, 51.0), index=self.data.index[:50])
+        info = calc_drawdown_info(close / close.cummax() - 1.0)
+        self.assertEqual(len(info), 0)
+        self.assertEqual(sorted(info.columns), ['days', 'drawdown', 'end', 'recovery_days', 'start', 'trough'])
+
+    def test_block(self):
+        drawdown = pd.DataFrame({
+            'A': Asset(self.data).drawdown(),
+            'B': Asset(self.data.iloc[::-1].set_index(self.data.index)).drawdown(),
+        })
+        column, start, end, trough, depth, recovered = drawdown_episodes(drawdown.values)
+        for col, symbol in enumerate(drawdown):
+            one = drawdown_episodes(drawdown[symbol].values)
+            mine = column == col
+            for expected, actual in zip(one[1:], [start, end, trough, depth, recovered]):
+                np.testing.assert_array_equal(actual[mine], expected)
+
+# Rolling Comparison
+# ------------------------------------------------------------------------------------------------------------------------------
+class TestRollingComparison(unittest.TestCase):
+    """
+    rolling_comparison matches pandas rolling std, cov, var and corr, for pandas and numpy returns.
+    """
+
+    def setUp(self):
+        np.random.seed(1)
+        dates = pd.bdate_range('2000-01-03', periods=400)
+        values = 0.01 * np.random.randn(400, 3) + 0.0005
+        values[100:105, 1] = np.nan
+        values[:30, 2] = np.nan
+        self.returns = pd.DataFrame(values, index=dates, columns=list('ABC'))
+        benchmark = 0.008 * np.random.randn(400) + 0.5 * values[:, 0]
+        benchmark[250] = np.nan
+        self.benchmark = pd.Series(benchmark, index=dates)
+
+    def expected(self, x, y, w):
+        """
+        The rolling stats of one returns Series x against benchmark y from pandas.
+        """
+        excess = x - y
+        return {
+            'deviation_risk': x.rolling(w).std(),
+            'beta': x.rolling(w).cov(y) / y.where(x.notnull()).rolling(w).var(),
+            'correlation': x.rolling(w).corr(y),
+            'tracking_error': excess.rolling(w).std(),
+            'information_ratio': excess.rolling(w).mean() / excess.rolling(w).std(),
+        }
+
+    def test_matches_pandas(self):
+        windows = [5, 63]
+        result = rolling_comparison(self.returns, self.benchmark, windows)
+        for w in windows:
+            for column in self.returns:
+                for key, expected in self.expected(self.returns[column], self.benchmark, w).items():
+                    actual = result[(key, w)][column]
+                    np.testing.assert_array_equal(actual.isnull().values, expected.isnull().values, (key, w, column))
+                    np.testing.assert_allclose(actual.dropna().values, expected.dropna().values, rtol=1e-9, atol=1e-14)
+
+    def test_series(self):
+        result = rolling_comparison(self.returns['B'], self.benchmark, 20)
+        keys = ['beta', 'correlation', 'deviation_risk', 'information_ratio', 'tracking_error']
+        self.assertEqual(sorted(result.columns), keys)
+        expected = rolling_comparison(self.returns[['B']], self.benchmark, 20)
+        for key in result:
+            np.testing.assert_array_equal(result[key].values, expected[key]['B'].values)
+
+    def test_numpy(self):
+        expected = rolling_comparison(self.returns, self.benchmark, [5, 20])
+        for returns in [self.returns.values, np.matrix(self.returns.values)]:
+            result = rolling_comparison(returns, self.benchmark.values, [5, 20])
+            self.assertEqual(sorted(result), sorted(set(column[:2] for column in expected.columns)))
+            for key, values in result.items():
+                self.assertTrue(isinstance(values, np.ndarray))
+                np.testing.assert_array_equal(values, expected[key].values)
+        one = rolling_comparison(self.returns['A'].values, self.benchmark.values, 20)
+        # Alone, A has no missing days to mask, which rounds differently
+        np.testing.assert_allclose(one['beta'], expected[('beta', 20)]['A'].values, rtol=1e-12)
+        self.assertEqual(sorted(rolling_comparison(self.returns.values)), ['deviation_risk'])
+        self.assertRaises(ValueError, rolling_comparison, self.returns.values, self.benchmark.values[:-1])
+
+# Market Comparison
+# ------------------------------------------------------------------------------------------------------------------------------
+def regression(r, m, risk_free_rate):
+    """
+    beta, alpha, r_squared, tracking_error and information_ratio of returns r on benchmark m, over the rows both have.
+    """
+    both = np.isfinite(r) & np.isfinite(m)
+    r, m = r[both], m[both]
+    cov = np.cov(r, m)
+    beta = cov[0, 1] / cov[1, 1]
+    excess = r - m
+    return {
+        'beta': beta,
+        'alpha': r.mean() - risk_free_rate - beta * (m.mean() - risk_free_rate),
+        'r_squared': cov[0, 1] ** 2 / (cov[0, 0] * cov[1, 1]),
+        'tracking_error': excess.std(ddof=1),
+        'information_ratio': excess.mean() / excess.std(ddof=1),
+    }
+
+class TestMarketComparison(unittest.TestCase):
+    """
+    market_comparison and Asset.beta, alpha and r_squared match np.cov on the rows each pair has returns for.
+    """
+
+    def setUp(self):
+        dates = pd.bdate_range('2000-01-03', periods=500)
+        self.market = Asset(random_history('MARKET', dates, 0).drop(dates[[50, 51]]))
+        histories = [random_history(symbol, dates, seed) for seed, symbol in enumerate(['A', 'B', 'C'], 1)]
+        histories[1].iloc[200:210] = np.nan
+        histories[2] = histories[2].iloc[120:]
+        self.assets = [Asset(history) for history in histories]
+        self.returns = pd.DataFrame({asset.symbol: asset.returns() for asset in self.assets})
+
+    def expected(self, returns, benchmark, risk_free_rate):
+        benchmark = benchmark.reindex(returns.index)
+        return regression(returns.values, benchmark.values, risk_free_rate)
+
+    def assert_close(self, expected, actual, key):
+        self.assertTrue(np.isclose(expected, actual, rtol=1e-9, atol=1e-15, equal_nan=True), (key, expected, actual))
+
+    def test_matrix(self):
+        result = market_comparison(self.returns, self.market.returns(), 0.02)
+        for symbol in self.returns:
+            for key, value in self.expected(self.returns[symbol], self.market.returns(), 0.02).items():
+                self.assert_close(value, result.loc[symbol, key], key)
+
+    def test_benchmarks(self):
+        benchmarks = self.returns[['A', 'C']]
+        result = market_comparison(self.returns, benchmarks, 0.0)
+        for symbol in self.returns:
+            for benchmark in benchmarks:
+                for key, value in self.expected(self.returns[symbol], benchmarks[benchmark], 0.0).items():
+                    self.assert_close(value, result.loc[symbol, (key, benchmark)], key)
+
+    def test_asset(self):
+        for asset in self.assets:
+            expected = self.expected(asset.returns(), self.market.returns(), 0.01)
+            self.assert_close(expected['beta'], asset.beta(self.market), 'beta')
+            self.assert_close(expected['alpha'], asset.alpha(self.market, 0.01), 'alpha')
+            self.assert_close(expected['r_squared'], asset.r_squared(self.market, 0.01), 'r_squared')
+            self.assert_close(expected['tracking_error'], asset.tracking_error(self.market), 'tracking_error')
+
+# Parabolic SAR
+# ------------------------------------------------------------------------------------------------------------------------------
+def psar_loop(high, low, step_r=0.02, step_f=0.02, max_af_r=0.2, max_af_f=0.2):
+    """
+    Rising and falling Parabolic SAR of one symbol as the original per-bar loop computed it.
+    """
+    # pylint: disable=too-many-arguments
+    r_sar = np.zeros(len(high))
+    f_sar = np.zeros(len(high))
+    ep = high[0]
+    af = step_r
+    sar = low[0]
+    up = True
+    for i in range(1, len(high)):
+        if up:
+            ep = np.max([ep, high[i]])
+            af = np.min([af + step_r if (ep == high[i]) else af, max_af_r])
+            sar = sar + af * (ep - sar)
+            r_sar[i] = sar
+        else:
+            ep = np.min([ep, low[i]])
+            af = np.min([af + step_f if (ep == low[i]) else af, max_af_f])
+            sar = sar + af * (ep - sar)
+            f_sar[i] = sar
+        if up and (sar > low[i] or sar > high[i]):
+            up = False
+            sar = ep
+            af = step_f
+        elif not up and (sar < low[i] or sar < high[i]):
+            up = True
+            sar = ep
+            af = step_r
+    return r_sar, f_sar
+
+def backends():
+    """
+    The kernel backends that can run here.
+    """
+    return ['numpy'] if util.numba is None else ['numpy', 'numba']
+
+class TestParabolicSar(unittest.TestCase):
+    """
+    psar matches the original loop on every backend, with NaN bars, and a block matches its columns run one at a time.
+    """
+
+    def setUp(self):
+        self.backend = util.KERNEL_BACKEND
+        self.data = random_history('TEST', pd.bdate_range('2000-01-03', periods=600), 5)
+        self.gappy = self.data.copy()
+        self.gappy.iloc[[100, 101, 350]] = np.nan
+
+    def tearDown(self):
+        util.set_kernel_backend(self.backend)
+
+    def test_matches_loop(self):
+        for backend in backends():
+            util.set_kernel_backend(backend)
+            for data in [self.data, self.gappy]:
+                high, low = data['High'].values, data['Low'].values
+                for params in [(), (0.01, 0.03, 0.1, 0.3)]:
+                    for expected, actual in zip(psar_loop(high, low, *params), psar(high, low, *params)):
+                        np.testing.assert_array_equal(actual, expected)
+                sar = Asset(data).parabolic_sar()
+                expected = psar_loop(high, low)
+                np.testing.assert_array_equal(sar['rising'].values, expected[0])
+                np.testing.assert_array_equal(sar['falling'].values, expected[1])
+
+    def test_block_matches_columns(self):
+        high = np.column_stack([self.data['High'].values, self.gappy['High'].values, self.data['Open'].values + 1.0])
+        low = np.column_stack([self.data['Low'].values, self.gappy['Low'].values, self.data['Open'].values - 1.0])
+        start = np.array([0, 0, 40])
+        high[:40, 2] = np.nan
+        low[:40, 2] = np.nan
+        for backend in backends():
+            util.set_kernel_backend(backend)
+            rising, falling = psar(high, low, start=start)
+            for col, first in enumerate(start):
+                expected = psar_loop(high[first:, col], low[first:, col])
+                np.testing.assert_array_equal(rising[first:, col], expected[0])
+                np.testing.assert_array_equal(falling[first:, col], expected[1])
+                self.assertTrue((rising[:first, col] == 0).all() and (falling[:first, col] == 0).all())
+
+    def test_pandas(self):
+        rising, falling = psar(self.data['High'], self.data['Low'])
+        self.assertTrue(isinstance(rising, pd.Series) and rising.index.equals(self.data.index))
+        self.assertTrue(isinstance(falling, pd.Series) and falling.index.equals(self.data.index))
+
+# Zigzag
+# ------------------------------------------------------------------------------------------------------------------------------
+def zigzag_loop(close, percent=7.0):
+    """
+    Zigzag line of one symbol's close Series as the original per-bar loop computed it.
+    """
+    zigzag = pd.Series(np.zeros(len(close)), index=close.index)
+    lastzig = close.iloc[0]
+    zigzag.iloc[0] = close.iloc[0]
+    for i in range(1, len(close)):
+        if np.abs((lastzig - close.iloc[i]) / close.iloc[i]) > percent / 100.0:
+            zigzag.iloc[i] = close.iloc[i]
+            lastzig = close.iloc[i]
+        else:
+            zigzag.iloc[i] = None
+    return pd.Series.interpolate(zigzag)
+
+class TestZigzag(unittest.TestCase):
+    """
+    zigzag_pivots and zigzag_line match the original loop on every backend, with NaN bars, and a block matches its columns run
+    one at a time.
+    """
+
+    def setUp(self):
+        self.backend = util.KERNEL_BACKEND
+        self.close = random_history('TEST', pd.bdate_range('2000-01-03', periods=800), 6)['Close']
+        self.gappy = self.close.copy()
+        self.gappy.iloc[[100, 101, 102, 500]] = np.nan
+
+    def tearDown(self):
+        util.set_kernel_backend(self.backend)
+
+    def test_matches_loop(self):
+        for backend in backends():
+            util.set_kernel_backend(backend)
+            for close in [self.close, self.gappy]:
+                for percent in [3.0, 7.0]:
+                    expected = zigzag_loop(close, percent)
+                    pivots = zigzag_pivots(close, percent)
+                    np.testing.assert_array_equal(zigzag_line(close, pivots).values, expected.values)
+                    self.assertTrue(Asset(close.to_frame('Close')).zigzag(percent).equals(expected))
+
+    def test_block_matches_columns(self):
+        block = np.column_stack([self.close.values, self.gappy.values, self.close.values[::-1]])
+        block[:60, 2] = np.nan
+        block[-30:, 1] = np.nan
+        start = np.array([0, 0, 60])
+        for backend in backends():
+            util.set_kernel_backend(backend)
+            pivots = zigzag_pivots(block, 5.0, start)
+            line = zigzag_line(block, pivots)
+            for col, first in enumerate(start):
+                expected = zigzag_pivots(block[first:, col], 5.0)
+                np.testing.assert_array_equal(pivots[first:, col], expected)
+                self.assertFalse(pivots[:first, col].any())
+                np.testing.assert_array_equal(line[:, col], zigzag_line(block[:, col], pivots[:, col]))
+            # The line holds the last pivot up to the last valid close, then is NaN like the price
+            self.assertTrue(np.isnan(line[:60, 2]).all() and np.isnan(line[-30:, 1]).all())
+            self.assertTrue(np.isfinite(line[60:, 2]).all() and np.isfinite(line[:-30, 1]).all())
+
+    def test_pivot_list(self):
+        close = pd.DataFrame({'A': self.close, 'B': self.gappy})
+        pivots = zigzag_pivots(close, 5.0)
+        table = zigzag_pivot_list(close, pivots)
+        self.assertTrue((np.diff(table['date'].values.astype('int64')) >= 0).all())
+        for symbol in close:
+            rows = table[table['symbol'] == symbol]
+            dates = close.index[pivots[symbol].values]
+            self.assertTrue(pd.DatetimeIndex(rows['date']).equals(dates))
+            np.testing.assert_array_equal(rows['price'].values, close[symbol][dates].values)
+            np.testing.assert_array_equal(rows['direction'].values, np.r_[0, np.sign(np.diff(rows['price'].values))])
+        single = zigzag_pivot_list(self.close, pivots['A'])
+        self.assertEqual(list(single.columns), ['date', 'price', 'direction'])
+
+# Bars Since Extrema
+# ------------------------------------------------------------------------------------------------------------------------------
+def bars_since_loop(values, n, min_periods, extreme):
+    """
+    Bars since the most recent extreme (np.max or np.min) of each window of n values of one symbol, skipping NaN.
+    """
+    result = np.empty(len(values))
+    result.fill(np.nan)
+    for i in range(len(values)):
+        window = values[max(i - n + 1, 0):i + 1]
+        valid = ~np.isnan(window)
+        if valid.sum() >= min_periods:
+            last = np.nonzero(valid & (window == extreme(window[valid])))[0][-1]
+            result[i] = len(window) - 1 - last
+    return result
+
+class TestBarsSinceExtrema(unittest.TestCase):
+    """
+    bars_since_extrema matches a loop over every window, with ties, NaN bars and min_periods, and a block matches its columns.
+    """
+
+    def setUp(self):
+        data = random_history('TEST', pd.bdate_range('2000-01-03', periods=500), 7)
+        # Round the prices so windows have tied extremes
+        self.high = data['High'].round(0).values
+        self.low = data['Low'].round(0).values
+        self.high[[50, 51, 52, 300]] = np.nan
+        self.low[[50, 51, 52, 301]] = np.nan
+
+    def test_matches_loop(self):
+        for n, min_periods in [(1, None), (5, None), (20, None), (20, 5), (25, 1)]:
+            since_high, since_low = bars_since_extrema(self.high, n, self.low, min_periods)
+            periods = n if min_periods is None else min_periods
+            np.testing.assert_array_equal(since_high, bars_since_loop(self.high, n, periods, np.max))
+            np.testing.assert_array_equal(since_low, bars_since_loop(self.low, n, periods, np.min))
+            self.assertTrue((since_high[np.isfinite(since_high)] <= n - 1).all())
+
+    def test_block_matches_columns(self):
+        high = np.column_stack([self.high, self.low, self.high[::-1]])
+        high[:40, 2] = np.nan
+        for n, min_periods in [(14, None), (14, 3)]:
+            since_high, since_low = bars_since_extrema(high, n, min_periods=min_periods)
+            for col in range(high.shape[1]):
+                expected_high, expected_low = bars_since_extrema(high[:, col], n, min_periods=min_periods)
+                np.testing.assert_array_equal(since_high[:, col], expected_high)
+                np.testing.assert_array_equal(since_low[:, col], expected_low)
+
+    def test_pandas(self):
+        high = pd.DataFrame({'A': self.high, 'B': self.low}, index=pd.bdate_range('2000-01-03', periods=len(self.high)))
+        since_high, _ = bars_since_extrema(high, 10)
+        self.assertTrue(isinstance(since_high, pd.DataFrame) and since_high.index.equals(high.index))
+        np.testing.assert_array_equal(since_high['B'].values, bars_since_loop(self.low, 10, 10, np.max))
+
+# Rolling Sums
+# ------------------------------------------------------------------------------------------------------------------------------
+def rolling_sum_loop(values, n):
+    """
+    Sum of each window of n values along the first axis, NaN where the window is short or has a NaN or inf.
+    """
+    result = np.empty(values.shape)
+    result.fill(np.nan)
+    for i in range(n - 1, len(values)):
+        window = values[i - n + 1:i + 1]
+        result[i] = np.where(np.isfinite(window).all(axis=0), window.sum(axis=0), np.nan)
+    return result
+
+class TestRollingSums(unittest.TestCase):
+    """
+    rolling_sums matches pandas rolling sums and a loop over every window for any block size, with NaN runs, inf and leading
+    NaN, and a block matches its columns.
+    """
+
+    def setUp(self):
+        np.random.seed(8)
+        self.values = np.random.randn(300, 3) * 10.0
+        self.values[:7, 1] = np.nan
+        self.values[100:130, 0] = np.nan
+        self.values[[40, 41, 250], 2] = np.nan
+        self.windows = [1, 3, 14, 50]
+
+    def test_matches_pandas(self):
+        frame = pd.DataFrame(self.values)
+        for block_size in [8, 64, 1000, util.ROLLING_BLOCK_SIZE]:
+            sums = rolling_sums([frame, frame[2]], self.windows, block_size)
+            for n, result, column in zip(self.windows, sums[0], sums[1]):
+                expected = frame.rolling(n).sum()
+                self.assertTrue(isinstance(result, pd.DataFrame) and result.index.equals(frame.index))
+                np.testing.assert_allclose(result.values, expected.values, rtol=1e-10, atol=1e-10)
+                np.testing.assert_allclose(column.values, expected[2].values, rtol=1e-10, atol=1e-10)
+
+    def test_inf(self):
+        values = self.values.copy()
+        values[60, 0] = np.inf
+        values[200, 1] = -np.inf
+        for block_size in [8, 64, util.ROLLING_BLOCK_SIZE]:
+            for n, result in zip(self.windows, rolling_sums([values], self.windows, block_size)[0]):
+                expected = rolling_sum_loop(values, n)
+                np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
+                np.testing.assert_allclose(result, expected, rtol=1e-10, atol=1e-10)
+
+    def test_block_matches_columns(self):
+        for block_size in [8, util.ROLLING_BLOCK_SIZE]:
+            block = rolling_sums([self.values], self.windows, block_size)[0]
+            for col in range(self.values.shape[1]):
+                for result, column in zip(block, rolling_sums([self.values[:, col]], self.windows, block_size)[0]):
+                    np.testing.assert_allclose(result[:, col], column, rtol=1e-12, atol=1e-12)
+
+    def test_short(self):
+        for values in [self.values[:0], self.values[:2]]:
+            for result in rolling_sums([values], [3], 8)[0]:
+                self.assertEqual(result.shape, values.shape)
+                self.assertTrue(np.isnan(result).all())
+
+if __name__ == '__main__':
+    unittest.main()